@@ -0,0 +1,6 @@
+"""
+Benchmarks del analizador SQL
+
+Ejecutar desde la raíz del repositorio, por ejemplo:
+    python -m benchmarks.bench_cold_start
+"""
@@ -0,0 +1,92 @@
+"""
+Benchmark de arranque: tiempo de importación de src.parser y tiempo hasta el
+primer parse con los parsers precompilados (python -m src.grammar.precompiled)
+frente a la compilación al vuelo y a la caché de gramáticas en disco fría y
+caliente.
+
+Cada medición se hace en un proceso nuevo para incluir la importación y la
+compilación de las gramáticas que hace SQLParser.__init__.
+
+Uso:
+    python -m benchmarks.bench_cold_start [--runs N]
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from src.grammar.precompiled import GENERATED_DIR, PRECOMPILED_ENV, build
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Se mide la importación y, desde antes de construir los parsers, hasta
+# terminar el primer parse
+CHILD_SCRIPT = r"""
+import time
+start = time.perf_counter()
+from src.parser import SQLParser
+imported = time.perf_counter()
+parser = SQLParser()
+parser.parse("SELECT name FROM users WHERE age > 18")
+first_parse = time.perf_counter()
+ambiguous_parser = SQLParser(ambiguous=True)
+ambiguous_parser.parse("SELECT name FROM users WHERE age > 18")
+print(imported - start, first_parse - imported, time.perf_counter() - imported)
+"""
+
+
+def time_first_parse(cache_dir, precompiled: bool):
+    #Lanza un proceso nuevo y retorna (importación, primer parse, ambas gramáticas)
+    env = dict(os.environ)
+    env.pop("SQL_PARSER_CACHE_DIR", None)
+    # Sin .pyc cada proceso compilaría también el código fuente
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    env[PRECOMPILED_ENV] = "1" if precompiled else "0"
+    if cache_dir:
+        env["SQL_PARSER_CACHE_DIR"] = cache_dir
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return tuple(float(value) for value in output.strip().splitlines()[-1].split())
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--runs", type=int, default=10)
+    args = arg_parser.parse_args()
+
+    if not os.path.exists(os.path.join(GENERATED_DIR, "sql_unambiguous.py")):
+        build()
+
+    samples = {"sin caché": [], "caché fría": [], "caché caliente": [], "precompilado": []}
+    warm_dir = tempfile.mkdtemp(prefix="sql_parser_cache_")
+    try:
+        time_first_parse(warm_dir, False)  # Llenar la caché caliente (y los .pyc)
+        for _ in range(args.runs):
+            samples["sin caché"].append(time_first_parse(None, False))
+
+            cold_dir = tempfile.mkdtemp(prefix="sql_parser_cache_")
+            try:
+                samples["caché fría"].append(time_first_parse(cold_dir, False))
+            finally:
+                shutil.rmtree(cold_dir, ignore_errors=True)
+
+            samples["caché caliente"].append(time_first_parse(warm_dir, False))
+            samples["precompilado"].append(time_first_parse(None, True))
+    finally:
+        shutil.rmtree(warm_dir, ignore_errors=True)
+
+    print(f"Mediana de {args.runs} procesos (ms)")
+    print(f"  {'':<15} {'importación':>12} {'primer parse':>13} {'+ ambigua':>10}")
+    for label, runs in samples.items():
+        imported, first, both = (statistics.median(run[i] for run in runs) * 1000 for i in range(3))
+        print(f"  {label:<15} {imported:12.1f} {first:13.1f} {both:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark de estrés con condiciones anidadas a gran profundidad.
+
+Genera WHERE con AND/OR alternados y anidados (árbol tan profundo como la
+consulta) y con cadenas de paréntesis y NOT (que la gramática aplana), y
+mide el parse y los helpers de ParseTree hasta 100k niveles.
+
+Uso:
+    python -m benchmarks.bench_deep_nesting [--depths 10,100,1000,10000,100000]
+"""
+
+import argparse
+import logging
+import time
+
+from src.parser import SQLParser
+
+# La salida de pretty() crece con el cuadrado de la profundidad (indentación)
+MAX_PRETTY_DEPTH = 10000
+
+
+def nested_and_or(depth: int) -> str:
+    #x0 = 0 AND (x1 = 1 OR (x2 = 2 AND (...)))
+    parts = [f"x{i} = {i} {'AND' if i % 2 == 0 else 'OR'} (" for i in range(depth)]
+    return "SELECT a FROM t WHERE " + "".join(parts) + "y = 1" + ")" * depth
+
+
+def nested_not_parens(depth: int) -> str:
+    #NOT (NOT (... (y = 1)))
+    return "SELECT a FROM t WHERE " + "NOT (" * depth + "y = 1" + ")" * depth
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--depths", default="10,100,1000,10000,100000")
+    args = arg_parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    parser = SQLParser()
+
+    for label, generator in (("AND/OR anidados", nested_and_or), ("NOT + paréntesis", nested_not_parens)):
+        print(f"\n{label}")
+        print(f"{'niveles':>8} {'parse':>9} {'métricas':>9} {'to_dict':>9} {'to_json':>9} {'copy':>9} {'pretty':>9} {'prof.':>7}")
+        for depth in (int(d) for d in args.depths.split(",")):
+            parse_time, tree = timed(lambda: parser.parse(generator(depth)))
+            if tree is None:
+                print(f"{depth:>8} error de parsing")
+                continue
+            metrics_time, tree_depth = timed(lambda: (tree.get_depth(), tree.get_node_count(),
+                                                      tree.extract_columns(), tree.extract_table())[0])
+            dict_time, _ = timed(tree.to_dict)
+            json_time, _ = timed(lambda: tree.to_json(indent=None))
+            copy_time, _ = timed(tree.copy)
+            if depth <= MAX_PRETTY_DEPTH:
+                pretty_cell = f"{timed(tree.get_pretty_string)[0]:>8.3f}s"
+            else:
+                pretty_cell = f"{'-':>9}"
+            print(f"{depth:>8} {parse_time:>8.3f}s {metrics_time:>8.3f}s {dict_time:>8.3f}s "
+                  f"{json_time:>8.3f}s {copy_time:>8.3f}s {pretty_cell} {tree_depth:>7}")
+
+
+if __name__ == "__main__":
+    main()
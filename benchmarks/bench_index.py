@@ -0,0 +1,92 @@
+"""
+Índice invertido sobre un corpus grande de consultas: coste de indexar una
+consulta (parseo, plan y términos) y tiempo de las búsquedas sobre millones
+de consultas indexadas, en memoria y mapeadas desde disco.
+
+Para llegar a millones de documentos sin parsear millones de consultas, se
+parsea un conjunto de consultas distintas y sus términos se insertan una y
+otra vez (el índice solo ve términos, así que el coste de las búsquedas es
+el mismo).
+
+Uso:
+    python -m benchmarks.bench_index [--queries N] [--distinct N]
+"""
+
+import argparse
+import logging
+import shutil
+import tempfile
+import time
+
+from src.engine import plan_query
+from src.index import QueryIndex, Term, index_terms, reads
+from benchmarks.corpus import CorpusConfig, CorpusGenerator
+from benchmarks.bench_engine import best_of
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Búsquedas en el índice invertido de consultas")
+    arg_parser.add_argument("--queries", type=int, default=10_000_000, help="documentos indexados")
+    arg_parser.add_argument("--distinct", type=int, default=20_000, help="consultas distintas parseadas")
+    arg_parser.add_argument("--identifiers", type=int, default=200)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    corpus = CorpusGenerator(CorpusConfig(identifiers=args.identifiers), seed=args.seed).generate(args.distinct)
+    plan_query(corpus[0])
+
+    sample = QueryIndex()
+    started = time.perf_counter()
+    sample.add_many(corpus)
+    add_time = time.perf_counter() - started
+    print(f"add(): {add_time / len(corpus) * 1e6:.1f} us/consulta (parseo, plan, términos e inserción)")
+
+    terms = [index_terms(plan_query(query)) for query in corpus]
+    index = QueryIndex(store_queries=False)
+    started = time.perf_counter()
+    for document in range(args.queries):
+        index.add_terms(terms[document % len(terms)])
+    insert_time = time.perf_counter() - started
+    stats = index.get_stats()
+    print(f"{stats['documents']} documentos, {stats['terms']} términos, {stats['postings']} apariciones "
+          f"({stats['posting_bytes'] / 1024 / 1024:.0f} MiB); add_terms(): "
+          f"{insert_time / args.queries * 1e6:.2f} us/documento")
+
+    table = next(iter(index.vocabulary('table')))
+    where = list(index.vocabulary('where'))
+    order = next(iter(index.vocabulary('order')))
+    searches = {
+        'término': Term('where', where[0]),
+        'lee columna': reads(where[0], table),
+        'y de tres': Term('where', where[0]) & Term('where', where[1]) & Term('op', '>'),
+        'o de tres': Term('where', where[0]) | Term('where', where[1]) | Term('order', order),
+        'y no': Term('table', table) & ~Term('where', where[0]),
+        'predicado': Term('predicate', f"{where[0]} >") & Term('op', '='),
+    }
+
+    directory = tempfile.mkdtemp(prefix="bench_index_")
+    try:
+        started = time.perf_counter()
+        index.save(directory)
+        save_time = time.perf_counter() - started
+        started = time.perf_counter()
+        mapped = QueryIndex.load(directory)
+        load_time = time.perf_counter() - started
+        print(f"save(): {save_time * 1000:.0f} ms   load() mapeado: {load_time * 1000:.1f} ms")
+
+        print(f"{'búsqueda':<12} {'consultas':>10} {'memoria':>10} {'mapeado':>10}")
+        for name, expression in searches.items():
+            found = index.search(expression)
+            assert mapped.search(expression).tolist() == found.tolist(), name
+            memory_time = best_of(lambda: index.search(expression), args.repeat)
+            mapped_time = best_of(lambda: mapped.search(expression), args.repeat)
+            print(f"{name:<12} {len(found):>10} {memory_time * 1000:7.2f} ms {mapped_time * 1000:7.2f} ms")
+        del mapped
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
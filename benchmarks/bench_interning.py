@@ -0,0 +1,109 @@
+"""
+Subárboles compartidos: memoria retenida por un lote de consultas como
+ParseTree independientes frente a InternedBatch (DAG compartido), tiempo de
+interning frente al de parseo y, sobre una tabla sintética, execute_many()
+(predicados repetidos evaluados una vez) frente a ejecutar cada consulta.
+
+Dos cargas: plantillas (pocas consultas distintas con literales de baja
+cardinalidad, como las de una aplicación) y el corpus sintético aleatorio.
+
+Uso:
+    python -m benchmarks.bench_interning [--queries N] [--rows N]
+"""
+
+from typing import List
+import argparse
+import gc
+import logging
+import random
+import time
+import tracemalloc
+
+from src.parser import InternedBatch, SQLParser
+from src.engine import compile_query, execute_many
+from benchmarks.corpus import CorpusConfig, CorpusGenerator
+from benchmarks.bench_engine import build_table, best_of
+
+TEMPLATES = [
+    "SELECT id, price FROM sales WHERE region = '{region}' AND qty > {qty}",
+    "SELECT id FROM sales WHERE price < {price} OR region = '{region}'",
+    "SELECT * FROM sales WHERE qty >= {qty} AND NOT region = '{region}' ORDER BY price DESC",
+    "SELECT id, qty FROM sales WHERE (price >= {price} AND price < 900) OR qty = {qty}",
+]
+
+
+def templated_queries(count: int, seed: int = 0) -> List[str]:
+    #Consultas de plantilla con literales de baja cardinalidad
+    rng = random.Random(seed)
+    regions = ['north', 'south', 'east', 'west']
+    return [rng.choice(TEMPLATES).format(region=rng.choice(regions), qty=rng.randrange(10),
+                                         price=rng.randrange(1, 10) * 100)
+            for _ in range(count)]
+
+
+def retained(build) -> int:
+    #Bytes que quedan reservados tras construir el resultado de build()
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def measure(name: str, parser: SQLParser, queries: List[str]):
+    #Memoria y tiempos de una carga
+    tree_memory = retained(lambda: parser.parse_multiple(queries))
+    batch_memory = retained(lambda: parser.parse_interned(queries))
+
+    started = time.perf_counter()
+    trees = parser.parse_multiple(queries)
+    parse_time = time.perf_counter() - started
+    started = time.perf_counter()
+    batch = InternedBatch.from_trees(trees)
+    intern_time = time.perf_counter() - started
+
+    stats = batch.interner.get_stats()
+    print(f"{name}: {len(queries)} consultas, {stats['nodes_seen']} nodos, "
+          f"{stats['unique_nodes']} distintos (x{stats['sharing']:.1f})")
+    print(f"  memoria  ParseTree {tree_memory / 1024 / 1024:6.2f} MiB   "
+          f"compartido {batch_memory / 1024 / 1024:6.2f} MiB   ({tree_memory / batch_memory:.1f}x)")
+    print(f"  tiempo   parseo {parse_time / len(queries) * 1e6:6.1f} us/consulta   "
+          f"interning {intern_time / len(queries) * 1e6:6.1f} us/consulta")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Subárboles compartidos entre consultas")
+    arg_parser.add_argument("--queries", type=int, default=5000)
+    arg_parser.add_argument("--rows", type=int, default=1_000_000)
+    arg_parser.add_argument("--batch", type=int, default=50, help="consultas por execute_many()")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    parser = SQLParser(backend='native')
+    templated = templated_queries(args.queries, args.seed)
+    corpus = CorpusGenerator(CorpusConfig(), seed=args.seed).generate(args.queries)
+    parser.parse(templated[0])
+    measure("plantillas", parser, templated)
+    measure("corpus", parser, corpus)
+
+    table = build_table(args.rows, args.seed)
+    queries = templated[:args.batch]
+    compiled = [compile_query(query) for query in queries]
+    shared = execute_many(compiled, table)
+    for query, rows in zip(compiled, shared):
+        assert rows.tolist() == query.execute(table).tolist()
+    separate_time = best_of(lambda: [query.execute(table) for query in compiled], args.repeat)
+    shared_time = best_of(lambda: execute_many(compiled, table), args.repeat)
+    print(f"execute_many: {len(compiled)} consultas sobre {args.rows} filas   "
+          f"por separado {separate_time * 1000:7.1f} ms   compartido {shared_time * 1000:7.1f} ms   "
+          f"({separate_time / shared_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Compara el backend nativo (descenso recursivo escrito a mano) con Lark LALR:
+parse sin caché, validate_query y consultas con WHERE profundo, sobre el
+corpus sintético. Antes de medir comprueba que los árboles coinciden.
+
+Uso:
+    python -m benchmarks.bench_native [--queries N] [--repeat N]
+"""
+
+import argparse
+import logging
+
+from src.parser import SQLParser, SQLValidator
+from .corpus import CorpusConfig, CorpusGenerator
+from .harness import measure
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Backend nativo frente a Lark")
+    arg_parser.add_argument("--queries", type=int, default=500)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    corpora = {
+        'corpus': CorpusGenerator(seed=args.seed).generate(args.queries),
+        'where profundo': CorpusGenerator(CorpusConfig(where_depth=4, where_width=(3, 6), nest_rate=0.5),
+                                          seed=args.seed).generate(args.queries // 5),
+    }
+    lark = SQLParser()
+    native = SQLParser(backend='native')
+    for queries in corpora.values():
+        for query in queries:
+            assert native.parse(query).to_dict() == lark.parse(query).to_dict(), query
+
+    operations = {
+        'parse': (lark.parse, native.parse),
+        'validate_query': (SQLValidator().validate_query, SQLValidator(backend='native').validate_query),
+    }
+    print(f"{'corpus':<16} {'operación':<16} {'lark':>12} {'nativo':>12} {'mejora':>8}")
+    for corpus, queries in corpora.items():
+        for name, (lark_func, native_func) in operations.items():
+            before = measure(lark_func, queries, args.repeat)["latency_us"]["mean"]
+            after = measure(native_func, queries, args.repeat)["latency_us"]["mean"]
+            print(f"{corpus:<16} {name:<16} {before:9.1f} µs {after:9.1f} µs {before / after:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
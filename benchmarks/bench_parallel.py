@@ -0,0 +1,57 @@
+"""
+Benchmark de escalado de parse_multiple / validate_batch con 1..N procesos.
+
+Uso:
+    python -m benchmarks.bench_parallel [--queries N] [--max-workers N]
+"""
+
+import argparse
+import logging
+import os
+import time
+
+from src.parser import SQLParser, SQLValidator
+from src.grammar.grammar_examples import VALID_QUERIES, COMPLEX_QUERIES, AMBIGUOUS_QUERIES
+
+
+def build_workload(size: int):
+    #Repite las consultas de ejemplo variando los literales
+    base = VALID_QUERIES + COMPLEX_QUERIES + AMBIGUOUS_QUERIES
+    return [base[i % len(base)].replace("18", str(i)) for i in range(size)]
+
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--queries", type=int, default=20000)
+    arg_parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = arg_parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    queries = build_workload(args.queries)
+    parser = SQLParser()
+    validator = SQLValidator()
+
+    print(f"{args.queries} consultas, {os.cpu_count()} CPUs")
+    print(f"{'procesos':>8} {'parse q/s':>12} {'validate q/s':>14}")
+
+    for workers in range(1, args.max_workers + 1):
+        if workers > 1:
+            # Arrancar el pool fuera de la medición
+            parser.parse_multiple(queries[:workers], workers=workers)
+            validator.validate_batch(queries[:workers], workers=workers)
+        parse_time = timed(lambda: parser.parse_multiple(queries, workers=workers))
+        validate_time = timed(lambda: validator.validate_batch(queries, workers=workers))
+        print(f"{workers:>8} {args.queries / parse_time:>12.0f} {args.queries / validate_time:>14.0f}")
+
+    parser.close()
+    validator.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Micro-benchmark del camino de validación sobre árboles ya parseados:
+construcción del ParseTree, validaciones semánticas y métricas del árbol.
+
+Uso:
+    python -m benchmarks.bench_parse_tree_metadata [--repeat N]
+"""
+
+import argparse
+import logging
+import time
+
+from src.parser import ParseTree, SQLParser, SQLValidator
+from src.grammar.grammar_examples import VALID_QUERIES, COMPLEX_QUERIES
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--repeat", type=int, default=2000)
+    args = arg_parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    parser = SQLParser()
+    validator = SQLValidator()
+    parsed = [(query, parser.parse(query).lark_tree) for query in VALID_QUERIES + COMPLEX_QUERIES]
+
+    def semantic_path():
+        for query, lark_tree in parsed:
+            tree = ParseTree(lark_tree, query)
+            validator._validate_semantics(tree, query)
+
+    def full_path():
+        for query, lark_tree in parsed:
+            tree = ParseTree(lark_tree, query)
+            validator._validate_semantics(tree, query)
+            tree.get_depth()
+            tree.get_node_count()
+            tree.extract_columns()
+            tree.extract_table()
+
+    total = args.repeat * len(parsed)
+    for label, func in (("semántica", semantic_path), ("semántica + métricas", full_path)):
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            func()
+        elapsed = time.perf_counter() - start
+        print(f"{label:<22} {elapsed / total * 1e6:8.2f} µs/consulta")
+
+
+if __name__ == "__main__":
+    main()
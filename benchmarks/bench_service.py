@@ -0,0 +1,112 @@
+"""
+Prueba de carga del servicio local de parsing: rendimiento y latencia
+p50/p99 con varios clientes concurrentes, petición a petición y con
+pipelining.
+
+Uso:
+    python -m benchmarks.bench_service [--clients N] [--requests N] [--op parse]
+        [--executor process|thread] [--workers N] [--max-delay S]
+    python -m benchmarks.bench_service --connect /ruta/del/socket   (servidor ya arrancado)
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from src.service import ParseClient, ParseServer
+from src.grammar.grammar_examples import VALID_QUERIES, COMPLEX_QUERIES
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def start_server(args):
+    #Arranca el servidor en un hilo con su propio bucle de eventos
+    socket_path = os.path.join(tempfile.mkdtemp(), "sql-parser.sock")
+    server = ParseServer(socket_path, workers=args.workers, executor=args.executor, max_delay=args.max_delay)
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(server.start())
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait()
+    return server, loop
+
+
+def run_clients(client, op, queries, clients, pipelined):
+    #Reparte las consultas entre hilos cliente; retorna (segundos, latencias)
+    latencies = []
+    lock = threading.Lock()
+    share = [queries[i::clients] for i in range(clients)]
+
+    def work(own):
+        local = []
+        if pipelined:
+            start = time.perf_counter()
+            client.request_many(op, own)
+            local.append(time.perf_counter() - start)
+        else:
+            for query in own:
+                start = time.perf_counter()
+                client.request(op, query)
+                local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=work, args=(own,)) for own in share]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, latencies
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--clients", type=int, default=8)
+    arg_parser.add_argument("--requests", type=int, default=4000)
+    arg_parser.add_argument("--op", default="parse")
+    arg_parser.add_argument("--executor", choices=("process", "thread"), default="process")
+    arg_parser.add_argument("--workers", type=int, default=None)
+    arg_parser.add_argument("--max-delay", type=float, default=0.002)
+    arg_parser.add_argument("--connect", help="Socket Unix de un servidor ya arrancado")
+    args = arg_parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    base = VALID_QUERIES + COMPLEX_QUERIES
+    queries = [base[i % len(base)].replace("18", str(i)) for i in range(args.requests)]
+
+    server = loop = None
+    address = args.connect
+    if address is None:
+        server, loop = start_server(args)
+        address = server.address
+
+    with ParseClient(address, pool_size=args.clients) as client:
+        client.request_many(args.op, queries[:100])
+        print(f"{args.requests} peticiones '{args.op}', {args.clients} clientes, {os.cpu_count()} CPUs")
+        elapsed, latencies = run_clients(client, args.op, queries, args.clients, pipelined=False)
+        print(f"petición a petición   {args.requests / elapsed:9.0f} consultas/s   "
+              f"p50 {percentile(latencies, 0.5) * 1000:6.2f} ms   p99 {percentile(latencies, 0.99) * 1000:6.2f} ms")
+        elapsed, _ = run_clients(client, args.op, queries, args.clients, pipelined=True)
+        print(f"pipelining            {args.requests / elapsed:9.0f} consultas/s")
+
+    if server is not None:
+        print(f"servidor: {server.get_stats()}")
+        asyncio.run_coroutine_threadsafe(server.close(), loop).result()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Memoria retenida por los árboles de derivación: bytes por nodo de los
+ParseTree que quedan en memoria tras parsear un lote de consultas.
+
+Uso:
+    python -m benchmarks.bench_tree_memory [--queries N]
+"""
+
+import argparse
+import gc
+import logging
+import tracemalloc
+
+from src.parser import SQLParser
+from src.grammar.grammar_examples import VALID_QUERIES, COMPLEX_QUERIES
+
+
+def make_queries(count: int):
+    #Copias de los ejemplos (cadenas distintas, creadas antes de medir)
+    base = VALID_QUERIES + COMPLEX_QUERIES
+    return ["".join(base[i % len(base)]) for i in range(count)]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--queries", type=int, default=20000)
+    args = arg_parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    parser = SQLParser()
+    queries = make_queries(args.queries)
+    parser.parse(queries[0])
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    trees = [parser.parse(query) for query in queries]
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    valid = [tree for tree in trees if tree is not None]
+    nodes = sum(tree.get_node_count() for tree in valid)
+    print(f"Árboles retenidos:  {len(valid)}")
+    print(f"Nodos totales:      {nodes}")
+    print(f"Memoria retenida:   {retained / 1024 / 1024:.1f} MiB")
+    print(f"Bytes por nodo:     {retained / nodes:.1f}")
+    print(f"Bytes por árbol:    {retained / len(valid):.0f}")
+
+
+if __name__ == "__main__":
+    main()
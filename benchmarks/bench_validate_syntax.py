@@ -0,0 +1,52 @@
+"""
+Compara validate_syntax (reconocedor LALR sin árbol) con el camino anterior,
+que hacía un parsing completo y descartaba el árbol.
+
+Uso:
+    python -m benchmarks.bench_validate_syntax [--repeat N]
+"""
+
+import argparse
+import logging
+import time
+import tracemalloc
+
+from src.parser import SQLParser
+from src.grammar.grammar_examples import VALID_QUERIES, INVALID_QUERIES, COMPLEX_QUERIES
+
+
+def measure(func, queries, repeat):
+    #Tiempo medio por consulta (µs) y pico de memoria asignada en una pasada (bytes)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            func(query)
+    elapsed = (time.perf_counter() - start) / (repeat * len(queries)) * 1e6
+
+    tracemalloc.start()
+    for query in queries:
+        func(query)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--repeat", type=int, default=500)
+    args = arg_parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    parser = SQLParser()
+    valid = VALID_QUERIES + COMPLEX_QUERIES
+    parser.validate_syntax(valid[0])
+
+    for label, queries in (("válidas", valid), ("inválidas", INVALID_QUERIES)):
+        for name, func in (("parsing completo", parser._validate_with_parser),
+                           ("reconocedor", parser.validate_syntax)):
+            elapsed, peak = measure(func, queries, args.repeat)
+            print(f"{label:<10} {name:<17} {elapsed:8.2f} µs/consulta   pico {peak / 1024:7.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
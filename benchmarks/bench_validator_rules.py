@@ -0,0 +1,86 @@
+"""
+Mide el motor de reglas del validador: coste por consulta al añadir reglas
+(el recorrido es uno solo), detección de columnas duplicadas en SELECT anchos
+y validación completa con el texto tokenizado una vez frente a parsear el
+texto y buscar las palabras clave por subcadenas.
+
+Uso:
+    python -m benchmarks.bench_validator_rules [--repeat N]
+"""
+
+import argparse
+import logging
+import time
+
+from src.parser import SQLValidator
+from src.parser.rules import Rule, RuleEngine, default_rules
+
+
+class CountingRule(Rule):
+    #Regla de relleno que visita condiciones y columnas
+
+    node_types = ('condition', 'column')
+
+    def __init__(self, index: int):
+        self.name = f"counting-{index}"
+
+    def visit_node(self, ctx, node, report):
+        ctx.state[self.name] = ctx.state.get(self.name, 0) + 1
+
+
+KEYWORDS = ('SELECT', 'FROM', 'WHERE', 'AND', 'OR', 'NOT', 'ORDER', 'BY')
+
+
+def substring_validate(validator, query):
+    #Camino anterior: parsing del texto y estilo por búsqueda de subcadenas
+    tree = validator.parser.parse(query)
+    errors, _ = validator.engine.run(query, tree, severities=('error',))
+    for keyword in KEYWORDS:
+        if keyword.lower() in query.lower() and keyword not in query.upper():
+            break
+    return errors
+
+
+def measure(engine, query, tree, repeat):
+    #Tiempo medio por ejecución del motor (µs)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        engine.run(query, tree)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--repeat", type=int, default=2000)
+    args = arg_parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    validator = SQLValidator()
+    query = "SELECT a, b, c FROM t WHERE " + " AND ".join(f"c{i} = {i}" for i in range(20)) + " ORDER BY a"
+    tree = validator.parser.parse(query)
+
+    for extra in (0, 5, 20):
+        engine = RuleEngine(default_rules() + [CountingRule(i) for i in range(extra)])
+        elapsed = measure(engine, query, tree, args.repeat)
+        print(f"{len(engine.rules):>3} reglas   {elapsed:8.2f} µs/consulta")
+
+    for width in (100, 1000, 4000):
+        wide = "SELECT " + ", ".join(f"c{i % (width // 2)}" for i in range(width)) + " FROM t"
+        wide_tree = validator.parser.parse(wide)
+        elapsed = measure(validator.engine, wide, wide_tree, max(1, args.repeat // width))
+        print(f"SELECT de {width:>4} columnas   {elapsed / 1000:8.2f} ms")
+
+    # Consultas generadas con muchos predicados y literales
+    generated = "SELECT a, b FROM orders WHERE " + " OR ".join(
+        f"(order_id = {i} AND brand = 'and or by {i}')" for i in range(200)) + " ORDER BY a"
+    for name, func in (("texto + subcadenas", lambda: substring_validate(validator, generated)),
+                       ("tokens compartidos", lambda: validator.validate_query(generated))):
+        start = time.perf_counter()
+        for _ in range(max(1, args.repeat // 100)):
+            func()
+        elapsed = (time.perf_counter() - start) / max(1, args.repeat // 100) * 1000
+        print(f"validación ({name})   {elapsed:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
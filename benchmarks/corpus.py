@@ -0,0 +1,180 @@
+"""
+Generador de corpus sintético de consultas SQL.
+
+El vocabulario sale de la gramática: los operadores de comparación son las
+alternativas de la regla comp, los tipos de literal son los terminales de la
+regla value y cada literal generado se comprueba contra la expresión regular
+de su terminal. La forma de las consultas (columnas, profundidad y anchura
+del WHERE, mezcla AND/OR, ORDER BY) se controla con CorpusConfig.
+
+Uso:
+    python -m benchmarks.corpus [--queries N] [--seed N] [--where-depth N] ...
+"""
+
+from typing import Dict, List, Optional, Tuple
+import argparse
+import random
+import re
+
+from src.grammar.parser_registry import get_registry
+from src.grammar.sql_grammar import get_grammar
+
+
+class CorpusConfig:
+    #Parámetros de forma del corpus
+
+    def __init__(self, columns: Tuple[int, int] = (1, 6), star_rate: float = 0.1,
+                 where_rate: float = 0.9, where_depth: int = 2, where_width: Tuple[int, int] = (1, 4),
+                 nest_rate: float = 0.3, or_ratio: float = 0.3, not_rate: float = 0.05,
+                 literal_types: Optional[Tuple[str, ...]] = None, order_by_rate: float = 0.3,
+                 identifiers: int = 50):
+        """
+        Args:
+            columns (Tuple[int, int]): Mínimo y máximo de columnas en el SELECT
+            star_rate (float): Proporción de consultas con SELECT *
+            where_rate (float): Proporción de consultas con WHERE
+            where_depth (int): Niveles máximos de paréntesis anidados en el WHERE
+            where_width (Tuple[int, int]): Mínimo y máximo de operandos por nivel
+            nest_rate (float): Probabilidad de que un operando sea un grupo entre paréntesis
+            or_ratio (float): Proporción de OR frente a AND entre operandos
+            not_rate (float): Probabilidad de anteponer NOT a un operando
+            literal_types (Tuple[str]): Terminales de la regla value a usar
+                (por defecto, todos los de la gramática)
+            order_by_rate (float): Proporción de consultas con ORDER BY
+            identifiers (int): Tamaño del vocabulario de columnas y tablas
+        """
+        self.columns = columns
+        self.star_rate = star_rate
+        self.where_rate = where_rate
+        self.where_depth = where_depth
+        self.where_width = where_width
+        self.nest_rate = nest_rate
+        self.or_ratio = or_ratio
+        self.not_rate = not_rate
+        self.literal_types = literal_types
+        self.order_by_rate = order_by_rate
+        self.identifiers = identifiers
+
+    def to_dict(self) -> dict:
+        return dict(vars(self))
+
+
+class CorpusGenerator:
+    #Genera consultas válidas para la gramática con la forma pedida
+
+    def __init__(self, config: Optional[CorpusConfig] = None, seed: int = 0, ambiguous: bool = False):
+        """
+        Args:
+            config (CorpusConfig): Forma del corpus
+            seed (int): Semilla (el mismo valor da el mismo corpus)
+            ambiguous (bool): Tomar el vocabulario de la gramática ambigua
+        """
+        self.config = config or CorpusConfig()
+        self.random = random.Random(seed)
+
+        lark = get_registry().get_parser(get_grammar(ambiguous), parser=None, lexer='basic')
+        terminals = {t.name: t for t in lark.terminals}
+        expansions: Dict[str, List[List[str]]] = {}
+        for rule in lark.rules:
+            expansions.setdefault(str(rule.origin.name), []).append([str(s.name) for s in rule.expansion])
+
+        # Operadores: cada alternativa de comp es un terminal de cadena fija
+        self.operators = [terminals[expansion[0]].pattern.value for expansion in expansions['comp']]
+        available = [expansion[0] for expansion in expansions['value']]
+        wanted = self.config.literal_types or available
+        unknown = [name for name in wanted if name not in available]
+        if unknown:
+            raise ValueError(f"Tipos de literal que no están en la gramática: {', '.join(unknown)}")
+        self.literal_types = list(wanted)
+        self._patterns = {name: re.compile(terminals[name].pattern.to_regexp()) for name in self.literal_types}
+        self._patterns['CNAME'] = re.compile(terminals['CNAME'].pattern.to_regexp())
+
+    def _identifier(self) -> str:
+        return f"c{self.random.randrange(self.config.identifiers)}"
+
+    def _literal(self) -> str:
+        #Literal de un tipo elegido al azar, comprobado contra su terminal
+        kind = self.random.choice(self.literal_types)
+        rnd = self.random
+        if kind == 'NUMBER':
+            value = str(rnd.randrange(100000)) if rnd.random() < 0.8 else f"{rnd.random() * 1000:.2f}"
+        elif kind == 'STRING':
+            value = f'"s{rnd.randrange(1000)}"'
+        elif kind == 'SINGLE_STRING':
+            value = f"'v{rnd.randrange(1000)}'"
+        else:
+            value = self._identifier()
+        if not self._patterns[kind].fullmatch(value):
+            raise ValueError(f"El literal {value!r} no encaja con el terminal {kind}")
+        return value
+
+    def _predicate(self) -> str:
+        return f"{self._identifier()} {self.random.choice(self.operators)} {self._literal()}"
+
+    def _condition(self, level: int) -> str:
+        #Operandos de un nivel unidos por AND/OR; algunos son grupos anidados
+        config = self.config
+        rnd = self.random
+        parts = []
+        for i in range(rnd.randint(*config.where_width)):
+            if i:
+                parts.append("OR" if rnd.random() < config.or_ratio else "AND")
+            if level < config.where_depth and rnd.random() < config.nest_rate:
+                operand = f"({self._condition(level + 1)})"
+            else:
+                operand = self._predicate()
+            if rnd.random() < config.not_rate:
+                operand = "NOT " + operand
+            parts.append(operand)
+        return " ".join(parts)
+
+    def query(self) -> str:
+        #Genera una consulta
+        config = self.config
+        rnd = self.random
+        if rnd.random() < config.star_rate:
+            columns = "*"
+        else:
+            columns = ", ".join(self._identifier() for _ in range(rnd.randint(*config.columns)))
+        parts = [f"SELECT {columns} FROM t{rnd.randrange(config.identifiers)}"]
+        if rnd.random() < config.where_rate:
+            parts.append(f"WHERE {self._condition(0)}")
+        if rnd.random() < config.order_by_rate:
+            direction = rnd.choice(("", " ASC", " DESC"))
+            parts.append(f"ORDER BY {self._identifier()}{direction}")
+        return " ".join(parts)
+
+    def generate(self, count: int) -> List[str]:
+        #Genera count consultas
+        return [self.query() for _ in range(count)]
+
+
+def add_config_arguments(arg_parser: argparse.ArgumentParser):
+    #Opciones de línea de comandos comunes para CorpusConfig
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--columns", type=int, nargs=2, default=(1, 6), metavar=("MIN", "MAX"))
+    arg_parser.add_argument("--where-depth", type=int, default=2)
+    arg_parser.add_argument("--where-width", type=int, nargs=2, default=(1, 4), metavar=("MIN", "MAX"))
+    arg_parser.add_argument("--or-ratio", type=float, default=0.3)
+    arg_parser.add_argument("--literal-types", nargs="+", default=None)
+    arg_parser.add_argument("--order-by-rate", type=float, default=0.3)
+
+
+def config_from_args(args: argparse.Namespace) -> CorpusConfig:
+    return CorpusConfig(columns=tuple(args.columns), where_depth=args.where_depth,
+                        where_width=tuple(args.where_width), or_ratio=args.or_ratio,
+                        literal_types=tuple(args.literal_types) if args.literal_types else None,
+                        order_by_rate=args.order_by_rate)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Genera un corpus sintético de consultas SQL")
+    arg_parser.add_argument("--queries", type=int, default=20)
+    add_config_arguments(arg_parser)
+    args = arg_parser.parse_args()
+    for query in CorpusGenerator(config_from_args(args), args.seed).generate(args.queries):
+        print(query)
+
+
+if __name__ == "__main__":
+    main()
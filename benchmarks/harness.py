@@ -0,0 +1,231 @@
+"""
+Banco de pruebas de rendimiento sobre un corpus sintético.
+
+Mide rendimiento (consultas/s), latencia (p50, p90, p99, máximo) y pico de
+memoria de parse, validate_syntax, validate_query, check_ambiguity y de los
+métodos de ParseTree, con la gramática no ambigua y con la ambigua. El
+resultado se escribe en JSON para comparar ejecuciones.
+
+Uso:
+    python -m benchmarks.harness [--queries N] [--repeat N] [--output resultados.json]
+        [--compare referencia.json] [opciones del corpus, ver benchmarks.corpus]
+"""
+
+from typing import Callable, Dict, List, Optional
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import lark
+
+from src.parser import SQLParser, SQLValidator
+from .corpus import CorpusGenerator, add_config_arguments, config_from_args
+
+
+def _tree_helpers(tree) -> None:
+    #Métodos de consulta de ParseTree que usan los llamadores habituales
+    tree.get_depth()
+    tree.get_node_count()
+    tree.extract_columns()
+    tree.extract_table()
+    tree.extract_order_by()
+    tree.to_dict()
+    tree.get_pretty_string()
+
+
+def build_operations(grammar: str) -> Dict[str, Callable[[str], object]]:
+    """
+    Operaciones a medir para una gramática.
+
+    Args:
+        grammar (str): 'unambiguous' o 'ambiguous'
+
+    Returns:
+        Dict[str, Callable]: Nombre -> función que recibe la consulta
+    """
+    if grammar == 'unambiguous':
+        parser = SQLParser()
+        validator = SQLValidator()
+        operations = {
+            'parse': parser.parse,
+            'validate_syntax': parser.validate_syntax,
+            'validate_query': validator.validate_query,
+        }
+    else:
+        parser = SQLParser(ambiguous=True)
+        detector = SQLValidator()
+        operations = {
+            'parse': parser.parse,
+            'validate_syntax': parser.validate_syntax,
+            'check_ambiguity': detector.check_ambiguity,
+        }
+
+    def tree_helpers(query: str):
+        # Árbol nuevo en cada llamada (el parser no tiene caché de
+        # resultados): las métricas se memorizan por árbol
+        tree = parser.parse(query)
+        if tree is not None:
+            _tree_helpers(tree)
+
+    operations['tree_helpers'] = tree_helpers
+    return operations
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def measure(func: Callable[[str], object], queries: List[str], repeat: int) -> dict:
+    """
+    Mide una operación sobre el corpus.
+
+    La latencia se toma consulta a consulta; el pico de memoria, en una
+    pasada aparte con tracemalloc (que ralentiza la ejecución).
+
+    Returns:
+        dict: Métricas de la operación
+    """
+    for query in queries[:20]:
+        func(query)
+
+    latencies: List[float] = []
+    clock = time.perf_counter
+    gc.collect()
+    started = clock()
+    for _ in range(repeat):
+        for query in queries:
+            start = clock()
+            func(query)
+            latencies.append(clock() - start)
+    elapsed = clock() - started
+    latencies.sort()
+
+    gc.collect()
+    tracemalloc.start()
+    for query in queries:
+        func(query)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "calls": len(latencies),
+        "seconds": elapsed,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "latency_us": {
+            "mean": sum(latencies) / len(latencies) * 1e6,
+            "p50": percentile(latencies, 0.50) * 1e6,
+            "p90": percentile(latencies, 0.90) * 1e6,
+            "p99": percentile(latencies, 0.99) * 1e6,
+            "max": latencies[-1] * 1e6,
+        },
+        "peak_memory_bytes": peak,
+    }
+
+
+def environment() -> dict:
+    #Datos de la máquina y del código para poder comparar ejecuciones
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=False).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "lark": lark.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def run_suite(queries: List[str], repeat: int = 1, grammars=('unambiguous', 'ambiguous'),
+              operations: Optional[List[str]] = None) -> List[dict]:
+    """
+    Ejecuta todas las mediciones.
+
+    Args:
+        queries (List[str]): Corpus
+        repeat (int): Pasadas cronometradas sobre el corpus
+        grammars: Gramáticas a medir
+        operations (List[str]): Limitar a estas operaciones (None = todas)
+
+    Returns:
+        List[dict]: Una entrada por gramática y operación
+    """
+    results = []
+    for grammar in grammars:
+        for name, func in build_operations(grammar).items():
+            if operations and name not in operations:
+                continue
+            entry = {"grammar": grammar, "operation": name}
+            entry.update(measure(func, queries, repeat))
+            results.append(entry)
+            latency = entry["latency_us"]
+            print(f"{grammar:<12} {name:<16} {entry['throughput']:10.0f} /s   p50 {latency['p50']:9.1f} µs   "
+                  f"p99 {latency['p99']:9.1f} µs   pico {entry['peak_memory_bytes'] / 1024:9.1f} KiB", file=sys.stderr)
+    return results
+
+
+def compare(current: List[dict], baseline_path: str):
+    #Muestra la variación de rendimiento y de p99 respecto a una ejecución anterior
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(r["grammar"], r["operation"]): r for r in json.load(f)["results"]}
+    print(f"\nComparación con {baseline_path} (>1 = mejor que la referencia)", file=sys.stderr)
+    for entry in current:
+        previous = baseline.get((entry["grammar"], entry["operation"]))
+        if previous is None:
+            continue
+        speedup = entry["throughput"] / previous["throughput"] if previous["throughput"] else float('nan')
+        p99 = previous["latency_us"]["p99"] / entry["latency_us"]["p99"] if entry["latency_us"]["p99"] else float('nan')
+        print(f"{entry['grammar']:<12} {entry['operation']:<16} rendimiento x{speedup:5.2f}   p99 x{p99:5.2f}",
+              file=sys.stderr)
+
+
+def main(argv: Optional[List[str]] = None):
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--queries", type=int, default=500)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--grammar", choices=("unambiguous", "ambiguous", "both"), default="both")
+    arg_parser.add_argument("--operations", nargs="+", default=None)
+    arg_parser.add_argument("--output", help="Fichero JSON de resultados")
+    arg_parser.add_argument("--compare", help="Fichero JSON de una ejecución anterior")
+    add_config_arguments(arg_parser)
+    args = arg_parser.parse_args(argv)
+
+    logging.disable(logging.CRITICAL)
+    config = config_from_args(args)
+    queries = CorpusGenerator(config, args.seed).generate(args.queries)
+    grammars = ('unambiguous', 'ambiguous') if args.grammar == 'both' else (args.grammar,)
+
+    # El resumen va a stderr para que stdout sea solo el JSON cuando no hay --output
+    print(f"{len(queries)} consultas (semilla {args.seed}), {args.repeat} pasadas", file=sys.stderr)
+    results = run_suite(queries, args.repeat, grammars, args.operations)
+    report = {
+        "environment": environment(),
+        "corpus": {"queries": len(queries), "seed": args.seed, "config": config.to_dict()},
+        "repeat": args.repeat,
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en {args.output}", file=sys.stderr)
+    else:
+        json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Motor de filtrado en proceso: ejecuta las consultas parseadas sobre datos
+por columnas
+
+NumPy solo se importa al usar el evaluador vectorizado o el almacenamiento
+por columnas; el plan y el evaluador fila a fila no lo necesitan.
+"""
+
+from typing import TYPE_CHECKING
+import importlib
+
+# Nombre exportado -> submódulo que lo define
+_EXPORTS = {
+    'QueryPlan': '.plan',
+    'build_plan': '.plan',
+    'plan_query': '.plan',
+    'CompiledQuery': '.vectorized',
+    'compile_query': '.vectorized',
+    'execute_many': '.vectorized',
+    'RowEvaluator': '.row_engine',
+    'rows_from_columns': '.row_engine',
+    'save_columnar': '.columnar',
+    'load_columnar': '.columnar',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:
+    from .plan import QueryPlan, build_plan, plan_query
+    from .vectorized import CompiledQuery, compile_query, execute_many
+    from .row_engine import RowEvaluator, rows_from_columns
+    from .columnar import save_columnar, load_columnar
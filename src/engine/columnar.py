@@ -0,0 +1,83 @@
+# Almacenamiento por columnas en disco
+#
+# Una tabla es un directorio con un fichero .npy por columna y un
+# manifest.json con el orden de las columnas y el número de filas. Al
+# cargarla, las columnas se abren mapeadas en memoria: el evaluador
+# vectorizado lee solo las páginas de las columnas (y, con el cortocircuito,
+# de las filas) que necesita la consulta.
+#
+# Los textos se guardan como arrays de ancho fijo ('<U'), que sí se pueden
+# mapear; los arrays de objetos no.
+
+from typing import Dict, Mapping
+import json
+import os
+
+import numpy as np
+
+MANIFEST = 'manifest.json'
+
+
+def save_columnar(path: str, table: Mapping[str, object]) -> str:
+    """
+    Guarda una tabla por columnas.
+
+    Args:
+        path (str): Directorio de la tabla (se crea si no existe)
+        table (Mapping[str, array]): Columna -> valores (arrays o listas)
+
+    Returns:
+        str: Ruta del directorio
+
+    Raises:
+        ValueError: Si las columnas tienen longitudes distintas o un nombre
+            no sirve como nombre de fichero
+    """
+    columns = {}
+    for name, values in table.items():
+        if not name or os.sep in name or name.startswith('.'):
+            raise ValueError(f"Nombre de columna no válido: {name!r}")
+        array = np.asarray(values)
+        if array.dtype.kind == 'O':
+            array = array.astype(str)
+        columns[name] = array
+    sizes = {len(array) for array in columns.values()}
+    if len(sizes) > 1:
+        raise ValueError(f"Las columnas tienen longitudes distintas: {sorted(sizes)}")
+
+    os.makedirs(path, exist_ok=True)
+    for name, array in columns.items():
+        np.save(os.path.join(path, f"{name}.npy"), array, allow_pickle=False)
+    manifest = {'columns': list(columns), 'rows': sizes.pop() if sizes else 0}
+    # El manifiesto se escribe el último: una tabla a medias no se puede abrir
+    tmp_path = os.path.join(path, MANIFEST + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, os.path.join(path, MANIFEST))
+    return path
+
+
+def load_columnar(path: str, mmap: bool = True) -> Dict[str, np.ndarray]:
+    """
+    Abre una tabla guardada con save_columnar().
+
+    Args:
+        path (str): Directorio de la tabla
+        mmap (bool): Mapear las columnas en memoria (solo lectura) en lugar
+            de cargarlas
+
+    Returns:
+        Dict[str, ndarray]: Columna -> array, en el orden en que se guardaron
+
+    Raises:
+        ValueError: Si una columna no tiene el número de filas del manifiesto
+    """
+    with open(os.path.join(path, MANIFEST), encoding='utf-8') as f:
+        manifest = json.load(f)
+    table = {}
+    for name in manifest['columns']:
+        array = np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r' if mmap else None, allow_pickle=False)
+        if len(array) != manifest['rows']:
+            raise ValueError(f"La columna {name} tiene {len(array)} filas y el manifiesto {manifest['rows']}")
+        table[name] = array
+    return table
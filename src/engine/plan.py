@@ -0,0 +1,316 @@
+# Plan de ejecución de una consulta
+#
+# Traduce el árbol de la gramática no ambigua a una forma que los motores de
+# filtrado pueden evaluar. El árbol no basta por sí solo: Lark descarta las
+# cadenas anónimas, así que NOT, los paréntesis, el operador de comparación
+# (comp queda vacío) y ASC/DESC no aparecen. Se recuperan del texto que hay
+# entre los tokens de valor, usando sus posiciones:
+#
+# - el operador de un predicado está entre sus dos valores
+# - cada nodo de la condición abarca un tramo consecutivo de tokens de valor;
+#   un paréntesis envuelve al nodo cuyo tramo coincide con el suyo, y un NOT
+#   niega al paréntesis que le sigue o, si no hay, al predicado que empieza
+#   en el siguiente valor
+#
+# La condición se representa con tuplas:
+#   ('or', [hijos]) / ('and', [hijos]) / ('not', hijo)
+#   ('cmp', operador, izquierda, derecha), con operandos ('column', nombre)
+#   o ('literal', valor)
+
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
+import ast
+import logging
+import re
+import threading
+
+from ..parser.compact_tree import CompactTree
+from ..parser.parse_tree import ParseTree
+
+if TYPE_CHECKING:
+    from ..parser.sql_parser import SQLParser
+
+logger = logging.getLogger(__name__)
+
+# Operadores de comparación (<> y != son el mismo)
+COMPARISONS = ('=', '<>', '!=', '<', '>', '<=', '>=')
+
+# Lo único que puede haber entre dos valores de la condición (las palabras
+# clave pueden ir pegadas: ORDER antes que OR, como el lexer de Lark)
+_GAP_TOKEN = re.compile(r"\s*(NOT|AND|ORDER|OR|WHERE|BY|\(|\)|<>|!=|<=|>=|<|>|=)")
+
+_CONDITION_RULES = {'or_expr': 'or', 'and_expr': 'and'}
+
+
+class QueryPlan:
+    #Consulta lista para evaluar: tabla, proyección, condición y orden
+
+    __slots__ = ('table', 'columns', 'condition', 'order_by', 'descending')
+
+    def __init__(self, table: str, columns: Optional[List[str]], condition: Optional[tuple] = None,
+                 order_by: Optional[str] = None, descending: bool = False):
+        """
+        Args:
+            table (str): Tabla del FROM
+            columns (List[str]): Columnas del SELECT, o None para SELECT *
+            condition (tuple): Condición del WHERE (ver cabecera), o None
+            order_by (str): Columna del ORDER BY, o None
+            descending (bool): Si el ORDER BY es DESC
+        """
+        self.table = table
+        self.columns = columns
+        self.condition = condition
+        self.order_by = order_by
+        self.descending = descending
+
+    @classmethod
+    def from_tree(cls, tree: ParseTree) -> 'QueryPlan':
+        #Plan de un árbol de SQLParser (gramática no ambigua)
+        return build_plan(tree.compact_tree)
+
+    def referenced_columns(self) -> List[str]:
+        #Columnas que lee la consulta (sin repetir, en orden de aparición)
+        names = dict.fromkeys(self.columns or ())
+        if self.condition is not None:
+            stack = [self.condition]
+            while stack:
+                node = stack.pop()
+                if node[0] == 'cmp':
+                    for operand in node[2:]:
+                        if operand[0] == 'column':
+                            names[operand[1]] = None
+                elif node[0] == 'not':
+                    stack.append(node[1])
+                else:
+                    stack.extend(reversed(node[1]))
+        if self.order_by is not None:
+            names[self.order_by] = None
+        return list(names)
+
+    def __repr__(self):
+        return (f"QueryPlan(table={self.table!r}, columns={self.columns!r}, condition={self.condition!r}, "
+                f"order_by={self.order_by!r}, descending={self.descending!r})")
+
+
+def build_plan(compact: CompactTree, root: int = 0) -> QueryPlan:
+    """
+    Construye el plan de una consulta a partir de su árbol compacto.
+
+    Args:
+        compact (CompactTree): Árbol de la gramática no ambigua
+        root (int): Índice del nodo query
+
+    Returns:
+        QueryPlan: Plan de la consulta
+
+    Raises:
+        ValueError: Si el árbol no es de la gramática no ambigua o sus
+            tokens no tienen posición en el texto
+    """
+    if compact.name(root) != 'query':
+        raise ValueError(f"Se esperaba un nodo query, no {compact.name(root)}")
+    parts = {compact.name(child): child for child in compact.children(root)}
+    if 'columns' not in parts or 'table' not in parts:
+        raise ValueError("El árbol no tiene columnas o tabla")
+
+    columns = [_token_text(compact, compact.children(column)[0]) for column in compact.children(parts['columns'])]
+    table_token = compact.children(parts['table'])[0]
+    table = _token_text(compact, table_token)
+
+    order_by = None
+    descending = False
+    limit = len(compact.text)
+    if 'order_clause' in parts:
+        column_token = compact.children(compact.children(parts['order_clause'])[0])[0]
+        order_by = _token_text(compact, column_token)
+        limit, end = compact.span(column_token)
+        descending = compact.text[end:].strip() == 'DESC'
+
+    condition = None
+    if 'where_clause' in parts:
+        condition = _Condition(compact, compact.span(table_token)[1], limit).build(
+            compact.children(parts['where_clause'])[0])
+    return QueryPlan(table, columns or None, condition, order_by, descending)
+
+
+_default_parser: Optional['SQLParser'] = None
+_default_lock = threading.Lock()
+
+
+def plan_query(query: Union[str, ParseTree], parser: Optional['SQLParser'] = None) -> Optional[QueryPlan]:
+    """
+    Parsea una consulta (si hace falta) y construye su plan.
+
+    Args:
+        query: Consulta SQL o árbol de SQLParser
+        parser (SQLParser): Parser para las consultas en texto (por defecto
+            uno compartido de la gramática no ambigua con el backend nativo)
+
+    Returns:
+        QueryPlan: Plan de la consulta, o None si no se puede parsear
+    """
+    global _default_parser
+    if isinstance(query, ParseTree):
+        return QueryPlan.from_tree(query)
+    if parser is None:
+        with _default_lock:
+            if _default_parser is None:
+                from ..parser.sql_parser import SQLParser
+                _default_parser = SQLParser(backend='native')
+            parser = _default_parser
+            tree = parser.parse(query)
+    else:
+        tree = parser.parse(query)
+    if tree is None:
+        logger.error("No se puede compilar una consulta inválida: %s", query)
+        return None
+    return QueryPlan.from_tree(tree)
+
+
+def _token_text(compact: CompactTree, index: int) -> str:
+    #Valor de un token, comprobando que su posición apunta al texto
+    if not compact.is_token(index):
+        raise ValueError(f"Se esperaba un token, no {compact.name(index)}")
+    value = compact.value(index)
+    start, end = compact.span(index)
+    if compact.text[start:end] != value:
+        raise ValueError(f"El token {value!r} no tiene posición en el texto de la consulta")
+    return value
+
+
+def _literal(compact: CompactTree, token: int):
+    #Valor Python de un literal de la regla value
+    kind = compact.name(token)
+    text = _token_text(compact, token)
+    if kind == 'NUMBER':
+        try:
+            return int(text)
+        except ValueError:
+            return float(text)
+    if kind == 'STRING':
+        try:
+            return ast.literal_eval(text)
+        except (ValueError, SyntaxError):
+            return text[1:-1]
+    return text[1:-1]
+
+
+class _Condition:
+    #Reconstruye la condición del WHERE (árbol + texto entre los valores)
+
+    def __init__(self, compact: CompactTree, start: int, end: int):
+        """
+        Args:
+            compact (CompactTree): Árbol de la consulta
+            start (int): Posición desde la que empieza el WHERE en el texto
+            end (int): Posición en la que termina la condición (el texto
+                restante puede contener ORDER BY)
+        """
+        self.compact = compact
+        self.start = start
+        self.end = end
+        self.values: List[int] = []
+        self.positions: Dict[int, int] = {}
+        self.gaps: List[List[str]] = []
+        self.negations: Dict[Tuple[int, int], int] = {}
+
+    def build(self, node: int) -> tuple:
+        self._collect(node)
+        self.values.sort(key=lambda token: self.compact.span(token)[0])
+        self.positions = {token: i for i, token in enumerate(self.values)}
+        self.gaps = self._scan_gaps()
+        self.negations = self._negations()
+        return self._convert(node)
+
+    def _collect(self, node: int):
+        #Tokens de valor de la condición (sin recursión)
+        compact = self.compact
+        stack = [node]
+        while stack:
+            index = stack.pop()
+            if compact.name(index) == 'value':
+                self.values.append(compact.children(index)[0])
+            else:
+                stack.extend(compact.children(index))
+
+    def _scan_gaps(self) -> List[List[str]]:
+        #Signos y palabras clave antes de cada valor y tras el último
+        compact = self.compact
+        text = compact.text
+        gaps = []
+        previous = self.start
+        bounds = [compact.span(token) for token in self.values] + [(self.end, self.end)]
+        for start, end in bounds:
+            gap = []
+            pos = previous
+            while pos < start:
+                match = _GAP_TOKEN.match(text, pos, start)
+                if match is None:
+                    if text[pos:start].strip():
+                        raise ValueError(f"Texto inesperado en la condición: {text[pos:start]!r}")
+                    break
+                gap.append(match.group(1))
+                pos = match.end()
+            gaps.append(gap)
+            previous = end
+        return gaps
+
+    def _negations(self) -> Dict[Tuple[int, int], int]:
+        #NOT por tramo de valores: cada NOT niega al paréntesis o predicado siguiente
+        negations: Dict[Tuple[int, int], int] = {}
+        open_parens: List[Tuple[int, int]] = []
+        for position, gap in enumerate(self.gaps):
+            pending = 0
+            for token in gap:
+                if token == 'NOT':
+                    pending += 1
+                elif token == '(':
+                    open_parens.append((position, pending))
+                    pending = 0
+                elif token == ')':
+                    first, count = open_parens.pop()
+                    if count:
+                        key = (first, position - 1)
+                        negations[key] = negations.get(key, 0) + count
+            if pending:
+                key = (position, position + 1)
+                negations[key] = negations.get(key, 0) + pending
+        return negations
+
+    def _convert(self, node: int) -> tuple:
+        compact = self.compact
+        name = compact.name(node)
+        if name == 'predicate':
+            left, _, right = compact.children(node)
+            first = self.positions[compact.children(left)[0]]
+            operator = ''.join(token for token in self.gaps[first + 1] if token in COMPARISONS)
+            if operator not in COMPARISONS:
+                raise ValueError(f"Operador de comparación no reconocido: {operator!r}")
+            result = ('cmp', '!=' if operator == '<>' else operator, self._operand(left), self._operand(right))
+            span = (first, first + 1)
+        elif name in _CONDITION_RULES:
+            children = [self._convert(child) for child in compact.children(node)]
+            result = (_CONDITION_RULES[name], children)
+            span = self._span(node)
+        else:
+            raise ValueError(f"Regla de condición no soportada: {name} (¿gramática ambigua?)")
+        if self.negations.get(span, 0) % 2:
+            result = ('not', result)
+        return result
+
+    def _span(self, node: int) -> Tuple[int, int]:
+        #Primer y último valor que abarca un nodo
+        compact = self.compact
+        first = node
+        while not compact.is_token(first):
+            first = compact.children(first)[0]
+        last = node
+        while not compact.is_token(last):
+            children = compact.children(last)
+            last = children[len(children) - 1]
+        return self.positions[first], self.positions[last]
+
+    def _operand(self, value: int) -> tuple:
+        token = self.compact.children(value)[0]
+        if self.compact.name(token) == 'CNAME':
+            return 'column', _token_text(self.compact, token)
+        return 'literal', _literal(self.compact, token)
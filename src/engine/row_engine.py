@@ -0,0 +1,127 @@
+# Evaluación fila a fila (referencia)
+#
+# Misma semántica que CompiledQuery, pero en Python puro: la condición se
+# convierte en clausuras que se llaman una vez por fila. Sirve de referencia
+# para comprobar el evaluador vectorizado y como línea base en los
+# benchmarks. Las comparaciones siguen las reglas de Python (comparar un
+# número con un texto con < lanza TypeError).
+
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional
+import operator
+
+from .plan import QueryPlan
+
+_OPERATORS = {
+    '=': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '>': operator.gt,
+    '<=': operator.le,
+    '>=': operator.ge,
+}
+
+Row = Mapping[str, object]
+
+
+class RowEvaluator:
+    #Evaluador de una consulta fila a fila
+
+    __slots__ = ('plan', '_matches')
+
+    def __init__(self, plan: QueryPlan):
+        """
+        Args:
+            plan (QueryPlan): Plan de la consulta
+        """
+        self.plan = plan
+        self._matches: Optional[Callable[[Row], bool]] = None
+        if plan.condition is not None:
+            self._matches = _compile(plan.condition)
+
+    def matches(self, row: Row) -> bool:
+        #Si la fila cumple el WHERE
+        return self._matches is None or self._matches(row)
+
+    def execute(self, rows: Iterable[Row]) -> List[int]:
+        """
+        Evalúa el WHERE y el ORDER BY.
+
+        Args:
+            rows (Iterable[Mapping]): Filas (columna -> valor)
+
+        Returns:
+            List[int]: Posiciones de las filas seleccionadas, en el orden del
+                ORDER BY (estable, como CompiledQuery.execute)
+        """
+        matches = self._matches
+        order_by = self.plan.order_by
+        selected = []
+        keys = []
+        for position, row in enumerate(rows):
+            if matches is None or matches(row):
+                selected.append(position)
+                if order_by is not None:
+                    keys.append(row[order_by])
+        if order_by is None:
+            return selected
+        order = sorted(range(len(selected)), key=keys.__getitem__, reverse=self.plan.descending)
+        return [selected[i] for i in order]
+
+    def select(self, rows: Iterable[Row]) -> List[Dict[str, object]]:
+        #Filas seleccionadas y ordenadas con las columnas del SELECT
+        rows = list(rows)
+        names = self.plan.columns
+        result = []
+        for position in self.execute(rows):
+            row = rows[position]
+            result.append(dict(row) if names is None else {name: row[name] for name in names})
+        return result
+
+
+def rows_from_columns(table: Mapping[str, Iterable]) -> Iterator[Dict[str, object]]:
+    #Recorre una tabla por columnas (p. ej. arrays de NumPy) como filas de valores Python
+    names = list(table)
+    columns = [column.tolist() if hasattr(column, 'tolist') else list(column) for column in table.values()]
+    for values in zip(*columns):
+        yield dict(zip(names, values))
+
+
+def _compile(node: tuple) -> Callable[[Row], bool]:
+    #Clausura que evalúa un nodo de la condición sobre una fila
+    kind = node[0]
+    if kind == 'cmp':
+        return _compile_comparison(node)
+    if kind == 'not':
+        child = _compile(node[1])
+        return lambda row: not child(row)
+
+    children = [_compile(child) for child in node[1]]
+    if kind == 'and':
+        def evaluate(row):
+            for child in children:
+                if not child(row):
+                    return False
+            return True
+    else:
+        def evaluate(row):
+            for child in children:
+                if child(row):
+                    return True
+            return False
+    return evaluate
+
+
+def _compile_comparison(node: tuple) -> Callable[[Row], bool]:
+    _, name, left, right = node
+    compare = _OPERATORS[name]
+    if left[0] == 'column' and right[0] == 'column':
+        left_column, right_column = left[1], right[1]
+        return lambda row: compare(row[left_column], row[right_column])
+    if left[0] == 'column':
+        column, literal = left[1], right[1]
+        return lambda row: compare(row[column], literal)
+    if right[0] == 'column':
+        literal, column = left[1], right[1]
+        return lambda row: compare(literal, row[column])
+    result = compare(left[1], right[1])
+    return lambda row: result
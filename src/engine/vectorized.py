@@ -0,0 +1,339 @@
+# Evaluación vectorizada de consultas con NumPy
+#
+# La condición del WHERE se evalúa sobre columnas (arrays de NumPy, o arrays
+# mapeados en memoria de load_columnar()) y produce una máscara booleana.
+# AND y OR se evalúan en cortocircuito sobre subconjuntos: cada operando solo
+# mira las filas que aún pueden cambiar el resultado (las que siguen siendo
+# ciertas en un AND, las que siguen siendo falsas en un OR), recogidas con
+# indexado por índices. Recoger no es gratis: con 2M filas, comparar una
+# columna numérica completa cuesta ~0.4 ns/fila y solo calcular los índices
+# pendientes ya cuesta ~0.7 ns/fila, mientras que comparar textos de ancho
+# fijo cuesta ~8 ns/fila. Por eso se usa un modelo de coste: los operandos de
+# AND/OR se evalúan de más baratos a más caros (el resultado no depende del
+# orden) y un operando solo se evalúa sobre el subconjunto cuando sale más
+# barato que sobre la columna completa. ORDER BY es un argsort estable.
+#
+# execute_many() ejecuta un lote de consultas sobre la misma tabla y evalúa
+# una sola vez los predicados que se repiten entre ellas: cada uno se calcula
+# sobre la columna completa la primera vez que hace falta y las demás
+# consultas reutilizan su máscara.
+
+from collections import Counter
+from typing import TYPE_CHECKING, Dict, Iterable, List, Mapping, Optional, Union
+
+import numpy as np
+
+from .plan import QueryPlan, plan_query
+
+if TYPE_CHECKING:
+    from ..parser.parse_tree import ParseTree
+    from ..parser.sql_parser import SQLParser
+
+# Coste por fila, en comparaciones numéricas, de calcular los índices
+# pendientes (sobre todas las filas) y de devolver el resultado de cada fila
+# pendiente a la máscara. Recoger una fila cuesta más o menos lo que
+# compararla dos veces (se copian sus bytes)
+_SCAN_COST = 2.0
+_SCATTER_COST = 4.0
+
+# Coste por fila de un predicado compartido ya calculado (leer su máscara)
+_SHARED_COST = 0.1
+
+_UFUNCS = {
+    '=': np.equal,
+    '!=': np.not_equal,
+    '<': np.less,
+    '>': np.greater,
+    '<=': np.less_equal,
+    '>=': np.greater_equal,
+}
+
+Table = Mapping[str, np.ndarray]
+
+
+class CompiledQuery:
+    #Consulta compilada a un evaluador vectorizado sobre columnas
+
+    __slots__ = ('plan', 'dense_fraction')
+
+    def __init__(self, plan: QueryPlan, dense_fraction: Optional[float] = None):
+        """
+        Args:
+            plan (QueryPlan): Plan de la consulta
+            dense_fraction (float): Fija la fracción de filas pendientes a
+                partir de la cual AND/OR evalúan el siguiente operando sobre
+                la columna completa (0 = siempre completa, 1 = siempre el
+                subconjunto); por defecto se decide con el modelo de coste
+        """
+        self.plan = plan
+        self.dense_fraction = dense_fraction
+
+    def filter(self, table: Table) -> np.ndarray:
+        """
+        Evalúa el WHERE.
+
+        Args:
+            table (Mapping[str, ndarray]): Columna -> array (todas de igual longitud)
+
+        Returns:
+            ndarray: Máscara booleana de las filas que cumplen la condición
+
+        Raises:
+            ValueError: Si falta una columna, las longitudes no coinciden o
+                se comparan números con cadenas
+        """
+        return self._filter(table, None)
+
+    def _filter(self, table: Table, shared: Optional[dict]) -> np.ndarray:
+        size = _row_count(table, self.plan.referenced_columns())
+        if self.plan.condition is None:
+            return np.ones(size, dtype=bool)
+        evaluator = _Evaluator(table, size, self.dense_fraction, shared)
+        return evaluator.evaluate(evaluator.prepare(self.plan.condition), None)
+
+    def execute(self, table: Table) -> np.ndarray:
+        """
+        Evalúa el WHERE y el ORDER BY.
+
+        Args:
+            table (Mapping[str, ndarray]): Columna -> array
+
+        Returns:
+            ndarray: Índices de las filas seleccionadas, en el orden del
+                ORDER BY (estable: los empates conservan el orden de la tabla)
+        """
+        return self._execute(table, None)
+
+    def _execute(self, table: Table, shared: Optional[dict]) -> np.ndarray:
+        rows = np.flatnonzero(self._filter(table, shared))
+        if self.plan.order_by is None or len(rows) < 2:
+            return rows
+        values = table[self.plan.order_by][rows]
+        if self.plan.descending:
+            # Descendente y estable: se ordena la secuencia invertida
+            order = np.argsort(values[::-1], kind='stable')[::-1]
+            order = len(rows) - 1 - order
+        else:
+            order = np.argsort(values, kind='stable')
+        return rows[order]
+
+    def select(self, table: Table) -> Dict[str, np.ndarray]:
+        """
+        Ejecuta la consulta completa.
+
+        Args:
+            table (Mapping[str, ndarray]): Columna -> array
+
+        Returns:
+            Dict[str, ndarray]: Columnas del SELECT (todas con SELECT *) con
+                las filas seleccionadas y ordenadas
+        """
+        rows = self.execute(table)
+        names = self.plan.columns if self.plan.columns is not None else list(table)
+        missing = [name for name in names if name not in table]
+        if missing:
+            raise ValueError(f"Columnas desconocidas: {', '.join(missing)}")
+        return {name: np.asarray(table[name])[rows] for name in names}
+
+    def __repr__(self):
+        return f"CompiledQuery({self.plan!r})"
+
+
+def compile_query(query: Union[str, 'ParseTree', QueryPlan],
+                  parser: Optional['SQLParser'] = None) -> Optional[CompiledQuery]:
+    """
+    Compila una consulta a un evaluador vectorizado.
+
+    Args:
+        query: Consulta SQL, árbol de SQLParser o plan ya construido
+        parser (SQLParser): Parser para las consultas en texto (por defecto
+            uno de la gramática no ambigua con el backend nativo)
+
+    Returns:
+        CompiledQuery: Consulta compilada, o None si no se puede parsear
+    """
+    plan = query if isinstance(query, QueryPlan) else plan_query(query, parser)
+    return CompiledQuery(plan) if plan is not None else None
+
+
+def execute_many(queries: Iterable[Union[CompiledQuery, QueryPlan]], table: Table) -> List[np.ndarray]:
+    """
+    Ejecuta varias consultas sobre la misma tabla evaluando una sola vez cada
+    predicado que aparece en más de una.
+
+    Args:
+        queries (Iterable[CompiledQuery | QueryPlan]): Consultas del lote
+        table (Mapping[str, ndarray]): Columna -> array
+
+    Returns:
+        List[ndarray]: Resultado de execute() de cada consulta, en orden
+    """
+    compiled = [query if isinstance(query, CompiledQuery) else CompiledQuery(query) for query in queries]
+    counts = Counter()
+    for query in compiled:
+        # Un predicado repetido dentro de la misma consulta también se comparte
+        counts.update(_predicates(query.plan.condition))
+    shared = {predicate: None for predicate, count in counts.items() if count > 1}
+    return [query._execute(table, shared if shared else None) for query in compiled]
+
+
+def _predicates(node: Optional[tuple]) -> List[tuple]:
+    #Predicados (nodos cmp) de una condición
+    found = []
+    stack = [node] if node is not None else []
+    while stack:
+        current = stack.pop()
+        if current[0] == 'cmp':
+            found.append(current)
+        elif current[0] == 'not':
+            stack.append(current[1])
+        else:
+            stack.extend(current[1])
+    return found
+
+
+def _row_count(table: Table, names: List[str]) -> int:
+    #Filas de la tabla, comprobando las columnas que usa la consulta
+    missing = [name for name in names if name not in table]
+    if missing:
+        raise ValueError(f"Columnas desconocidas: {', '.join(missing)}")
+    sizes = {len(table[name]) for name in names} or {len(column) for column in table.values()}
+    if len(sizes) > 1:
+        raise ValueError(f"Las columnas tienen longitudes distintas: {sorted(sizes)}")
+    return sizes.pop() if sizes else 0
+
+
+def _is_text(value) -> Optional[bool]:
+    #Si un operando es texto (True), número (False) o no se sabe (None)
+    if isinstance(value, np.ndarray):
+        kind = value.dtype.kind
+        if kind in 'USa':
+            return True
+        return False if kind in 'biuf' else None
+    return isinstance(value, str)
+
+
+def _column_cost(column: np.ndarray) -> float:
+    #Coste por fila de comparar una columna (1 = columna numérica)
+    kind = column.dtype.kind
+    if kind in 'biuf':
+        return 1.0
+    if kind in 'USa':
+        # Los textos de ancho fijo se comparan byte a byte
+        return float(max(column.dtype.itemsize, 1))
+    return 50.0
+
+
+class _Evaluator:
+    #Evaluación de una condición sobre una tabla
+
+    __slots__ = ('table', 'size', 'dense_fraction', 'shared')
+
+    def __init__(self, table: Table, size: int, dense_fraction: Optional[float], shared: Optional[dict] = None):
+        """
+        Args:
+            table (Mapping[str, ndarray]): Columna -> array
+            size (int): Filas de la tabla
+            dense_fraction (float): Ver CompiledQuery
+            shared (dict): Predicado compartido -> máscara sobre la tabla
+                completa (None mientras no se ha calculado)
+        """
+        self.table = table
+        self.size = size
+        self.dense_fraction = dense_fraction
+        self.shared = shared
+
+    def prepare(self, node: tuple) -> tuple:
+        """
+        Comprueba los tipos de la condición y le añade el coste por fila.
+
+        Todos los predicados se comprueban antes de evaluar, así que un error
+        de tipos no depende de lo que descarte el cortocircuito.
+
+        Args:
+            node (tuple): Nodo de la condición (ver plan.py)
+
+        Returns:
+            tuple: (coste, tipo, datos): ('cmp', nodo), ('not', hijo) o
+                ('and'/'or', hijos ordenados de más baratos a más caros)
+        """
+        kind = node[0]
+        if kind == 'cmp':
+            operands = [self.table[operand[1]] if operand[0] == 'column' else operand[1] for operand in node[2:]]
+            types = [_is_text(operand) for operand in operands]
+            if None not in types and types[0] != types[1]:
+                raise ValueError(f"No se puede comparar texto con números en {node!r}")
+            if self.shared is not None and self.shared.get(node) is not None:
+                return _SHARED_COST, kind, node
+            cost = sum(_column_cost(operand) for operand in operands if isinstance(operand, np.ndarray))
+            return max(cost, 1.0), kind, node
+        if kind == 'not':
+            child = self.prepare(node[1])
+            return child[0], kind, child
+        children = sorted((self.prepare(child) for child in node[1]), key=lambda child: child[0])
+        return sum(child[0] for child in children), kind, children
+
+    def evaluate(self, node: tuple, rows: Optional[np.ndarray]) -> np.ndarray:
+        """
+        Args:
+            node (tuple): Nodo preparado con prepare()
+            rows (ndarray): Índices de las filas a evaluar, o None para todas
+
+        Returns:
+            ndarray: Máscara booleana alineada con rows (o con la tabla)
+        """
+        _, kind, data = node
+        if kind == 'cmp':
+            return self._compare(data, rows)
+        if kind == 'not':
+            return ~self.evaluate(data, rows)
+
+        # AND: pendientes = filas aún ciertas; OR: filas aún falsas
+        is_and = kind == 'and'
+        mask = self.evaluate(data[0], rows)
+        total = len(mask)
+        for child in data[1:]:
+            count = np.count_nonzero(mask)
+            pending = count if is_and else total - count
+            if not pending:
+                break
+            if self._use_subset(child[0], pending, total):
+                positions = np.flatnonzero(mask if is_and else ~mask)
+                mask[positions] = self.evaluate(child, positions if rows is None else rows[positions])
+            else:
+                result = self.evaluate(child, rows)
+                if is_and:
+                    mask &= result
+                else:
+                    mask |= result
+        return mask
+
+    def _use_subset(self, cost: float, pending: int, total: int) -> bool:
+        #Si sale más barato evaluar el operando solo sobre las filas pendientes
+        if self.dense_fraction is not None:
+            return pending <= total * self.dense_fraction
+        return total * _SCAN_COST + pending * (3 * cost + _SCATTER_COST) < total * cost
+
+    def _compare(self, node: tuple, rows: Optional[np.ndarray]) -> np.ndarray:
+        if self.shared is not None and node in self.shared:
+            mask = self.shared[node]
+            if mask is None:
+                mask = self.shared[node] = self._compare_rows(node, None)
+            # Copia: AND y OR modifican la máscara que reciben
+            return mask.copy() if rows is None else mask[rows]
+        return self._compare_rows(node, rows)
+
+    def _compare_rows(self, node: tuple, rows: Optional[np.ndarray]) -> np.ndarray:
+        _, operator, left, right = node
+        result = _UFUNCS[operator](self._operand(left, rows), self._operand(right, rows))
+        if np.ndim(result) == 0:
+            # Comparación entre dos literales
+            return np.full(self.size if rows is None else len(rows), bool(result))
+        # Las columnas de objetos pueden dar un array de objetos
+        return result if result.dtype == bool else result.astype(bool)
+
+    def _operand(self, operand: tuple, rows: Optional[np.ndarray]):
+        if operand[0] == 'literal':
+            return operand[1]
+        column = self.table[operand[1]]
+        return column if rows is None else column[rows]
@@ -1,5 +1,8 @@
 #Módulo de definición y gestión de gramáticas SQL
+#Los nombres que dependen de Lark se importan la primera vez que se usan
 
+from typing import TYPE_CHECKING
+import importlib
 
 from .sql_grammar import (
     SQL_GRAMMAR_AMBIGUOUS,
@@ -7,8 +10,36 @@ from .sql_grammar import (
     get_grammar
 )
 
+# Nombre exportado -> submódulo que lo define
+_LAZY_EXPORTS = {
+    'GrammarCache': '.grammar_cache',
+    'ParserRegistry': '.parser_registry',
+    'get_registry': '.parser_registry',
+}
+
 __all__ = [
     'SQL_GRAMMAR_AMBIGUOUS',
     'SQL_GRAMMAR_UNAMBIGUOUS',
     'get_grammar',
+    'GrammarCache',
+    'ParserRegistry',
+    'get_registry',
 ]
+
+
+def __getattr__(name: str):
+    module = _LAZY_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:
+    from .grammar_cache import GrammarCache
+    from .parser_registry import ParserRegistry, get_registry
@@ -0,0 +1,165 @@
+# Caché persistente en disco de gramáticas compiladas
+#
+# Guarda las tablas LALR serializadas por Lark (y, para Earley, la gramática
+# ya cargada) en un directorio versionado para que los procesos nuevos no
+# tengan que recompilar la gramática al arrancar. Las entradas se invalidan solas cuando cambia sql_grammar.py,
+# la versión de Lark o el formato de la caché.
+#
+# Estructura: <base>/v<formato>/lark-<versión>-py<versión>/<digest de sql_grammar.py>/
+# Cada combinación de Lark y Python tiene su propio directorio, de modo que
+# varios entornos pueden compartir la caché sin borrarse las entradas.
+
+from lark import Lark, __version__ as LARK_VERSION
+from typing import Optional
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+
+from . import sql_grammar
+
+logger = logging.getLogger(__name__)
+
+# Incrementar si cambia la forma de serializar las entradas
+CACHE_FORMAT_VERSION = 1
+
+# Variable de entorno para activar la caché sin tocar el código
+CACHE_DIR_ENV = "SQL_PARSER_CACHE_DIR"
+
+
+def _default_cache_dir() -> str:
+    #Directorio por defecto: $XDG_CACHE_HOME/sql_parser o ~/.cache/sql_parser
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "sql_parser")
+
+
+def _environment_name() -> str:
+    #Nombre del directorio del entorno que afecta a la serialización
+    return f"lark-{LARK_VERSION}-py{sys.version_info[0]}.{sys.version_info[1]}"
+
+
+def _source_digest() -> str:
+    #Digest del fichero de gramáticas
+    with open(sql_grammar.__file__, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+class GrammarCache:
+    #Caché en disco de gramáticas compiladas
+    #
+    # Lark solo sabe serializar parsers LALR completos. Para Earley se guarda
+    # la gramática ya cargada (objeto Grammar), que es la parte cara de
+    # construir, y el parser se monta a partir de ella al cargar.
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        """
+        Inicializa la caché.
+
+        Args:
+            cache_dir (str): Directorio base. Si es None se usa
+                $SQL_PARSER_CACHE_DIR o el directorio de caché del usuario.
+        """
+        base_dir = cache_dir or os.environ.get(CACHE_DIR_ENV) or _default_cache_dir()
+        self.base_dir = os.path.join(base_dir, f"v{CACHE_FORMAT_VERSION}", _environment_name())
+        self.namespace = _source_digest()
+        self.cache_dir = os.path.join(self.base_dir, self.namespace)
+        self._prune_stale()
+
+    def _prune_stale(self):
+        #Elimina los espacios de nombres de este entorno generados con otra versión
+        #de sql_grammar.py (los de otras versiones de Lark o Python se conservan)
+        if not os.path.isdir(self.base_dir):
+            return
+        for name in os.listdir(self.base_dir):
+            if name == self.namespace:
+                continue
+            stale = os.path.join(self.base_dir, name)
+            logger.info("Eliminando caché de gramáticas obsoleta: %s", stale)
+            shutil.rmtree(stale, ignore_errors=True)
+
+    @staticmethod
+    def make_key(grammar_string: str, **options) -> str:
+        """
+        Calcula la clave de una entrada a partir del contenido y las opciones.
+
+        Args:
+            grammar_string (str): Definición de la gramática
+            **options: Opciones con las que se compila la gramática
+
+        Returns:
+            str: Hash hexadecimal de la entrada
+        """
+        hasher = hashlib.sha256(grammar_string.encode('utf-8'))
+        hasher.update(json.dumps(options, sort_keys=True).encode('utf-8'))
+        return hasher.hexdigest()
+
+    def _path_for(self, key: str, **options) -> str:
+        suffix = "lark" if options.get('parser') == 'lalr' else "grammar"
+        return os.path.join(self.cache_dir, f"{key}.{suffix}")
+
+    def load(self, grammar_string: str, **options) -> Optional[Lark]:
+        """
+        Carga un parser compilado desde disco.
+
+        Args:
+            grammar_string (str): Definición de la gramática
+            **options: Opciones con las que se compiló
+
+        Returns:
+            Lark: Parser deserializado, o None si no está en caché
+        """
+        path = self._path_for(self.make_key(grammar_string, **options), **options)
+        try:
+            with open(path, 'rb') as f:
+                if options.get('parser') == 'lalr':
+                    return Lark.load(f)
+                return Lark(pickle.load(f), **options)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            # Entrada corrupta o incompatible: se descarta y se recompila
+            logger.warning("Entrada de caché inválida %s: %s", path, e)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+    def store(self, compiled: Lark, grammar_string: str, **options) -> bool:
+        """
+        Guarda un parser compilado en disco.
+
+        Args:
+            compiled (Lark): Parser compilado
+            grammar_string (str): Definición de la gramática
+            **options: Opciones con las que se compiló
+
+        Returns:
+            bool: True si se guardó la entrada
+        """
+        path = self._path_for(self.make_key(grammar_string, **options), **options)
+        tmp_path = None
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Escritura atómica: otros procesos nunca ven un fichero a medias
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, 'wb') as f:
+                if options.get('parser') == 'lalr':
+                    compiled.save(f)
+                else:
+                    pickle.dump(compiled.grammar, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            return True
+        except Exception as e:
+            logger.warning("No se pudo guardar la gramática en caché: %s", e)
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+    def clear(self):
+        #Elimina todas las entradas de la caché de este entorno
+        shutil.rmtree(self.base_dir, ignore_errors=True)
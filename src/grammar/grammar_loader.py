@@ -5,13 +5,16 @@ from lark.exceptions import GrammarError
 from typing import Optional
 import logging
 
+from .parser_registry import ParserRegistry, get_registry
+
 logger = logging.getLogger(__name__)
 
 #clase para cargar y validar gramaticas para el parser
 class GrammarLoader:
 
-    def __init__(self):
-        self._cached_parsers = {}
+    def __init__(self, registry: Optional[ParserRegistry] = None):
+        # Por defecto se comparte el registro global del proceso
+        self._registry = registry if registry is not None else get_registry()
 
     def load_grammar(self, grammar_string: str, start_symbol: str = "query") -> Optional[Lark]:
         """
@@ -21,24 +24,17 @@ class GrammarLoader:
             start_symbol (str): Símbolo inicial de la gramática 
         Returns: Lark: Parser configurado, o None si hay error
         """
-        cache_key = hash(grammar_string + start_symbol)
-
-        if cache_key in self._cached_parsers:
-            logger.debug("Usando gramática en caché")
-            return self._cached_parsers[cache_key]
-        
         try:
-            parser = Lark(
+            parser = self._registry.get_parser(
                 grammar_string,
                 start=start_symbol,
                 parser='earley',  # Earley maneja ambigüedad
                 ambiguity='explicit'  # Detecta ambigüedad
             )
-            self._cached_parsers[cache_key] = parser
-            logger.info(f"Gramática cargada exitosamente (símbolo inicial: {start_symbol})")
+            logger.info("Gramática cargada exitosamente (símbolo inicial: %s)", start_symbol)
             return parser
         except GrammarError as e:
-            logger.error(f"Error en la gramática: {e}")
+            logger.error("Error en la gramática: %s", e)
             return None
         
     def validate_grammar(self, grammar_string: str) -> tuple[bool, str]:
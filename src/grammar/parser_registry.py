@@ -0,0 +1,202 @@
+# Registro global de parsers compilados
+#
+# Compilar una gramática con Lark es caro (análisis de la gramática, tablas
+# LALR, lexer). El registro guarda una única instancia por configuración y la
+# comparte entre SQLParser, SQLValidator y GrammarLoader.
+
+from lark import Lark
+from typing import Dict, Optional, Tuple
+import hashlib
+import logging
+import os
+import threading
+import time
+
+from .grammar_cache import CACHE_DIR_ENV, GrammarCache
+from .precompiled import load_precompiled
+
+logger = logging.getLogger(__name__)
+
+# (digest de la gramática, símbolo inicial, algoritmo, ambigüedad, lexer)
+RegistryKey = Tuple[str, str, Optional[str], str, str]
+
+
+def grammar_digest(grammar_string: str) -> str:
+    #Retorna el digest SHA-256 del texto de la gramática
+    return hashlib.sha256(grammar_string.encode('utf-8')).hexdigest()
+
+
+class ParserRegistry:
+    #Registro thread-safe de instancias de Lark compiladas
+
+    def __init__(self, disk_cache: Optional[GrammarCache] = None):
+        """
+        Inicializa el registro.
+
+        Args:
+            disk_cache (GrammarCache): Caché persistente opcional para las
+                gramáticas compiladas
+        """
+        self.disk_cache = disk_cache
+        self._parsers: Dict[RegistryKey, Lark] = {}
+        self._lock = threading.Lock()
+        # Un lock por clave para que dos hilos no compilen lo mismo a la vez
+        self._key_locks: Dict[RegistryKey, threading.Lock] = {}
+        self._hits = 0
+        self._misses = 0
+        self._compile_time = 0.0
+        self._disk_hits = 0
+        self._precompiled_hits = 0
+
+    def enable_disk_cache(self, cache_dir: Optional[str] = None) -> GrammarCache:
+        """
+        Activa la caché persistente en disco.
+
+        Args:
+            cache_dir (str): Directorio base de la caché
+
+        Returns:
+            GrammarCache: Caché activada
+        """
+        self.disk_cache = GrammarCache(cache_dir)
+        return self.disk_cache
+
+    def disable_disk_cache(self):
+        #Desactiva la caché persistente en disco
+        self.disk_cache = None
+
+    @staticmethod
+    def make_key(grammar_string: str, start: str = "query", parser: Optional[str] = "earley",
+                 ambiguity: str = "auto", lexer: str = "auto") -> RegistryKey:
+        """
+        Construye la clave del registro.
+
+        Args:
+            grammar_string (str): Definición de la gramática
+            start (str): Símbolo inicial
+            parser (str): Algoritmo ('lalr', 'earley' o None para solo lexer)
+            ambiguity (str): Modo de ambigüedad de Earley
+            lexer (str): Tipo de lexer
+
+        Returns:
+            RegistryKey: Clave que identifica la configuración
+        """
+        return (grammar_digest(grammar_string), start, parser, ambiguity, lexer)
+
+    def get_parser(self, grammar_string: str, start: str = "query", parser: Optional[str] = "earley",
+                   ambiguity: str = "auto", lexer: str = "auto") -> Lark:
+        """
+        Retorna el parser compilado para la configuración, compilándolo si hace falta.
+
+        Args:
+            grammar_string (str): Definición de la gramática
+            start (str): Símbolo inicial
+            parser (str): Algoritmo ('lalr', 'earley' o None para solo lexer)
+            ambiguity (str): Modo de ambigüedad de Earley
+            lexer (str): Tipo de lexer
+
+        Returns:
+            Lark: Parser compilado
+
+        Raises:
+            GrammarError: Si la gramática no es válida para la configuración
+        """
+        key = self.make_key(grammar_string, start, parser, ambiguity, lexer)
+
+        cached = self._parsers.get(key)
+        if cached is not None:
+            with self._lock:
+                self._hits += 1
+            return cached
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Otro hilo pudo compilarlo mientras esperábamos
+            cached = self._parsers.get(key)
+            if cached is not None:
+                with self._lock:
+                    self._hits += 1
+                return cached
+
+            start_time = time.perf_counter()
+            compiled = self._compile(grammar_string, start, parser, ambiguity, lexer)
+            elapsed = time.perf_counter() - start_time
+
+            with self._lock:
+                self._parsers[key] = compiled
+                self._misses += 1
+                self._compile_time += elapsed
+
+        logger.debug("Gramática compilada en %.1f ms (algoritmo=%s, lexer=%s)", elapsed * 1000, parser, lexer)
+        return compiled
+
+    def _compile(self, grammar_string: str, start: str, parser: Optional[str], ambiguity: str, lexer: str) -> Lark:
+        #Compila la gramática con Lark, salvo que haya un parser precompilado o esté en la caché en disco
+        options = {'start': start, 'parser': parser, 'lexer': lexer}
+        if parser == 'earley':
+            options['ambiguity'] = ambiguity
+
+        precompiled = load_precompiled(grammar_string, **options)
+        if precompiled is not None:
+            with self._lock:
+                self._precompiled_hits += 1
+            return precompiled
+
+        disk_cache = self.disk_cache
+        if disk_cache is not None:
+            loaded = disk_cache.load(grammar_string, **options)
+            if loaded is not None:
+                with self._lock:
+                    self._disk_hits += 1
+                return loaded
+
+        compiled = Lark(grammar_string, **options)
+        if disk_cache is not None:
+            disk_cache.store(compiled, grammar_string, **options)
+        return compiled
+
+    def get_stats(self) -> dict:
+        #Retorna estadísticas de aciertos, fallos y tiempo de compilación
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._parsers),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "compile_time": self._compile_time,
+                "disk_hits": self._disk_hits,
+                "precompiled_hits": self._precompiled_hits,
+            }
+
+    def clear(self):
+        #Vacía el registro y reinicia las estadísticas
+        with self._lock:
+            self._parsers.clear()
+            self._key_locks.clear()
+            self._hits = 0
+            self._misses = 0
+            self._compile_time = 0.0
+            self._disk_hits = 0
+            self._precompiled_hits = 0
+
+    def __len__(self):
+        return len(self._parsers)
+
+
+_registry: Optional[ParserRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ParserRegistry:
+    #Retorna el registro global del proceso
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                # La caché en disco se activa definiendo $SQL_PARSER_CACHE_DIR
+                disk_cache = GrammarCache() if os.environ.get(CACHE_DIR_ENV) else None
+                _registry = ParserRegistry(disk_cache=disk_cache)
+    return _registry
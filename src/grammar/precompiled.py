@@ -0,0 +1,143 @@
+# Parsers precompilados en módulos de Python
+#
+# El paso de construcción genera, para la gramática no ambigua de
+# sql_grammar.py, un módulo autocontenido en src/grammar/generated/ con las
+# tablas LALR ya serializadas por Lark. El registro de parsers lo carga en
+# lugar de compilar la gramática, que es la mayor parte del arranque de SQLParser.
+#
+# Solo se generan parsers LALR: Lark no sabe serializar un parser Earley
+# completo. La gramática ambigua no se precompila: tiene conflictos LALR(1)
+# que Lark resuelve en silencio, así que SQLParser siempre la parsea con
+# Earley y la compila al vuelo (es mucho más barata que la compilación LALR).
+# Cada módulo guarda el digest de su gramática y la versión de Lark; si no
+# coinciden, se ignora.
+#
+# Los módulos generados no se versionan (ver .gitignore). Para generarlos:
+#     python -m src.grammar.precompiled
+
+from typing import Dict, List, Optional
+import argparse
+import importlib
+import io
+import logging
+import os
+
+from . import sql_grammar
+
+logger = logging.getLogger(__name__)
+
+GENERATED_PACKAGE = __name__.rsplit('.', 1)[0] + '.generated'
+GENERATED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'generated')
+
+# Variable de entorno para no usar los módulos precompilados ("0")
+PRECOMPILED_ENV = "SQL_PARSER_PRECOMPILED"
+
+# Configuración que usa SQLParser con LALR
+LALR_OPTIONS = {'start': 'query', 'parser': 'lalr', 'lexer': 'contextual'}
+
+# Gramáticas de sql_grammar.py que se precompilan: nombre del módulo -> variable
+GRAMMARS = {
+    'sql_unambiguous': 'SQL_GRAMMAR_UNAMBIGUOUS',
+}
+
+MODULE_TEMPLATE = '''\
+# Parser precompilado de {grammar}. Generado por "python -m {builder}"; no editar.
+
+GRAMMAR_DIGEST = {digest!r}
+LARK_VERSION = {lark_version!r}
+OPTIONS = {options!r}
+DATA = {data!r}
+'''
+
+
+def _module_name(grammar_string: str) -> Optional[str]:
+    for name, variable in GRAMMARS.items():
+        if getattr(sql_grammar, variable) == grammar_string:
+            return name
+    return None
+
+
+def precompiled_enabled() -> bool:
+    return os.environ.get(PRECOMPILED_ENV, '1') != '0'
+
+
+def load_precompiled(grammar_string: str, **options):
+    """
+    Carga el parser precompilado de una gramática, si existe y está al día.
+
+    Args:
+        grammar_string (str): Definición de la gramática
+        **options: Opciones con las que se pide el parser
+
+    Returns:
+        Lark: Parser deserializado, o None si no hay módulo válido
+    """
+    if options != LALR_OPTIONS or not precompiled_enabled():
+        return None
+    name = _module_name(grammar_string)
+    if name is None:
+        return None
+    try:
+        module = importlib.import_module(f"{GENERATED_PACKAGE}.{name}")
+    except ImportError:
+        return None
+
+    from lark import Lark, __version__ as lark_version
+    from .parser_registry import grammar_digest
+    if module.GRAMMAR_DIGEST != grammar_digest(grammar_string) or module.LARK_VERSION != lark_version \
+            or module.OPTIONS != options:
+        logger.info("Parser precompilado obsoleto (%s); se compila la gramática", name)
+        return None
+    try:
+        return Lark.load(io.BytesIO(module.DATA))
+    except Exception as e:
+        logger.warning("Parser precompilado inválido (%s): %s", name, e)
+        return None
+
+
+def build() -> Dict[str, str]:
+    """
+    Genera los módulos precompilados en GENERATED_DIR.
+
+    Returns:
+        Dict[str, str]: Nombre de la gramática -> ruta del módulo generado
+    """
+    from lark import Lark, __version__ as lark_version
+    from .parser_registry import grammar_digest
+
+    os.makedirs(GENERATED_DIR, exist_ok=True)
+    init_path = os.path.join(GENERATED_DIR, '__init__.py')
+    if not os.path.exists(init_path):
+        with open(init_path, 'w', encoding='utf-8') as f:
+            f.write("# Parsers precompilados (generados, ver src/grammar/precompiled.py)\n")
+
+    results: Dict[str, str] = {}
+    for name, variable in GRAMMARS.items():
+        grammar_string = getattr(sql_grammar, variable)
+        compiled = Lark(grammar_string, **LALR_OPTIONS)
+        data = io.BytesIO()
+        compiled.save(data)
+        path = os.path.join(GENERATED_DIR, f"{name}.py")
+        source = MODULE_TEMPLATE.format(grammar=variable, builder=__name__, digest=grammar_digest(grammar_string),
+                                        lark_version=lark_version, options=LALR_OPTIONS, data=data.getvalue())
+        # Escritura atómica: un proceso que arranca nunca ve un módulo a medias
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(source)
+        os.replace(tmp_path, path)
+        results[name] = path
+    importlib.invalidate_caches()
+    return results
+
+
+def main(argv: Optional[List[str]] = None):
+    arg_parser = argparse.ArgumentParser(description="Genera los parsers precompilados de sql_grammar.py")
+    arg_parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    for name, path in build().items():
+        print(f"{name:<16} {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Índice invertido de un corpus de consultas parseadas: qué consultas usan
+una tabla, seleccionan o filtran por una columna, usan un operador u
+ordenan por una columna
+
+NumPy solo se importa al usar el índice (QueryIndex); los términos y los
+combinadores de búsqueda no lo necesitan.
+"""
+
+from typing import TYPE_CHECKING
+import importlib
+
+# Nombre exportado -> submódulo que lo define
+_EXPORTS = {
+    'QueryIndex': '.inverted',
+    'FIELDS': '.terms',
+    'index_terms': '.terms',
+    'Expression': '.terms',
+    'Term': '.terms',
+    'AllOf': '.terms',
+    'AnyOf': '.terms',
+    'Not': '.terms',
+    'reads': '.terms',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:
+    from .inverted import QueryIndex
+    from .terms import FIELDS, index_terms, Expression, Term, AllOf, AnyOf, Not, reads
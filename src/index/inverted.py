@@ -0,0 +1,399 @@
+# Índice invertido de un corpus de consultas
+#
+# Cada consulta añadida recibe un id de documento consecutivo (0, 1, 2...)
+# y su id se añade a la lista de cada uno de sus términos (ver terms.py).
+# Como los ids crecen, añadir al final mantiene las listas ordenadas y sin
+# repetidos: no hay que reordenar nada al insertar. Las listas son arrays
+# de uint32 (4 bytes por aparición).
+#
+# Las búsquedas trabajan con las listas como arrays de NumPy:
+#   y   se parte de la lista más corta y se filtra con las demás (búsqueda
+#       binaria, o un mapa de bits si la lista a filtrar es grande)
+#   o   se concatenan y ordenan las listas, o mapa de bits si el resultado
+#       puede ser grande; dentro de un y solo se comprueban los candidatos
+#   no  complemento sobre todos los documentos
+# Así el coste depende de la longitud de las listas que se combinan, no del
+# número de consultas indexadas.
+#
+# En disco el índice es un directorio con las listas concatenadas en un
+# .npy, los textos de las consultas (opcionales) y un manifiesto JSON con el
+# tramo de cada término. Al cargarlo las listas se mapean en memoria; una
+# lista cargada se copia a memoria la primera vez que se le añade un id.
+# Cada guardado escribe ficheros nuevos y el manifiesto se sustituye el
+# último, así que un índice abierto (mapeado) sobre el mismo directorio
+# sigue siendo válido.
+
+from array import array
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import json
+import logging
+import os
+import re
+import threading
+
+import numpy as np
+
+from ..engine.plan import plan_query
+from ..parser.parse_tree import ParseTree
+from .terms import FIELDS, AllOf, AnyOf, Expression, Not, Term, index_terms
+
+if TYPE_CHECKING:
+    from ..parser.sql_parser import SQLParser
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = 'index.json'
+
+# Ficheros de datos de cada guardado: <nombre>-<generación>.npy
+_DATA_FILE = re.compile(r"(postings|offsets|queries)-(\d+)\.npy$")
+
+Posting = Union[array, np.ndarray]
+
+
+class QueryIndex:
+    #Índice invertido de consultas por tabla, columnas, predicados y orden
+
+    def __init__(self, store_queries: bool = True, parser: Optional['SQLParser'] = None):
+        """
+        Args:
+            store_queries (bool): Guardar el texto de las consultas (para
+                recuperarlo con query()); sin él el índice solo guarda ids
+            parser (SQLParser): Parser para las consultas en texto (por
+                defecto el compartido de plan_query())
+        """
+        self.store_queries = store_queries
+        self._parser = parser
+        self._postings: Dict[Tuple[str, str], Posting] = {}
+        self._documents = 0
+        # Textos cargados de disco (offsets y bytes UTF-8) y añadidos después
+        self._stored_offsets: Optional[np.ndarray] = None
+        self._stored_blob: Optional[np.ndarray] = None
+        self._queries: List[str] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._documents
+
+    def add(self, query: Union[str, ParseTree]) -> Optional[int]:
+        """
+        Parsea (si hace falta) e indexa una consulta.
+
+        Args:
+            query: Consulta SQL o árbol de SQLParser (gramática no ambigua)
+
+        Returns:
+            int: Id de documento de la consulta, o None si no se puede
+                parsear
+        """
+        try:
+            plan = plan_query(query, self._parser)
+        except ValueError as e:
+            logger.error("No se puede indexar el árbol: %s", e)
+            return None
+        if plan is None:
+            return None
+        text = query.original_query if isinstance(query, ParseTree) else query
+        return self.add_terms(index_terms(plan), text)
+
+    def add_many(self, queries: Iterable[Union[str, ParseTree]]) -> List[Optional[int]]:
+        #Indexa varias consultas; retorna sus ids (None para las inválidas)
+        return [self.add(query) for query in queries]
+
+    def add_terms(self, terms: Iterable[Tuple[str, str]], query: Optional[str] = None) -> int:
+        """
+        Indexa un documento a partir de sus términos ya calculados (por
+        ejemplo, con index_terms() en otro proceso).
+
+        Args:
+            terms (Iterable[Tuple[str, str]]): Pares (campo, valor) sin repetir
+            query (str): Texto de la consulta (si el índice lo guarda)
+
+        Returns:
+            int: Id de documento
+        """
+        with self._lock:
+            document = self._documents
+            postings = self._postings
+            for key in terms:
+                posting = postings.get(key)
+                if posting is None:
+                    postings[key] = array('I', (document,))
+                    continue
+                if type(posting) is not array:
+                    # Lista cargada de disco: se copia a memoria
+                    loaded = posting
+                    posting = postings[key] = array('I')
+                    posting.frombytes(loaded.tobytes())
+                try:
+                    posting.append(document)
+                except BufferError:
+                    # Una vista de NumPy sigue viva (p. ej. en una traza de
+                    # error): se sustituye la lista por una copia
+                    posting = postings[key] = array('I', posting)
+                    posting.append(document)
+            if self.store_queries:
+                self._queries.append(query if query is not None else '')
+            self._documents = document + 1
+            return document
+
+    def search(self, expression: Expression) -> np.ndarray:
+        """
+        Consultas que cumplen una búsqueda.
+
+        Args:
+            expression (Expression): Term combinados con &, | y ~
+
+        Returns:
+            ndarray: Ids de documento (uint32), ordenados
+        """
+        with self._lock:
+            result = self._evaluate(expression)
+            # Nunca se devuelve una vista de una lista del índice
+            return result if result.flags.owndata else result.copy()
+
+    def lookup(self, field: str, value: str) -> np.ndarray:
+        #Consultas con un término (como search(Term(field, value)))
+        return self.search(Term(field, value))
+
+    def count(self, expression: Expression) -> int:
+        #Número de consultas que cumplen una búsqueda
+        return len(self.search(expression))
+
+    def query(self, document: int) -> Optional[str]:
+        #Texto de una consulta indexada (None si el índice no guarda textos)
+        if not self.store_queries:
+            return None
+        if not 0 <= document < self._documents:
+            raise IndexError(f"Documento fuera de rango: {document}")
+        stored = len(self._stored_offsets) - 1 if self._stored_offsets is not None else 0
+        if document < stored:
+            start, end = self._stored_offsets[document], self._stored_offsets[document + 1]
+            return self._stored_blob[start:end].tobytes().decode('utf-8')
+        return self._queries[document - stored]
+
+    def queries(self, documents: Sequence[int]) -> List[Optional[str]]:
+        #Textos de varias consultas (p. ej. el resultado de search())
+        return [self.query(int(document)) for document in documents]
+
+    def vocabulary(self, field: str) -> Dict[str, int]:
+        """
+        Valores indexados de un campo con su número de consultas.
+
+        Args:
+            field (str): Campo (ver FIELDS)
+
+        Returns:
+            Dict[str, int]: Valor -> consultas, de más a menos frecuente
+        """
+        if field not in FIELDS:
+            raise ValueError(f"Campo desconocido: {field!r} (campos: {', '.join(FIELDS)})")
+        with self._lock:
+            counts = {value: len(posting) for (name, value), posting in self._postings.items() if name == field}
+        return dict(sorted(counts.items(), key=lambda item: -item[1]))
+
+    def get_stats(self) -> dict:
+        #Documentos, términos distintos, apariciones y bytes de las listas
+        with self._lock:
+            postings = sum(len(posting) for posting in self._postings.values())
+            return {
+                'documents': self._documents,
+                'terms': len(self._postings),
+                'postings': postings,
+                'posting_bytes': postings * 4,
+            }
+
+    def save(self, path: str) -> str:
+        """
+        Guarda el índice en un directorio.
+
+        Args:
+            path (str): Directorio del índice (se crea si no existe)
+
+        Returns:
+            str: Ruta del directorio
+        """
+        os.makedirs(path, exist_ok=True)
+        generation = 0
+        manifest_path = os.path.join(path, MANIFEST)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding='utf-8') as f:
+                generation = json.load(f).get('generation', 0) + 1
+
+        with self._lock:
+            fields: Dict[str, Dict[str, List[int]]] = {field: {} for field in FIELDS}
+            parts = []
+            offset = 0
+            for (field, value), posting in self._postings.items():
+                fields[field][value] = [offset, len(posting)]
+                parts.append(_view(posting))
+                offset += len(posting)
+            postings = np.concatenate(parts) if parts else np.zeros(0, dtype=np.uint32)
+            files = {'postings': postings}
+            if self.store_queries:
+                files['offsets'], files['queries'] = self._encoded_queries()
+            for name, data in files.items():
+                np.save(os.path.join(path, f"{name}-{generation}.npy"), data, allow_pickle=False)
+            manifest = {
+                'generation': generation,
+                'documents': self._documents,
+                'store_queries': self.store_queries,
+                'fields': fields,
+            }
+
+        # El manifiesto se sustituye el último: hasta entonces vale el anterior
+        tmp_path = manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, manifest_path)
+        for name in os.listdir(path):
+            match = _DATA_FILE.match(name)
+            if match and int(match.group(2)) != generation:
+                try:
+                    os.remove(os.path.join(path, name))
+                except OSError as e:
+                    logger.warning("No se pudo borrar %s: %s", name, e)
+        return path
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True, parser: Optional['SQLParser'] = None) -> 'QueryIndex':
+        """
+        Abre un índice guardado con save().
+
+        Args:
+            path (str): Directorio del índice
+            mmap (bool): Mapear las listas y los textos en memoria (solo
+                lectura) en lugar de cargarlos
+            parser (SQLParser): Parser para las consultas que se añadan
+
+        Returns:
+            QueryIndex: Índice con los mismos ids de documento
+
+        Raises:
+            ValueError: Si los ficheros no corresponden al manifiesto
+        """
+        with open(os.path.join(path, MANIFEST), encoding='utf-8') as f:
+            manifest = json.load(f)
+        generation = manifest['generation']
+        mmap_mode = 'r' if mmap else None
+
+        def load_array(name: str) -> np.ndarray:
+            return np.load(os.path.join(path, f"{name}-{generation}.npy"), mmap_mode=mmap_mode, allow_pickle=False)
+
+        index = cls(store_queries=manifest['store_queries'], parser=parser)
+        index._documents = manifest['documents']
+        postings = load_array('postings')
+        for field, values in manifest['fields'].items():
+            for value, (offset, length) in values.items():
+                if offset + length > len(postings):
+                    raise ValueError(f"La lista de {field}:{value} se sale de las listas guardadas")
+                index._postings[(field, value)] = postings[offset:offset + length]
+        if index.store_queries:
+            index._stored_offsets = load_array('offsets')
+            index._stored_blob = load_array('queries')
+            if len(index._stored_offsets) != index._documents + 1:
+                raise ValueError(f"Hay {len(index._stored_offsets) - 1} textos y {index._documents} documentos")
+        return index
+
+    def _encoded_queries(self) -> Tuple[np.ndarray, np.ndarray]:
+        #Textos de las consultas como (offsets uint64, bytes UTF-8)
+        encoded = [query.encode('utf-8') for query in self._queries]
+        lengths = np.fromiter((len(data) for data in encoded), dtype=np.uint64, count=len(encoded))
+        if self._stored_offsets is not None:
+            base = self._stored_offsets
+            blob = self._stored_blob.tobytes() + b''.join(encoded)
+        else:
+            base = np.zeros(1, dtype=np.uint64)
+            blob = b''.join(encoded)
+        offsets = np.concatenate([base, base[-1] + np.cumsum(lengths, dtype=np.uint64)])
+        return offsets, np.frombuffer(blob, dtype=np.uint8)
+
+    def _evaluate(self, expression: Expression) -> np.ndarray:
+        #Ids (ordenados) que cumplen una búsqueda
+        if isinstance(expression, Term):
+            posting = self._postings.get((expression.field, expression.value))
+            return _view(posting) if posting is not None else np.zeros(0, dtype=np.uint32)
+        if isinstance(expression, Not):
+            return self._complement(self._evaluate(expression.child))
+        if isinstance(expression, AnyOf):
+            return self._union([self._evaluate(child) for child in expression.children])
+        if isinstance(expression, AllOf):
+            return self._intersection(expression.children)
+        raise ValueError(f"Búsqueda no válida: {expression!r}")
+
+    def _intersection(self, children: List[Expression]) -> np.ndarray:
+        #Y: se parte de la lista más corta; los O y los Not se aplican al final
+        unions = [child for child in children if isinstance(child, AnyOf)]
+        negated = [child.child for child in children if isinstance(child, Not)]
+        included = sorted((self._evaluate(child) for child in children if not isinstance(child, (AnyOf, Not))),
+                          key=len)
+        if not included and unions:
+            included = [self._evaluate(unions.pop())]
+        if not included:
+            return self._complement(self._union([self._evaluate(child) for child in negated]))
+        result = included[0]
+        for other in included[1:]:
+            if not len(result):
+                return result
+            result = result[self._contains(other, result)]
+        # Un O se comprueba sobre los candidatos que quedan, sin calcular la
+        # unión completa de sus listas
+        for union in unions:
+            if not len(result):
+                return result
+            keep = np.zeros(len(result), dtype=bool)
+            for child in union.children:
+                keep |= self._contains(self._evaluate(child), result)
+            result = result[keep]
+        for child in negated:
+            if not len(result):
+                return result
+            result = result[~self._contains(self._evaluate(child), result)]
+        return result
+
+    def _union(self, parts: List[np.ndarray]) -> np.ndarray:
+        #O: unión ordenada, o mapa de bits si el resultado puede ser grande
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            return np.zeros(0, dtype=np.uint32)
+        if len(parts) == 1:
+            return parts[0]
+        if sum(len(part) for part in parts) * 4 < self._documents:
+            # Ordenar y quitar repetidos (np.unique es bastante más lento)
+            merged = np.concatenate(parts)
+            merged.sort()
+            keep = np.empty(len(merged), dtype=bool)
+            keep[0] = True
+            np.not_equal(merged[1:], merged[:-1], out=keep[1:])
+            return merged[keep]
+        mask = np.zeros(self._documents, dtype=bool)
+        for part in parts:
+            mask[part] = True
+        return np.flatnonzero(mask).astype(np.uint32)
+
+    def _complement(self, part: np.ndarray) -> np.ndarray:
+        #No: documentos que no están en la lista
+        mask = np.ones(self._documents, dtype=bool)
+        mask[part] = False
+        return np.flatnonzero(mask).astype(np.uint32)
+
+    def _contains(self, haystack: np.ndarray, needles: np.ndarray) -> np.ndarray:
+        #Máscara de los ids de needles que están en haystack (ambos ordenados)
+        if len(haystack) and len(needles):
+            # Solo interesa el tramo de haystack entre el primer y el último id
+            haystack = haystack[np.searchsorted(haystack, needles[0]):np.searchsorted(haystack, needles[-1], 'right')]
+        if not len(haystack):
+            return np.zeros(len(needles), dtype=bool)
+        # Una búsqueda binaria cuesta unas 20 veces más por id que marcar un
+        # id en el mapa de bits, y el mapa hay que ponerlo a cero entero
+        if len(needles) * 20 > len(haystack) + self._documents // 10:
+            mask = np.zeros(self._documents, dtype=bool)
+            mask[haystack] = True
+            return mask[needles]
+        positions = np.searchsorted(haystack, needles)
+        positions[positions == len(haystack)] = len(haystack) - 1
+        return haystack[positions] == needles
+
+
+def _view(posting: Posting) -> np.ndarray:
+    #Lista de ids como array de NumPy (sin copiar)
+    return np.frombuffer(posting, dtype=np.uint32) if type(posting) is array else posting
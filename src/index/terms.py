@@ -0,0 +1,162 @@
+# Términos del índice invertido y combinadores de búsqueda
+#
+# Cada consulta indexada se describe con términos (campo, valor) sacados de
+# su plan (QueryPlan):
+#
+#   table      tabla del FROM
+#   column     columna del SELECT ('*' para SELECT *)
+#   where      columna que aparece en un predicado del WHERE
+#   op         operador de comparación del WHERE (<> se guarda como !=)
+#   order      columna del ORDER BY
+#   predicate  columna y operador de un mismo predicado ('age >'), con la
+#              columna a la izquierda: '1 < age' se indexa como 'age >'
+#
+# Los identificadores se indexan tal como se escriben. Un predicado negado
+# (NOT age > 18) también filtra por age, así que cuenta como where.
+#
+# Las búsquedas se escriben con Term y los operadores & (y), | (o) y ~ (no):
+#   Term('table', 'users') & (Term('where', 'status') | Term('order', 'price'))
+
+from typing import List, Optional, Tuple
+
+from ..engine.plan import QueryPlan
+
+FIELDS = ('table', 'column', 'where', 'op', 'order', 'predicate')
+
+# Operador equivalente al cambiar de lado los operandos
+_MIRRORED = {'=': '=', '!=': '!=', '<': '>', '>': '<', '<=': '>=', '>=': '<='}
+
+
+def index_terms(plan: QueryPlan) -> List[Tuple[str, str]]:
+    """
+    Términos con los que se indexa una consulta.
+
+    Args:
+        plan (QueryPlan): Plan de la consulta
+
+    Returns:
+        List[Tuple[str, str]]: Pares (campo, valor) sin repetir
+    """
+    terms = {('table', plan.table): None}
+    for column in plan.columns if plan.columns is not None else ('*',):
+        terms[('column', column)] = None
+    stack = [plan.condition] if plan.condition is not None else []
+    while stack:
+        node = stack.pop()
+        if node[0] == 'not':
+            stack.append(node[1])
+        elif node[0] != 'cmp':
+            stack.extend(reversed(node[1]))
+        else:
+            _, operator, left, right = node
+            terms[('op', operator)] = None
+            if left[0] == 'column':
+                terms[('where', left[1])] = None
+                terms[('predicate', f"{left[1]} {operator}")] = None
+            if right[0] == 'column':
+                terms[('where', right[1])] = None
+                terms[('predicate', f"{right[1]} {_MIRRORED[operator]}")] = None
+    if plan.order_by is not None:
+        terms[('order', plan.order_by)] = None
+    return list(terms)
+
+
+class Expression:
+    #Búsqueda sobre el índice (se combina con &, | y ~)
+
+    __slots__ = ()
+
+    def __and__(self, other: 'Expression') -> 'Expression':
+        return AllOf(self, other)
+
+    def __or__(self, other: 'Expression') -> 'Expression':
+        return AnyOf(self, other)
+
+    def __invert__(self) -> 'Expression':
+        return Not(self)
+
+
+class Term(Expression):
+    #Consultas indexadas con un término
+
+    __slots__ = ('field', 'value')
+
+    def __init__(self, field: str, value: str):
+        """
+        Args:
+            field (str): Campo del índice (ver FIELDS)
+            value (str): Valor del término
+
+        Raises:
+            ValueError: Si el campo no existe
+        """
+        if field not in FIELDS:
+            raise ValueError(f"Campo desconocido: {field!r} (campos: {', '.join(FIELDS)})")
+        self.field = field
+        self.value = value
+
+    def __eq__(self, other):
+        return isinstance(other, Term) and (self.field, self.value) == (other.field, other.value)
+
+    def __hash__(self):
+        return hash((self.field, self.value))
+
+    def __repr__(self):
+        return f"Term({self.field!r}, {self.value!r})"
+
+
+class AllOf(Expression):
+    #Consultas que cumplen todas las búsquedas
+
+    __slots__ = ('children',)
+
+    def __init__(self, *children: Expression):
+        # Los AllOf anidados se aplanan: a & b & c es un solo nodo
+        self.children: List[Expression] = []
+        for child in children:
+            self.children.extend(child.children if isinstance(child, AllOf) else (child,))
+
+    def __repr__(self):
+        return f"AllOf({', '.join(map(repr, self.children))})"
+
+
+class AnyOf(Expression):
+    #Consultas que cumplen alguna de las búsquedas
+
+    __slots__ = ('children',)
+
+    def __init__(self, *children: Expression):
+        self.children: List[Expression] = []
+        for child in children:
+            self.children.extend(child.children if isinstance(child, AnyOf) else (child,))
+
+    def __repr__(self):
+        return f"AnyOf({', '.join(map(repr, self.children))})"
+
+
+class Not(Expression):
+    #Consultas que no cumplen la búsqueda
+
+    __slots__ = ('child',)
+
+    def __init__(self, child: Expression):
+        self.child = child
+
+    def __repr__(self):
+        return f"Not({self.child!r})"
+
+
+def reads(column: str, table: Optional[str] = None) -> Expression:
+    """
+    Consultas que leen una columna: la seleccionan (o usan SELECT *), filtran
+    por ella o ordenan por ella.
+
+    Args:
+        column (str): Columna
+        table (str): Limitar a las consultas sobre esta tabla
+
+    Returns:
+        Expression: Búsqueda
+    """
+    expression = AnyOf(Term('column', column), Term('column', '*'), Term('where', column), Term('order', column))
+    return expression if table is None else Term('table', table) & expression
@@ -1,14 +1,60 @@
 """
 Módulo de parsing y análisis sintáctico de consultas SQL
+
+Los submódulos se importan la primera vez que se usa uno de sus nombres, así
+que "import src.parser" no carga Lark, asyncio ni multiprocessing hasta que
+hacen falta.
 """
 
-from .sql_parser import SQLParser
-from .parse_tree import ParseTree, TreeNode
-from .validator import SQLValidator
+from typing import TYPE_CHECKING
+import importlib
+
+# Nombre exportado -> submódulo que lo define
+_EXPORTS = {
+    'SQLParser': '.sql_parser',
+    'ParseTree': '.parse_tree',
+    'TreeNode': '.parse_tree',
+    'CompactTree': '.compact_tree',
+    'SQLValidator': '.validator',
+    'Rule': '.rules',
+    'RuleEngine': '.rules',
+    'AsyncSQLParser': '.async_parser',
+    'AsyncSQLValidator': '.async_parser',
+    'ParserPool': '.pool',
+    'QueryFingerprint': '.fingerprint',
+    'QueryFingerprinter': '.fingerprint',
+    'SubtreeInterner': '.interning',
+    'InternedBatch': '.interning',
+    'enable_metrics': '.metrics',
+    'disable_metrics': '.metrics',
+    'get_metrics': '.metrics',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    # Las siguientes consultas ya no pasan por __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
 
-__all__ = [
-    'SQLParser',
-    'ParseTree',
-    'TreeNode',
-    'SQLValidator',
-]
+if TYPE_CHECKING:
+    from .sql_parser import SQLParser
+    from .parse_tree import ParseTree, TreeNode
+    from .compact_tree import CompactTree
+    from .validator import SQLValidator
+    from .rules import Rule, RuleEngine
+    from .async_parser import AsyncSQLParser, AsyncSQLValidator
+    from .pool import ParserPool
+    from .fingerprint import QueryFingerprint, QueryFingerprinter
+    from .interning import SubtreeInterner, InternedBatch
+    from .metrics import enable_metrics, disable_metrics, get_metrics
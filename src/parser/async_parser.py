@@ -0,0 +1,249 @@
+# Fachada asyncio para SQLParser y SQLValidator
+#
+# El parsing consume CPU y es síncrono: llamado directamente desde el bucle de
+# eventos lo bloquea mientras dura. Estas clases envían cada llamada a un
+# ejecutor (hilos o procesos) y la esperan sin bloquear el bucle.
+#
+# Un semáforo limita el trabajo en vuelo. Cuando está lleno, los llamadores
+# esperan su turno (backpressure) en lugar de acumular trabajo en la cola del
+# ejecutor. El hueco se libera cuando el trabajo termina de verdad, no cuando
+# el llamador deja de esperarlo: cancelar una llamada que aún no empezó la
+# retira de la cola, y una que ya está en ejecución termina en segundo plano
+# y su resultado se descarta.
+
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple, Union
+import asyncio
+import logging
+import os
+import weakref
+
+from . import batch
+from .forest import AmbiguousSpan
+from .parse_tree import ParseTree
+from .sql_parser import SQLParser
+from .validator import SQLValidator
+
+logger = logging.getLogger(__name__)
+
+# Tipos de ejecutor soportados
+EXECUTOR_KINDS = ('thread', 'process')
+
+
+class _AsyncFrontEnd:
+    #Base común: ejecutor, límite de trabajo en vuelo y ciclo de vida
+
+    def __init__(self, executor: Union[str, Executor], max_workers: Optional[int],
+                 max_in_flight: Optional[int], kind: str, options: dict):
+        """
+        Args:
+            executor: 'thread', 'process' o un Executor de hilos ya creado
+                (no se cierra al cerrar la fachada)
+            max_workers (int): Hilos o procesos del ejecutor propio (por defecto, uno por CPU)
+            max_in_flight (int): Llamadas en ejecución o en cola a la vez
+                (por defecto, el doble de trabajadores)
+            kind (str): 'parser' o 'validator' (para los procesos trabajadores)
+            options (dict): Argumentos para construir el objeto en los procesos
+        """
+        workers = max_workers or os.cpu_count() or 1
+        if max_in_flight is not None and max_in_flight < 1:
+            raise ValueError("max_in_flight debe ser mayor que cero")
+
+        if isinstance(executor, Executor):
+            self._executor = executor
+            self._owns_executor = False
+            self.executor_kind = 'thread'
+        elif executor == 'thread':
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sql-parser')
+            self._owns_executor = True
+            self.executor_kind = 'thread'
+        elif executor == 'process':
+            # Cada proceso construye su parser/validador una vez al arrancar
+            self._executor = ProcessPoolExecutor(max_workers=workers, initializer=batch._init_worker,
+                                                 initargs=(kind, options))
+            self._owns_executor = True
+            self.executor_kind = 'process'
+        else:
+            raise ValueError(f"Ejecutor inválido: {executor!r} (opciones: {', '.join(EXECUTOR_KINDS)})")
+
+        self.max_in_flight = max_in_flight or workers * 2
+        self.closed = False
+        self._in_flight = 0
+        # Un semáforo por bucle de eventos (asyncio.Semaphore queda ligado al primero que lo usa)
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = \
+            weakref.WeakKeyDictionary()
+
+    @property
+    def in_flight(self) -> int:
+        #Llamadas enviadas al ejecutor que aún no han terminado
+        return self._in_flight
+
+    async def _submit(self, func: Callable, *args) -> Any:
+        #Envía una llamada al ejecutor respetando el límite de trabajo en vuelo
+        if self.closed:
+            raise RuntimeError("La fachada asíncrona está cerrada")
+
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_in_flight)
+
+        await semaphore.acquire()
+        try:
+            future = self._executor.submit(func, *args)
+        except BaseException:
+            semaphore.release()
+            raise
+        self._in_flight += 1
+
+        def release(_):
+            # Se ejecuta en el hilo del ejecutor: el semáforo se libera en el bucle
+            try:
+                loop.call_soon_threadsafe(self._release, semaphore)
+            except RuntimeError:
+                # El bucle ya se cerró
+                pass
+
+        future.add_done_callback(release)
+        # Cancelar la espera cancela también la llamada si aún no empezó
+        return await asyncio.wrap_future(future)
+
+    def _release(self, semaphore: asyncio.Semaphore):
+        self._in_flight -= 1
+        semaphore.release()
+
+    def close(self, wait: bool = True):
+        """
+        Cierra el ejecutor propio y descarta las llamadas que aún no empezaron.
+
+        Args:
+            wait (bool): Esperar a que terminen las llamadas en ejecución
+        """
+        if self.closed:
+            return
+        self.closed = True
+        if self._owns_executor:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    async def aclose(self):
+        #Cierra sin bloquear el bucle mientras terminan las llamadas en ejecución
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+
+class AsyncSQLParser(_AsyncFrontEnd):
+    #Parser SQL con métodos awaitables que no bloquean el bucle de eventos
+
+    def __init__(self, parser: Optional[SQLParser] = None, executor: Union[str, Executor] = 'thread',
+                 max_workers: Optional[int] = None, max_in_flight: Optional[int] = None):
+        """
+        Inicializa la fachada.
+
+        Con hilos se comparte el parser (Lark y las cachés admiten llamadas
+        concurrentes); con procesos cada trabajador construye el suyo con la
+        misma configuración y los árboles vuelven como CompactTree.
+
+        Args:
+            parser (SQLParser): Parser a usar (por defecto, SQLParser())
+            executor: 'thread', 'process' o un Executor de hilos ya creado
+            max_workers (int): Hilos o procesos del ejecutor propio
+            max_in_flight (int): Llamadas en ejecución o en cola a la vez
+        """
+        self.parser = parser or SQLParser()
+        super().__init__(executor, max_workers, max_in_flight, 'parser', self.parser._options)
+
+    async def parse(self, query: str) -> Optional[ParseTree]:
+        """
+        Parsea una consulta SQL.
+
+        Args:
+            query (str): Consulta SQL
+
+        Returns:
+            ParseTree: Árbol de derivación, o None si hay error
+        """
+        if self.executor_kind == 'process':
+            item = (await self._submit(batch._parse_chunk, [query]))[0]
+            return self.parser._tree_from_worker(query, item)
+        return await self._submit(self.parser.parse, query)
+
+    async def validate_syntax(self, query: str) -> Tuple[bool, str]:
+        """
+        Valida únicamente la sintaxis.
+
+        Returns:
+            Tuple[bool, str]: (es_válida, mensaje)
+        """
+        if self.executor_kind == 'process':
+            return await self._submit(batch._validate_syntax_one, query)
+        return await self._submit(self.parser.validate_syntax, query)
+
+    async def parse_multiple(self, queries: List[str]) -> List[Tuple[str, Optional[ParseTree]]]:
+        """
+        Parsea varias consultas en paralelo, dentro del límite de trabajo en vuelo.
+
+        Returns:
+            List[Tuple[str, Optional[ParseTree]]]: (query, árbol), en el orden de entrada
+        """
+        trees = await asyncio.gather(*(self.parse(query) for query in queries))
+        return list(zip(queries, trees))
+
+
+class AsyncSQLValidator(_AsyncFrontEnd):
+    #Validador SQL con métodos awaitables que no bloquean el bucle de eventos
+
+    def __init__(self, validator: Optional[SQLValidator] = None, executor: Union[str, Executor] = 'thread',
+                 max_workers: Optional[int] = None, max_in_flight: Optional[int] = None):
+        """
+        Inicializa la fachada.
+
+        Args:
+            validator (SQLValidator): Validador a usar (por defecto, SQLValidator()).
+                Con procesos, sus reglas se envían serializadas a los trabajadores
+            executor: 'thread', 'process' o un Executor de hilos ya creado
+            max_workers (int): Hilos o procesos del ejecutor propio
+            max_in_flight (int): Llamadas en ejecución o en cola a la vez
+        """
+        self.validator = validator or SQLValidator()
+        super().__init__(executor, max_workers, max_in_flight, 'validator',
+                         {'rules': self.validator.engine.rules, 'backend': self.validator.parser.backend})
+
+    async def validate_query(self, query: str) -> Tuple[bool, List[str], Optional[ParseTree]]:
+        """
+        Valida una consulta SQL completa.
+
+        Returns:
+            Tuple[bool, List[str], Optional[ParseTree]]:
+                (es_válida, lista_errores/warnings, árbol)
+        """
+        if self.executor_kind == 'process':
+            is_valid, messages, item = await self._submit(batch._validate_one, query)
+            return is_valid, messages, self.validator.parser._tree_from_worker(query, item)
+        return await self._submit(self.validator.validate_query, query)
+
+    async def check_ambiguity(self, query: str) -> Tuple[bool, int]:
+        """
+        Verifica si una consulta es ambigua.
+
+        Returns:
+            Tuple[bool, int]: (es_ambigua, número_de_derivaciones)
+        """
+        if self.executor_kind == 'process':
+            return await self._submit(batch._check_ambiguity_one, query)
+        return await self._submit(self.validator.check_ambiguity, query)
+
+    async def get_ambiguous_spans(self, query: str) -> List[AmbiguousSpan]:
+        """
+        Localiza los tramos ambiguos de una consulta.
+
+        Returns:
+            List[AmbiguousSpan]: Tramos con más de una derivación
+        """
+        if self.executor_kind == 'process':
+            return await self._submit(batch._ambiguous_spans_one, query)
+        return await self._submit(self.validator.get_ambiguous_spans, query)
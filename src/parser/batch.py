@@ -0,0 +1,146 @@
+# Procesamiento de lotes en paralelo sobre un pool de procesos
+#
+# Cada proceso trabajador construye su propio SQLParser/SQLValidator una sola
+# vez al arrancar y lo reutiliza para todos los bloques que recibe. Los
+# árboles vuelven como CompactTree (arrays planos) para abaratar la
+# serialización entre procesos.
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple
+import logging
+import os
+
+from .compact_tree import CompactTree
+from .forest import ForestAnalysis
+
+logger = logging.getLogger(__name__)
+
+# Estado propio de cada proceso trabajador
+_worker_state: dict = {}
+
+
+def _init_worker(kind: str, options: dict):
+    #Inicializador del trabajador: construye el parser o validador en caliente
+    from .sql_parser import SQLParser
+    from .validator import SQLValidator
+
+    if kind == 'validator':
+        _worker_state['validator'] = SQLValidator(**options)
+    else:
+        _worker_state['parser'] = SQLParser(**options)
+
+
+def _parse_chunk(queries: List[str]) -> List[Optional[Tuple[CompactTree, Optional[ForestAnalysis]]]]:
+    #Parsea un bloque de consultas y retorna sus árboles compactos (y su ambigüedad)
+    parser = _worker_state['parser']
+    results = []
+    for query in queries:
+        try:
+            tree = parser.parse(query)
+            results.append((tree.to_compact(), tree.ambiguity) if tree is not None else None)
+        except Exception as e:
+            # Una consulta problemática no debe tumbar el lote
+            logger.error("Error inesperado en el trabajador: %s: %s", type(e).__name__, e)
+            results.append(None)
+    return results
+
+
+def _validate_chunk(queries: List[str]) -> List[Tuple[bool, List[str]]]:
+    #Valida un bloque de consultas
+    validator = _worker_state['validator']
+    results = []
+    for query in queries:
+        try:
+            is_valid, messages, _ = validator.validate_query(query)
+            results.append((is_valid, messages))
+        except Exception as e:
+            results.append((False, [f"Error: {type(e).__name__}: {e}"]))
+    return results
+
+
+def _validate_one(query: str) -> Tuple[bool, List[str], Optional[Tuple[CompactTree, Optional[ForestAnalysis]]]]:
+    #Valida una consulta y retorna también su árbol compacto (para AsyncSQLValidator)
+    is_valid, messages, tree = _worker_state['validator'].validate_query(query)
+    return is_valid, messages, (tree.to_compact(), tree.ambiguity) if tree is not None else None
+
+
+def _check_ambiguity_one(query: str) -> Tuple[bool, int]:
+    #Verifica la ambigüedad de una consulta en el trabajador
+    return _worker_state['validator'].check_ambiguity(query)
+
+
+def _ambiguous_spans_one(query: str) -> list:
+    #Tramos ambiguos de una consulta en el trabajador
+    return _worker_state['validator'].get_ambiguous_spans(query)
+
+
+def _validate_syntax_one(query: str) -> Tuple[bool, str]:
+    #Valida solo la sintaxis de una consulta en el trabajador
+    return _worker_state['parser'].validate_syntax(query)
+
+
+def default_chunk_size(total: int, workers: int) -> int:
+    #Unos cuatro bloques por trabajador, entre 1 y 256 consultas por bloque
+    return max(1, min(256, total // (workers * 4)))
+
+
+class ParallelBatchRunner:
+    #Pool de procesos con parsers calientes para procesar lotes de consultas
+
+    def __init__(self, workers: Optional[int] = None, kind: str = 'parser', options: Optional[dict] = None):
+        """
+        Inicializa el pool.
+
+        Args:
+            workers (int): Número de procesos (por defecto, uno por CPU)
+            kind (str): 'parser' o 'validator'
+            options (dict): Argumentos para construir SQLParser (o SQLValidator) en
+                los trabajadores
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.kind = kind
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(kind, options or {}),
+        )
+
+    def _map(self, func: Callable[[List[str]], List[Any]], queries: List[str],
+             chunk_size: Optional[int]) -> List[Any]:
+        #Reparte las consultas en bloques y recompone los resultados en orden
+        size = chunk_size or default_chunk_size(len(queries), self.workers)
+        chunks = [queries[i:i + size] for i in range(0, len(queries), size)]
+        results: List[Any] = []
+        # map conserva el orden de entrada
+        for chunk_results in self._executor.map(func, chunks):
+            results.extend(chunk_results)
+        return results
+
+    def parse(self, queries: List[str], chunk_size: Optional[int] = None) -> List[Optional[Tuple[CompactTree, Optional[ForestAnalysis]]]]:
+        """
+        Parsea las consultas en paralelo.
+
+        Returns:
+            List: (árbol compacto, análisis de ambigüedad) de cada consulta
+                (None si falló)
+        """
+        return self._map(_parse_chunk, queries, chunk_size)
+
+    def validate(self, queries: List[str], chunk_size: Optional[int] = None) -> List[Tuple[bool, List[str]]]:
+        """
+        Valida las consultas en paralelo.
+
+        Returns:
+            List[Tuple[bool, List[str]]]: (es_válida, mensajes) de cada consulta
+        """
+        return self._map(_validate_chunk, queries, chunk_size)
+
+    def close(self):
+        #Detiene los procesos trabajadores
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
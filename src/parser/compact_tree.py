@@ -0,0 +1,232 @@
+# Representación compacta del árbol de derivación
+#
+# En lugar de conservar objetos Tree/Token de Lark (cada uno con su dict y sus
+# metadatos), el árbol se guarda en arrays planos indexados por nodo:
+#
+#   kinds[i]  0 = nodo interno, 1 = token
+#   names[i]  id internado de la regla o del terminal
+#   first[i]  nodo interno: índice del primer hijo / token: inicio en el texto
+#   second[i] nodo interno: número de hijos     / token: fin en el texto
+#
+# Los nodos se numeran en anchura (BFS), así que los hijos de cada nodo
+# interno ocupan posiciones consecutivas y no hace falta una lista de hijos.
+# El valor de un token es el trozo del texto original entre sus posiciones.
+
+from array import array
+from lark import Token, Tree
+from typing import Dict, Iterator, List, Optional, Tuple
+import sys
+import threading
+
+TREE = 0
+TOKEN = 1
+
+
+class SymbolTable:
+    #Tabla de símbolos (reglas y terminales) internados del proceso
+
+    def __init__(self):
+        self._names: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def intern(self, name: str) -> int:
+        #Retorna el id del símbolo, registrándolo si es nuevo
+        symbol_id = self._ids.get(name)
+        if symbol_id is None:
+            with self._lock:
+                symbol_id = self._ids.get(name)
+                if symbol_id is None:
+                    symbol_id = len(self._names)
+                    self._names.append(str(name))
+                    self._ids[str(name)] = symbol_id
+        return symbol_id
+
+    def name(self, symbol_id: int) -> str:
+        return self._names[symbol_id]
+
+    def __len__(self):
+        return len(self._names)
+
+
+SYMBOLS = SymbolTable()
+
+
+class CompactTree:
+    #Árbol de derivación inmutable respaldado por arrays planos
+
+    __slots__ = ('text', '_kinds', '_names', '_first', '_second', '_values')
+
+    def __init__(self, text: str, kinds: array, names: array, first: array, second: array,
+                 values: Optional[Dict[int, str]] = None):
+        """
+        Args:
+            text (str): Texto original al que apuntan las posiciones de los tokens
+            kinds, names, first, second (array): Arrays del árbol (ver cabecera)
+            values (dict): Valores de tokens que no son un trozo de text
+        """
+        self.text = text
+        self._kinds = kinds
+        self._names = names
+        self._first = first
+        self._second = second
+        self._values = values or None
+
+    @classmethod
+    def from_lark(cls, tree, text: str) -> 'CompactTree':
+        """
+        Construye el árbol compacto a partir de un árbol de Lark.
+
+        Args:
+            tree (Tree): Árbol de Lark (o un token suelto)
+            text (str): Texto original de la consulta
+
+        Returns:
+            CompactTree: Árbol compacto equivalente
+        """
+        ids = SYMBOLS._ids
+        intern = SYMBOLS.intern
+        kinds = []
+        names = []
+        first = []
+        second = []
+        values: Dict[int, str] = {}
+
+        # Recorrido en anchura: los hijos de cada nodo quedan consecutivos
+        queue = [tree]
+        for index, node in enumerate(queue):
+            if isinstance(node, Tree):
+                name = node.data
+                children = node.children
+                kinds.append(TREE)
+                first.append(len(queue))
+                second.append(len(children))
+                queue.extend(children)
+            else:
+                name = getattr(node, 'type', '')
+                start = getattr(node, 'start_pos', None)
+                end = getattr(node, 'end_pos', None)
+                # startswith evita el __eq__ de Token, escrito en Python
+                if start is None or end is None or end - start != len(node) or not text.startswith(node, start):
+                    # Token sin posición (o alterado): se guarda su valor aparte
+                    start = end = 0
+                    values[index] = str(node)
+                kinds.append(TOKEN)
+                first.append(start)
+                second.append(end)
+            # Los nombres de regla de Lark son Token: se buscan como str
+            symbol_id = ids.get(str(name))
+            names.append(symbol_id if symbol_id is not None else intern(name))
+
+        return cls(text, array('B', kinds), array('H', names), array('I', first), array('I', second), values)
+
+    def __len__(self):
+        return len(self._kinds)
+
+    def is_token(self, index: int) -> bool:
+        return self._kinds[index] == TOKEN
+
+    def name_id(self, index: int) -> int:
+        return self._names[index]
+
+    def name(self, index: int) -> str:
+        #Regla (nodo interno) o tipo de terminal (token)
+        return SYMBOLS.name(self._names[index])
+
+    def value(self, index: int) -> Optional[str]:
+        #Valor de un token, o None para nodos internos
+        if self._kinds[index] != TOKEN:
+            return None
+        if self._values and index in self._values:
+            return self._values[index]
+        return self.text[self._first[index]:self._second[index]]
+
+    def span(self, index: int) -> Tuple[int, int]:
+        #Posiciones (inicio, fin) de un token en el texto
+        return self._first[index], self._second[index]
+
+    def children(self, index: int) -> range:
+        #Índices de los hijos de un nodo (vacío para tokens)
+        if self._kinds[index] == TOKEN:
+            return range(0)
+        start = self._first[index]
+        return range(start, start + self._second[index])
+
+    def iter_tokens(self) -> Iterator[int]:
+        #Índices de todos los tokens
+        kinds = self._kinds
+        return (i for i in range(len(kinds)) if kinds[i] == TOKEN)
+
+    def with_spans(self, text: str, spans: Dict[int, Tuple[int, int]]) -> 'CompactTree':
+        """
+        Retorna un árbol con la misma estructura y otros tokens.
+
+        Args:
+            text (str): Texto nuevo
+            spans (dict): Índice de token -> (inicio, fin) en el texto nuevo
+
+        Returns:
+            CompactTree: Árbol nuevo (la estructura se copia, no se comparte)
+        """
+        first = array('I', self._first)
+        second = array('I', self._second)
+        values = dict(self._values) if self._values else {}
+        for index, (start, end) in spans.items():
+            first[index] = start
+            second[index] = end
+            values.pop(index, None)
+        return CompactTree(text, self._kinds, self._names, first, second, values)
+
+    def to_lark(self, index: int = 0):
+        #Reconstruye el árbol de Lark que cuelga del nodo indicado (sin recursión)
+        def build(i):
+            if self._kinds[i] == TOKEN:
+                if self._values and i in self._values:
+                    return Token(self.name(i), self._values[i])
+                start, end = self._first[i], self._second[i]
+                return Token(self.name(i), self.text[start:end], start_pos=start, end_pos=end)
+            return Tree(self.name(i), [])
+
+        root = build(index)
+        stack = [(index, root)] if isinstance(root, Tree) else []
+        while stack:
+            i, target = stack.pop()
+            for child in self.children(i):
+                built = build(child)
+                target.children.append(built)
+                if isinstance(built, Tree):
+                    stack.append((child, built))
+        return root
+
+    def nbytes(self) -> int:
+        #Bytes que ocupan los arrays del árbol (sin contar el texto)
+        total = sys.getsizeof(self)
+        for arr in (self._kinds, self._names, self._first, self._second):
+            total += sys.getsizeof(arr)
+        if self._values:
+            total += sys.getsizeof(self._values) + sum(sys.getsizeof(v) for v in self._values.values())
+        return total
+
+    def __getstate__(self):
+        # Los ids de símbolo son propios del proceso: se serializan los nombres
+        used = sorted(set(self._names))
+        local = array('H', (0 for _ in range(max(used) + 1 if used else 0)))
+        for local_id, symbol_id in enumerate(used):
+            local[symbol_id] = local_id
+        names = array('H', (local[symbol_id] for symbol_id in self._names))
+        return (self.text, [SYMBOLS.name(s) for s in used], self._kinds.tobytes(), names.tobytes(),
+                self._first.tobytes(), self._second.tobytes(), self._values)
+
+    def __setstate__(self, state):
+        text, symbol_names, kinds, names, first, second, values = state
+        ids = [SYMBOLS.intern(name) for name in symbol_names]
+        local_names = array('H')
+        local_names.frombytes(names)
+        self.text = text
+        self._kinds = array('B', kinds)
+        self._names = array('H', (ids[local_id] for local_id in local_names))
+        self._first = array('I')
+        self._first.frombytes(first)
+        self._second = array('I')
+        self._second.frombytes(second)
+        self._values = values
@@ -0,0 +1,175 @@
+# Huellas de consultas con literales parametrizados
+#
+# Dos consultas que solo difieren en sus literales (NUMBER, STRING y
+# SINGLE_STRING de la gramática) comparten plantilla y huella. La plantilla
+# permite reutilizar un árbol ya construido sustituyendo solo los tokens.
+
+from lark import Token
+from lark.exceptions import LarkError
+from typing import Dict, Iterable, List, Optional
+import hashlib
+
+from ..grammar.parser_registry import get_registry
+from .compact_tree import CompactTree
+
+# Terminales de la gramática que se consideran literales
+LITERAL_TERMINALS = frozenset({'NUMBER', 'STRING', 'SINGLE_STRING'})
+
+# Marcador de los literales en la plantilla
+PLACEHOLDER = "?"
+
+
+class QueryFingerprint:
+    #Huella de una consulta: plantilla sin literales y vector de parámetros
+
+    __slots__ = ('fingerprint', 'template', 'params', 'tokens')
+
+    def __init__(self, fingerprint: str, template: str, params: List[str], tokens: List[Token]):
+        """
+        Args:
+            fingerprint (str): Hash estable de la plantilla
+            template (str): Consulta con los literales sustituidos por '?'
+            params (List[str]): Literales extraídos, en orden de aparición
+            tokens (List[Token]): Tokens de la consulta (sin espacios)
+        """
+        self.fingerprint = fingerprint
+        self.template = template
+        self.params = params
+        self.tokens = tokens
+
+    def __repr__(self):
+        return f"QueryFingerprint({self.fingerprint}, template='{self.template}', params={self.params})"
+
+
+class QueryFingerprinter:
+    #Calcula huellas usando el lexer de la propia gramática
+
+    def __init__(self, grammar_string: str):
+        """
+        Args:
+            grammar_string (str): Gramática cuyos terminales se usan para tokenizar
+        """
+        self._lexer = get_registry().get_parser(grammar_string, parser=None, lexer='basic')
+
+    def tokenize(self, query: str) -> List[Token]:
+        """
+        Tokeniza la consulta con el lexer de la gramática.
+
+        Raises:
+            UnexpectedCharacters: Si la consulta contiene caracteres no válidos
+        """
+        return list(self._lexer.lex(query))
+
+    def fingerprint(self, query: str) -> Optional[QueryFingerprint]:
+        """
+        Calcula la huella de una consulta.
+
+        Args:
+            query (str): Consulta SQL
+
+        Returns:
+            QueryFingerprint: Huella de la consulta, o None si no se puede tokenizar
+        """
+        try:
+            tokens = self.tokenize(query)
+        except LarkError:
+            return None
+        return self.fingerprint_tokens(tokens)
+
+    def fingerprint_tokens(self, tokens: List[Token]) -> QueryFingerprint:
+        """
+        Calcula la huella a partir de los tokens ya obtenidos con tokenize().
+
+        Args:
+            tokens (List[Token]): Tokens de la consulta
+
+        Returns:
+            QueryFingerprint: Huella de la consulta
+        """
+        parts = []
+        params = []
+        for token in tokens:
+            if token.type in LITERAL_TERMINALS:
+                parts.append(PLACEHOLDER)
+                params.append(str(token))
+            else:
+                parts.append(str(token))
+
+        template = " ".join(parts)
+        digest = hashlib.sha1(template.encode('utf-8')).hexdigest()[:16]
+        return QueryFingerprint(digest, template, params, tokens)
+
+    def group_by_fingerprint(self, queries: Iterable[str]) -> Dict[str, List[str]]:
+        """
+        Agrupa consultas por forma (misma plantilla).
+
+        Args:
+            queries (Iterable[str]): Consultas SQL
+
+        Returns:
+            Dict[str, List[str]]: Huella -> consultas con esa forma
+        """
+        groups: Dict[str, List[str]] = {}
+        for query in queries:
+            fp = self.fingerprint(query)
+            if fp is not None:
+                groups.setdefault(fp.fingerprint, []).append(query)
+        return groups
+
+
+class QueryTemplate:
+    #Árbol de una plantilla listo para enlazar los tokens de otra consulta
+
+    __slots__ = ('tree', 'leaves', 'is_ambiguous')
+
+    def __init__(self, tree: CompactTree, leaves: Dict[int, int], is_ambiguous: bool):
+        # leaves: índice de cada hoja del árbol -> índice del token que le corresponde
+        self.tree = tree
+        self.leaves = leaves
+        self.is_ambiguous = is_ambiguous
+
+    @classmethod
+    def from_tree(cls, tree: CompactTree, tokens: List[Token], is_ambiguous: bool = False) -> Optional['QueryTemplate']:
+        """
+        Construye una plantilla a partir del árbol de una consulta y sus tokens.
+
+        Args:
+            tree (CompactTree): Árbol compacto de la consulta
+            tokens (List[Token]): Tokens de la misma consulta
+            is_ambiguous (bool): Si el árbol contiene ambigüedad
+
+        Returns:
+            QueryTemplate: Plantilla, o None si las hojas no casan con los tokens
+        """
+        index_by_pos = {token.start_pos: i for i, token in enumerate(tokens)}
+        leaves = {}
+        for leaf in tree.iter_tokens():
+            i = index_by_pos.get(tree.span(leaf)[0])
+            # El lexer del parser y el de la huella deben coincidir
+            if i is None or tokens[i].type != tree.name(leaf) or tokens[i] != tree.value(leaf):
+                return None
+            leaves[leaf] = i
+        return cls(tree, leaves, is_ambiguous)
+
+    def bind(self, query: str, tokens: List[Token]) -> Optional[CompactTree]:
+        """
+        Construye el árbol de otra consulta con la misma plantilla.
+
+        Args:
+            query (str): Consulta (misma plantilla)
+            tokens (List[Token]): Tokens de la consulta
+
+        Returns:
+            CompactTree: Árbol nuevo que apunta a los tokens de la consulta, o
+                None si algún literal es de otro terminal (la plantilla usa '?'
+                para todos: 'a > 1' y 'a > \'x\'' la comparten)
+        """
+        tree = self.tree
+        spans = {}
+        for leaf, i in self.leaves.items():
+            token = tokens[i]
+            if token.type != tree.name(leaf):
+                return None
+            spans[leaf] = (token.start_pos, token.end_pos)
+        return self.tree.with_spans(query, spans)
+
@@ -0,0 +1,350 @@
+# Análisis de ambigüedad sobre el bosque compartido (SPPF) de Earley
+#
+# Con ambiguity='forest' Lark devuelve el bosque empaquetado en lugar de
+# expandir las derivaciones en nodos _ambig. Cada SymbolNode agrupa las
+# alternativas (PackedNode) de un símbolo sobre un tramo del texto, así que
+# el número de derivaciones se obtiene por programación dinámica:
+#
+#   derivaciones(símbolo)    = suma de derivaciones(alternativa)
+#   derivaciones(alternativa) = derivaciones(izquierda) * derivaciones(derecha)
+#
+# El bosque tiene tamaño polinómico aunque el número de derivaciones crezca
+# como los números de Catalan, y el cálculo es exacto (enteros de Python).
+
+from lark import Tree
+from lark.parse_tree_builder import ParseTreeBuilder
+from lark.parsers.earley_forest import PackedNode, SymbolNode, TokenNode
+from typing import Dict, Iterator, List, Optional
+import sys
+
+
+class AmbiguousSpan:
+    #Tramo de la consulta que se puede derivar de varias formas
+
+    __slots__ = ('symbol', 'start', 'end', 'text', 'alternatives', 'derivations')
+
+    def __init__(self, symbol: str, start: int, end: int, text: str, alternatives: int, derivations: int):
+        """
+        Args:
+            symbol (str): Regla ambigua
+            start, end (int): Posiciones del tramo en la consulta
+            text (str): Texto del tramo
+            alternatives (int): Alternativas directas del símbolo en el tramo
+            derivations (int): Derivaciones del subárbol (incluye ambigüedad anidada)
+        """
+        self.symbol = symbol
+        self.start = start
+        self.end = end
+        self.text = text
+        self.alternatives = alternatives
+        self.derivations = derivations
+
+    def to_dict(self) -> dict:
+        return {
+            "symbol": self.symbol,
+            "start": self.start,
+            "end": self.end,
+            "text": self.text,
+            "alternatives": self.alternatives,
+            "derivations": self.derivations,
+        }
+
+    def __repr__(self):
+        return f"AmbiguousSpan({self.symbol}, {self.start}:{self.end}, alternativas={self.alternatives}, derivaciones={self.derivations})"
+
+
+class ForestAnalysis:
+    #Resultado del análisis de un bosque: derivaciones y tramos ambiguos
+
+    __slots__ = ('derivation_count', 'spans')
+
+    def __init__(self, derivation_count: int, spans: List[AmbiguousSpan]):
+        self.derivation_count = derivation_count
+        self.spans = spans
+
+    @property
+    def is_ambiguous(self) -> bool:
+        return self.derivation_count > 1
+
+    def __repr__(self):
+        return f"ForestAnalysis(derivaciones={self.derivation_count}, tramos_ambiguos={len(self.spans)})"
+
+
+def count_derivations(root) -> Dict[int, int]:
+    """
+    Cuenta las derivaciones de cada nodo del bosque sin expandirlo.
+
+    El recorrido es iterativo (en postorden), así que no depende del límite
+    de recursión. Un ciclo en el bosque (derivaciones infinitas) se corta:
+    la arista que cierra el ciclo aporta 0.
+
+    Args:
+        root: SymbolNode raíz del bosque
+
+    Returns:
+        Dict[int, int]: id(nodo) -> número de derivaciones (nodos símbolo y
+            alternativas; los tokens cuentan 1 y no aparecen)
+    """
+    counts: Dict[int, int] = {}
+    in_progress = set()
+    stack = [(root, False)]
+    while stack:
+        node, expanded = stack.pop()
+        key = id(node)
+        if expanded:
+            in_progress.discard(key)
+            if isinstance(node, SymbolNode):
+                counts[key] = sum(counts.get(id(packed), 0) for packed in node.children)
+            else:
+                total = 1
+                for child in (node.left, node.right):
+                    if isinstance(child, (SymbolNode, PackedNode)):
+                        total *= counts.get(id(child), 0)
+                counts[key] = total
+            continue
+
+        if key in counts or key in in_progress:
+            continue
+        in_progress.add(key)
+        stack.append((node, True))
+        if isinstance(node, SymbolNode):
+            children = node.children
+        else:
+            children = [child for child in (node.left, node.right) if isinstance(child, (SymbolNode, PackedNode))]
+        for child in children:
+            if id(child) not in counts and id(child) not in in_progress:
+                stack.append((child, False))
+    return counts
+
+
+def _trim(text: str, start: int, end: int):
+    #Con el lexer dinámico los tramos incluyen los espacios ignorados
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def analyze_forest(root, text: str, counts: Optional[Dict[int, int]] = None) -> ForestAnalysis:
+    """
+    Analiza la ambigüedad de un bosque.
+
+    Args:
+        root: SymbolNode raíz del bosque
+        text (str): Consulta original (los tramos son posiciones en ella)
+        counts (dict): Conteos ya calculados con count_derivations()
+
+    Returns:
+        ForestAnalysis: Número exacto de derivaciones y todos los tramos
+            ambiguos, ordenados por posición
+    """
+    if counts is None:
+        counts = count_derivations(root)
+
+    spans: Dict[tuple, AmbiguousSpan] = {}
+    seen = {id(root)}
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        children = node.children
+        if len(children) > 1:
+            # Los nodos intermedios (reglas a medio reconocer) se atribuyen
+            # a la regla a la que pertenecen
+            rule_symbol = node.s[0].origin if node.is_intermediate else node.s
+            name = str(rule_symbol.name)
+            start, end = _trim(text, node.start, node.end)
+            key = (name, start, end)
+            alternatives = sum(1 for packed in children if counts.get(id(packed), 0))
+            span = spans.get(key)
+            if span is None:
+                spans[key] = AmbiguousSpan(name, start, end, text[start:end],
+                                           alternatives, counts.get(id(node), 0))
+            else:
+                span.alternatives += alternatives
+                span.derivations = max(span.derivations, counts.get(id(node), 0))
+        for packed in children:
+            for child in (packed.left, packed.right):
+                if isinstance(child, SymbolNode) and id(child) not in seen:
+                    seen.add(id(child))
+                    stack.append(child)
+
+    ordered = sorted(spans.values(), key=lambda span: (span.start, -span.end, span.symbol))
+    return ForestAnalysis(counts.get(id(root), 0), ordered)
+
+
+def tree_callbacks(lark_parser) -> dict:
+    """
+    Callbacks de construcción de árboles para un parser en modo 'forest'.
+
+    En ese modo Lark no los crea; se generan como para ambiguity='resolve',
+    así que los árboles salen con la misma forma que en el resto de modos.
+
+    Args:
+        lark_parser (Lark): Parser Earley con ambiguity='forest'
+
+    Returns:
+        dict: Regla -> función que construye su nodo
+    """
+    options = lark_parser.options
+    builder = ParseTreeBuilder(lark_parser.rules, options.tree_class or Tree, options.propagate_positions,
+                               False, options.maybe_placeholders)
+    return builder.create_callback(None)
+
+
+def _leaf_end(node) -> int:
+    #Posición donde termina un hijo del bosque (para ordenar alternativas)
+    if isinstance(node, SymbolNode):
+        return node.end
+    if isinstance(node, TokenNode):
+        return node.token.end_pos or 0
+    return -1
+
+
+class DerivationForest:
+    #Bosque de derivaciones con acceso por índice a cada derivación completa
+
+    def __init__(self, root, text: str, callbacks: dict):
+        """
+        Args:
+            root: SymbolNode raíz del bosque
+            text (str): Consulta original
+            callbacks (dict): Callbacks de construcción (ver tree_callbacks())
+        """
+        self.root = root
+        self.text = text
+        self._callbacks = callbacks
+        self._counts = count_derivations(root)
+        self._alternatives: Dict[int, list] = {}
+        self._analysis: Optional[ForestAnalysis] = None
+
+    @property
+    def derivation_count(self) -> int:
+        return self._counts.get(id(self.root), 0)
+
+    @property
+    def analysis(self) -> ForestAnalysis:
+        #Número de derivaciones y tramos ambiguos (se calcula una vez)
+        if self._analysis is None:
+            self._analysis = analyze_forest(self.root, self.text, self._counts)
+        return self._analysis
+
+    def _count(self, node) -> int:
+        if isinstance(node, (SymbolNode, PackedNode)):
+            return self._counts.get(id(node), 0)
+        return 1
+
+    def _ordered_alternatives(self, node) -> list:
+        """
+        Alternativas de un nodo en orden determinista.
+
+        El orden es el de las reglas en la gramática y, dentro de la misma
+        regla, de mayor a menor punto de corte (fin del hijo izquierdo), así
+        que la primera derivación agrupa por la izquierda. No depende del
+        orden en que Earley completó los ítems.
+
+        Returns:
+            list: (alternativa, derivaciones, derivaciones del hijo derecho)
+        """
+        alternatives = self._alternatives.get(id(node))
+        if alternatives is None:
+            alternatives = []
+            for packed in node.children:
+                count = self._counts.get(id(packed), 0)
+                if count:
+                    alternatives.append((packed, count, self._count(packed.right)))
+            alternatives.sort(key=lambda item: (item[0].is_empty, item[0].rule.order, -_leaf_end(item[0].left)))
+            self._alternatives[id(node)] = alternatives
+        return alternatives
+
+    def derivation(self, index: int) -> Tree:
+        """
+        Construye la derivación que ocupa la posición index, sin construir
+        ninguna otra.
+
+        Cada nodo reparte su índice entre sus alternativas según cuántas
+        derivaciones aporta cada una, y dentro de una alternativa entre el
+        hijo izquierdo y el derecho (el izquierdo varía más despacio).
+
+        Args:
+            index (int): Índice de la derivación (0 <= index < derivation_count)
+
+        Returns:
+            Tree: Árbol de Lark de la derivación
+
+        Raises:
+            IndexError: Si el índice está fuera de rango
+        """
+        if not 0 <= index < self.derivation_count:
+            raise IndexError(f"Índice de derivación {index} fuera de rango")
+
+        callbacks = self._callbacks
+        result: list = []
+        # (nodo, índice, lista de salida) para visitar; los cierres llevan
+        # además la alternativa elegida y los hijos ya construidos
+        stack: list = [(False, self.root, index, result)]
+        while stack:
+            item = stack.pop()
+            if item[0]:
+                _, node, packed, children, out = item
+                if node.is_intermediate:
+                    out.extend(children)
+                else:
+                    out.append(callbacks[packed.rule](children))
+                continue
+
+            _, node, rank, out = item
+            if isinstance(node, TokenNode):
+                out.append(node.token)
+                continue
+            if not isinstance(node, SymbolNode):
+                out.append(node)
+                continue
+
+            for packed, count, right_count in self._ordered_alternatives(node):
+                if rank < count:
+                    break
+                rank -= count
+            left_rank, right_rank = divmod(rank, right_count)
+
+            children: list = []
+            stack.append((True, node, packed, children, out))
+            # El izquierdo se apila el último para construirse primero
+            if packed.right is not None:
+                stack.append((False, packed.right, right_rank, children))
+            if packed.left is not None:
+                stack.append((False, packed.left, left_rank, children))
+        return result[0]
+
+    def iter_derivations(self, limit: Optional[int] = None, offset: int = 0) -> Iterator[Tree]:
+        """
+        Genera las derivaciones de forma perezosa, en orden determinista.
+
+        Args:
+            limit (int): Máximo de derivaciones a generar (None = todas)
+            offset (int): Índice de la primera derivación
+
+        Yields:
+            Tree: Árbol de Lark de cada derivación
+        """
+        stop = self.derivation_count
+        if limit is not None:
+            stop = min(stop, offset + limit)
+        for index in range(max(offset, 0), stop):
+            yield self.derivation(index)
+
+    def estimate_size(self) -> int:
+        #Estima los bytes que ocupan los nodos del bosque
+        total = 0
+        seen = {id(self.root)}
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            total += sys.getsizeof(node)
+            for packed in node.children:
+                total += sys.getsizeof(packed)
+                for child in (packed.left, packed.right):
+                    if isinstance(child, SymbolNode) and id(child) not in seen:
+                        seen.add(id(child))
+                        stack.append(child)
+        return total
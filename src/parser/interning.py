@@ -0,0 +1,466 @@
+# Subárboles compartidos entre los árboles de un lote (hash-consing)
+#
+# Un SubtreeInterner guarda cada subárbol distinto una sola vez, como nodo de
+# un DAG: un token es (terminal, valor) y un nodo interno es (regla, ids de
+# sus hijos, texto anónimo entre sus hijos). Dos subárboles iguales reciben
+# siempre el mismo id, así que compararlos es comparar dos enteros y un lote
+# de árboles se reduce a un id de raíz por consulta.
+#
+# El texto anónimo hace falta porque Lark descarta las cadenas anónimas: sin
+# él, "a = 1" y "a < 1" darían el mismo predicado (comp queda vacío) y
+# "a = 1 AND b = 2" y "a = 1 OR b = 2" el mismo nodo en la gramática
+# ambigua. Para cada nodo interno se guarda, normalizado, el texto que hay
+# entre el último token de un hijo y el primero del siguiente (operadores,
+# AND/OR, NOT y paréntesis interiores). Lo que precede al primer token o
+# sigue al último pertenece al nodo padre, así que dos subárboles con el
+# mismo id tienen los mismos tokens y el mismo texto desde su primer token
+# hasta el último (salvo espacios).
+#
+# Cada nodo tiene además un hash estructural de 64 bits (blake2b de la regla
+# o terminal, el valor o texto anónimo y los hashes de los hijos), calculado
+# una sola vez al crearlo. No depende del proceso ni del orden de inserción:
+# sirve para comparar subárboles entre lotes o entre procesos.
+#
+# Memoria: un CompactTree ya ocupa unos 11 bytes por nodo, así que un dict
+# de tuplas como tabla de hash-consing (más de 100 bytes por nodo único)
+# costaría más de lo que ahorra. Los nodos se guardan en arrays planos y la
+# tabla es de direccionamiento abierto sobre un array de ids.
+
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import hashlib
+import sys
+import threading
+
+from .compact_tree import SYMBOLS, TOKEN, TREE, CompactTree
+from .parse_tree import ParseTree
+
+# Huecos distintos entre hijos que se recuerdan ya normalizados
+_GAP_CACHE_SIZE = 4096
+
+
+class SubtreeInterner:
+    #Almacén de subárboles únicos (DAG) con ids y hashes estructurales
+
+    def __init__(self):
+        # Un nodo por id: tipo, símbolo, valor (token) o texto anónimo
+        # (nodo interno), hijos (tramo de _children) y hash estructural
+        self._kinds = array('B')
+        self._names = array('H')
+        self._values: List = []
+        self._child_start = array('I')
+        self._child_count = array('I')
+        self._children = array('I')
+        self._hashes = array('Q')
+        # Tabla de hash-consing: ranuras con el id del nodo (-1 = libre) y,
+        # por nodo, los 32 bits bajos del hash de su clave (bastan para
+        # elegir ranura y descartar casi todas las comparaciones)
+        self._table = array('i', [-1]) * 1024
+        self._key_hashes = array('I')
+        # Textos anónimos distintos (son pocos: operadores, AND, OR...) y
+        # texto original -> texto normalizado de los huecos entre hijos
+        self._hidden: Dict[tuple, tuple] = {}
+        self._gaps: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._seen = 0
+
+    def intern(self, compact: CompactTree, root: int = 0) -> int:
+        """
+        Añade un árbol (o el subárbol de root) al DAG.
+
+        Args:
+            compact (CompactTree): Árbol compacto
+            root (int): Nodo raíz del subárbol
+
+        Returns:
+            int: Id del subárbol (el mismo para cualquier subárbol igual)
+        """
+        return self._intern(compact, root)[0]
+
+    def _intern(self, compact: CompactTree, root: int) -> Tuple[int, int, int]:
+        #Como intern(), y retorna también el tramo de texto del subárbol (inicio -1: sin tokens)
+        text = compact.text
+        kinds = compact._kinds
+        names = compact._names
+        first = compact._first
+        second = compact._second
+        values = compact._values
+        size = len(kinds)
+        # Los nodos se numeran en anchura: recorridos al revés, los hijos se
+        # internan antes que su padre. Para un subárbol se recorre su preorden
+        if root:
+            order = [root]
+            for index in order:
+                if kinds[index] == TREE:
+                    order.extend(range(first[index], first[index] + second[index]))
+            order.reverse()
+        else:
+            order = range(size - 1, -1, -1)
+
+        ids = [0] * size
+        # Tramo de texto de cada nodo (inicio -1: sin posición)
+        starts = [-1] * size
+        ends = [0] * size
+        gap_cache = self._gaps
+        node_kinds = self._kinds
+        node_names = self._names
+        node_values = self._values
+        child_start = self._child_start
+        child_count = self._child_count
+        node_children = self._children
+        key_hashes = self._key_hashes
+        with self._lock:
+            for index in order:
+                name_id = names[index]
+                if kinds[index] == TOKEN:
+                    start = first[index]
+                    end = second[index]
+                    if values and index in values:
+                        value = values[index]
+                    else:
+                        value = text[start:end]
+                        starts[index] = start
+                        ends[index] = end
+                    key_hash = hash((name_id, value)) & 0xFFFFFFFF
+                    table = self._table
+                    mask = len(table) - 1
+                    slot = key_hash & mask
+                    while True:
+                        node_id = table[slot]
+                        if node_id < 0:
+                            node_id = self._add(TOKEN, name_id, value, (), key_hash, slot)
+                            break
+                        if key_hashes[node_id] == key_hash and node_kinds[node_id] == TOKEN \
+                                and node_names[node_id] == name_id and node_values[node_id] == value:
+                            break
+                        slot = (slot + 1) & mask
+                    ids[index] = node_id
+                    continue
+
+                child_first = first[index]
+                child_end = child_first + second[index]
+                children = tuple(ids[child_first:child_end])
+                gaps = []
+                start = -1
+                end = 0
+                for child in range(child_first, child_end):
+                    child_start_pos = starts[child]
+                    if child_start_pos < 0:
+                        continue
+                    if start < 0:
+                        start = child_start_pos
+                    else:
+                        raw = text[end:child_start_pos]
+                        gap = gap_cache.get(raw)
+                        if gap is None:
+                            gap = ' '.join(raw.split())
+                            if len(gap_cache) < _GAP_CACHE_SIZE:
+                                gap_cache[raw] = gap
+                        gaps.append(gap)
+                    end = ends[child]
+                starts[index] = start
+                ends[index] = end
+                gaps = tuple(gaps)
+
+                # Sondeo lineal en la tabla
+                key_hash = hash((name_id, gaps, children)) & 0xFFFFFFFF
+                table = self._table
+                mask = len(table) - 1
+                slot = key_hash & mask
+                count = len(children)
+                while True:
+                    node_id = table[slot]
+                    if node_id < 0:
+                        node_id = self._add(TREE, name_id, gaps, children, key_hash, slot)
+                        break
+                    if key_hashes[node_id] == key_hash and node_kinds[node_id] == TREE \
+                            and node_names[node_id] == name_id and child_count[node_id] == count \
+                            and node_values[node_id] == gaps:
+                        offset = child_start[node_id]
+                        if tuple(node_children[offset:offset + count]) == children:
+                            break
+                    slot = (slot + 1) & mask
+                ids[index] = node_id
+            self._seen += len(order)
+        return ids[root], starts[root], ends[root]
+
+    def _add(self, kind: int, name_id: int, value, children: tuple, key_hash: int, slot: int) -> int:
+        #Crea un nodo (con su hash estructural) en la ranura slot de la tabla
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(bytes((kind,)))
+        digest.update(SYMBOLS.name(name_id).encode('utf-8'))
+        digest.update(b'\x00')
+        digest.update(('\x1f'.join(value) if kind == TREE else value).encode('utf-8'))
+        digest.update(b'\x00')
+        hashes = self._hashes
+        for child in children:
+            digest.update(hashes[child].to_bytes(8, 'little'))
+
+        node_id = len(self._kinds)
+        self._kinds.append(kind)
+        self._names.append(name_id)
+        self._values.append(self._hidden.setdefault(value, value) if kind == TREE else value)
+        self._child_start.append(len(self._children))
+        self._child_count.append(len(children))
+        self._children.extend(children)
+        self._hashes.append(int.from_bytes(digest.digest(), 'little'))
+        self._key_hashes.append(key_hash)
+        self._table[slot] = node_id
+        if len(self._kinds) * 3 > len(self._table) * 2:
+            self._grow()
+        return node_id
+
+    def _grow(self):
+        #Duplica la tabla (ocupación máxima 2/3) y recoloca los nodos
+        table = array('i', [-1]) * (len(self._table) * 2)
+        mask = len(table) - 1
+        for node_id, key_hash in enumerate(self._key_hashes):
+            slot = key_hash & mask
+            while table[slot] >= 0:
+                slot = (slot + 1) & mask
+            table[slot] = node_id
+        self._table = table
+
+    def __len__(self):
+        return len(self._kinds)
+
+    def is_token(self, node_id: int) -> bool:
+        return self._kinds[node_id] == TOKEN
+
+    def name(self, node_id: int) -> str:
+        #Regla (nodo interno) o tipo de terminal (token)
+        return SYMBOLS.name(self._names[node_id])
+
+    def value(self, node_id: int) -> Optional[str]:
+        #Valor de un token, o None para nodos internos
+        return self._values[node_id] if self._kinds[node_id] == TOKEN else None
+
+    def hidden_text(self, node_id: int) -> Tuple[str, ...]:
+        #Texto anónimo entre los hijos de un nodo interno (vacío para tokens)
+        return self._values[node_id] if self._kinds[node_id] == TREE else ()
+
+    def children(self, node_id: int) -> Tuple[int, ...]:
+        start = self._child_start[node_id]
+        return tuple(self._children[start:start + self._child_count[node_id]])
+
+    def structural_hash(self, node_id: int) -> int:
+        #Hash estructural de 64 bits (estable entre procesos)
+        return self._hashes[node_id]
+
+    def iter_subtrees(self, node_id: int) -> Iterator[int]:
+        #Ids de todos los subárboles de un nodo, él incluido (en preorden, con repeticiones)
+        stack = [node_id]
+        while stack:
+            current = stack.pop()
+            yield current
+            stack.extend(reversed(self.children(current)))
+
+    def to_compact(self, node_id: int, prefix: str = '', suffix: str = '') -> CompactTree:
+        """
+        Reconstruye el árbol compacto de un subárbol.
+
+        El texto se rehace con los tokens separados por un espacio y el texto
+        anónimo guardado entre los hijos, así que los tokens tienen posición:
+        el árbol se puede volver a internar (da el mismo id) y planificar.
+
+        Args:
+            node_id (int): Id del subárbol
+            prefix (str): Texto anterior al primer token (p. ej. 'SELECT'), que
+                pertenece al padre y no se guarda en el DAG
+            suffix (str): Texto posterior al último token (p. ej. 'DESC')
+
+        Returns:
+            CompactTree: Árbol con la misma estructura y los mismos valores,
+                sobre el texto reconstruido (espacios normalizados)
+        """
+        kinds = array('B')
+        names = array('H')
+        first = array('I')
+        second = array('I')
+        nodes = [node_id]
+        for index, current in enumerate(nodes):
+            kind = self._kinds[current]
+            kinds.append(kind)
+            names.append(self._names[current])
+            if kind == TOKEN:
+                first.append(0)
+                second.append(0)
+            else:
+                children = self.children(current)
+                first.append(len(nodes))
+                second.append(len(children))
+                nodes.extend(children)
+
+        # Nodos con algún token: el texto anónimo va entre hijos con tokens
+        has_tokens = [False] * len(nodes)
+        for index in range(len(nodes) - 1, -1, -1):
+            if kinds[index] == TOKEN:
+                has_tokens[index] = True
+            else:
+                has_tokens[index] = any(has_tokens[first[index]:first[index] + second[index]])
+
+        pieces = []
+        position = 0
+        stack: List = [suffix, 0, prefix]
+        while stack:
+            item = stack.pop()
+            if item.__class__ is str:
+                if item:
+                    if pieces:
+                        pieces.append(' ')
+                        position += 1
+                    pieces.append(item)
+                    position += len(item)
+            elif kinds[item] == TOKEN:
+                value = self._values[nodes[item]]
+                if pieces and value:
+                    pieces.append(' ')
+                    position += 1
+                first[item] = position
+                pieces.append(value)
+                position += len(value)
+                second[item] = position
+            else:
+                gaps = self._values[nodes[item]]
+                children = [child for child in range(first[item], first[item] + second[item]) if has_tokens[child]]
+                sequence: List = []
+                for i, child in enumerate(children):
+                    if i:
+                        sequence.append(gaps[i - 1] if i - 1 < len(gaps) else '')
+                    sequence.append(child)
+                stack.extend(reversed(sequence))
+        return CompactTree(''.join(pieces), kinds, names, first, second)
+
+    def get_stats(self) -> dict:
+        #Nodos vistos, nodos únicos y bytes que ocupa el DAG
+        with self._lock:
+            return {
+                'nodes_seen': self._seen,
+                'unique_nodes': len(self._kinds),
+                'sharing': self._seen / len(self._kinds) if self._kinds else 0.0,
+                'nbytes': self.nbytes(),
+            }
+
+    def nbytes(self) -> int:
+        #Bytes del DAG: arrays, valores y tabla de hash-consing
+        total = sys.getsizeof(self._values) + sys.getsizeof(self._hidden) + sys.getsizeof(self._gaps)
+        for arr in (self._kinds, self._names, self._child_start, self._child_count, self._children, self._hashes,
+                    self._table, self._key_hashes):
+            total += sys.getsizeof(arr)
+        for kind, value in zip(self._kinds, self._values):
+            if kind == TOKEN:
+                total += sys.getsizeof(value)
+        for hidden in self._hidden:
+            total += sys.getsizeof(hidden) + sum(sys.getsizeof(gap) for gap in hidden)
+        return total
+
+
+class InternedBatch:
+    #Lote de árboles guardado como ids de raíz sobre un SubtreeInterner
+
+    __slots__ = ('interner', 'queries', '_roots', '_outer')
+
+    def __init__(self, interner: Optional[SubtreeInterner] = None):
+        """
+        Args:
+            interner (SubtreeInterner): DAG a usar (puede compartirse entre
+                lotes para compartir también sus subárboles)
+        """
+        self.interner = interner if interner is not None else SubtreeInterner()
+        self.queries: List[str] = []
+        self._roots = array('q')
+        # Por consulta, inicio del primer token y fin del último: el texto de
+        # fuera (SELECT, ASC/DESC) no está en el DAG y se toma de la consulta
+        self._outer = array('I')
+
+    @classmethod
+    def from_trees(cls, results: Iterable[Tuple[str, Optional[ParseTree]]],
+                   interner: Optional[SubtreeInterner] = None) -> 'InternedBatch':
+        """
+        Crea el lote a partir de los resultados de SQLParser.parse_multiple().
+
+        Args:
+            results (Iterable[Tuple[str, ParseTree]]): Pares (consulta, árbol o None)
+            interner (SubtreeInterner): DAG a usar
+
+        Returns:
+            InternedBatch: Lote con un id de raíz por consulta
+        """
+        batch = cls(interner)
+        for query, tree in results:
+            batch.add(query, tree)
+        return batch
+
+    def add(self, query: str, tree: Optional[ParseTree]) -> int:
+        #Añade una consulta y retorna el id de su árbol (-1 si no se pudo parsear)
+        root, start, end = -1, 0, 0
+        if tree is not None:
+            root, start, end = self.interner._intern(tree.compact_tree, 0)
+            start = max(start, 0)
+        self.queries.append(query)
+        self._roots.append(root)
+        self._outer.extend((start, end))
+        return root
+
+    def __len__(self):
+        return len(self._roots)
+
+    def root(self, index: int) -> Optional[int]:
+        #Id del árbol de la consulta index, o None si no se pudo parsear
+        root = self._roots[index]
+        return root if root >= 0 else None
+
+    def tree(self, index: int) -> Optional[ParseTree]:
+        """
+        Reconstruye el ParseTree de una consulta.
+
+        El texto del árbol es el de la consulta con los espacios normalizados
+        (ver SubtreeInterner.to_compact()): se puede volver a internar y
+        planificar (plan_query()).
+
+        Args:
+            index (int): Posición de la consulta en el lote
+
+        Returns:
+            ParseTree: Árbol de la consulta, o None si no se pudo parsear
+        """
+        root = self.root(index)
+        if root is None:
+            return None
+        query = self.queries[index]
+        start, end = self._outer[2 * index], self._outer[2 * index + 1]
+        compact = self.interner.to_compact(root, ' '.join(query[:start].split()), ' '.join(query[end:].split()))
+        return ParseTree.from_compact(compact, query)
+
+    def same_tree(self, first: int, second: int) -> bool:
+        #Si dos consultas tienen el mismo árbol (O(1))
+        return self._roots[first] == self._roots[second] and self._roots[first] >= 0
+
+    def group(self, rule: str = 'predicate') -> Dict[int, List[int]]:
+        """
+        Agrupa las consultas por los subárboles iguales que contienen.
+
+        Args:
+            rule (str): Regla de los subárboles a agrupar
+
+        Returns:
+            Dict[int, List[int]]: Id del subárbol -> índices de las consultas
+                que lo contienen (cada consulta una vez), de los subárboles
+                más repetidos a los menos
+        """
+        interner = self.interner
+        groups: Dict[int, List[int]] = {}
+        for index, root in enumerate(self._roots):
+            if root < 0:
+                continue
+            found = {node for node in interner.iter_subtrees(root) if interner.name(node) == rule}
+            for node in found:
+                groups.setdefault(node, []).append(index)
+        return dict(sorted(groups.items(), key=lambda item: -len(item[1])))
+
+    def nbytes(self, include_queries: bool = False) -> int:
+        #Bytes de las raíces (y opcionalmente de las consultas); el DAG se mide aparte
+        total = sys.getsizeof(self) + sys.getsizeof(self._roots) + sys.getsizeof(self._outer)
+        if include_queries:
+            total += sys.getsizeof(self.queries) + sum(sys.getsizeof(query) for query in self.queries)
+        return total
@@ -0,0 +1,262 @@
+# Instrumentación opcional del parser y del validador
+#
+# Desactivada por defecto. Los puntos instrumentados consultan METRICS.enabled
+# antes de tomar tiempos, así que con la instrumentación apagada solo cuesta
+# la lectura de un atributo por llamada.
+#
+# Con ella activada se registran:
+#
+# - histogramas de duración por fase (lex, parse, forest, tree, template,
+#   validate_syntax y rules, el recorrido único de las reglas del validador)
+# - contadores de resultados, errores por tipo, consultas ambiguas y
+#   mensajes por regla del validador
+# - estadísticas de las cachés registradas (como gauges)
+#
+# y se pueden exportar en el formato de texto de Prometheus o recibir en
+# callbacks (hooks) a medida que se producen.
+
+from typing import Callable, Dict, List, Optional, Tuple
+import threading
+import time
+
+# Límites superiores (en segundos) de los buckets de los histogramas de fases
+DEFAULT_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001,
+                   0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+PREFIX = 'sqlparser'
+
+# Etiquetas de una serie, ordenadas: (("phase", "lex"), ...)
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    #Histograma acumulativo al estilo de Prometheus
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def cumulative(self) -> List[int]:
+        #Cuentas acumuladas por bucket (lo que espera el formato de Prometheus)
+        total = 0
+        result = []
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    #Etiquetas en la sintaxis de Prometheus: {clave="valor",...}
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in items) + '}'
+
+
+class Metrics:
+    #Registro de métricas del proceso
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._histograms: Dict[Labels, Histogram] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._hooks: List[Callable[[str, str, float, Dict[str, str]], None]] = []
+        self._collectors: Dict[str, Callable[[], Dict[str, float]]] = {}
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        #Borra histogramas y contadores (los hooks y colectores se conservan)
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def observe(self, phase: str, seconds: float, **labels):
+        """
+        Registra la duración de una fase.
+
+        Args:
+            phase (str): Nombre de la fase
+            seconds (float): Duración en segundos
+            labels: Etiquetas adicionales (p. ej. algorithm='lalr')
+        """
+        labels['phase'] = phase
+        key = _labels(labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+        self._notify('phase_seconds', seconds, labels)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """
+        Incrementa un contador.
+
+        Args:
+            name (str): Nombre del contador (sin prefijo ni sufijo _total)
+            value (float): Incremento
+            labels: Etiquetas de la serie
+        """
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+        self._notify(name, value, labels)
+
+    def since(self, phase: str, started: float, **labels) -> float:
+        #Registra la fase que empezó en started (perf_counter) y retorna el instante actual
+        now = time.perf_counter()
+        self.observe(phase, now - started, **labels)
+        return now
+
+    def add_hook(self, hook: Callable[[str, str, float, Dict[str, str]], None]):
+        """
+        Registra un callback que recibe cada observación.
+
+        El callback se llama como hook(tipo, nombre, valor, etiquetas), con
+        tipo 'histogram' o 'counter', en el hilo que hizo la medición. Sus
+        excepciones se ignoran para no afectar al parsing.
+        """
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook: Callable):
+        if hook in self._hooks:
+            self._hooks.remove(hook)
+
+    def _notify(self, name: str, value: float, labels: Dict[str, str]):
+        if not self._hooks:
+            return
+        kind = 'histogram' if name == 'phase_seconds' else 'counter'
+        for hook in list(self._hooks):
+            try:
+                hook(kind, name, value, labels)
+            except Exception:
+                pass
+
+    def register_collector(self, name: str, collector: Callable[[], Dict[str, float]]):
+        """
+        Registra una fuente de gauges que se lee al exportar (p. ej. las
+        estadísticas de una caché). Un nombre repetido sustituye al anterior.
+
+        Args:
+            name (str): Identificador de la fuente (etiqueta source)
+            collector (Callable): Función que retorna {métrica: valor}
+        """
+        with self._lock:
+            self._collectors[name] = collector
+
+    def unregister_collector(self, name: str):
+        with self._lock:
+            self._collectors.pop(name, None)
+
+    def phases(self) -> List[Tuple[Dict[str, str], int, float]]:
+        #(etiquetas, observaciones, segundos en total) de cada serie de fases
+        with self._lock:
+            return [(dict(labels), h.count, h.sum) for labels, h in sorted(self._histograms.items())]
+
+    def phase_count(self, phase: str) -> int:
+        #Observaciones registradas de una fase (sumando todas sus etiquetas)
+        with self._lock:
+            return sum(h.count for key, h in self._histograms.items() if ('phase', phase) in key)
+
+    def counter(self, name: str, **labels) -> float:
+        #Valor de un contador; sin etiquetas, la suma de todas sus series
+        with self._lock:
+            if labels:
+                return self._counters.get((name, _labels(labels)), 0)
+            return sum(value for (counter, _), value in self._counters.items() if counter == name)
+
+    def render_prometheus(self) -> str:
+        """
+        Exporta las métricas en el formato de texto de Prometheus.
+
+        Returns:
+            str: Exposición con histogramas, contadores y gauges
+        """
+        lines: List[str] = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+            collectors = list(self._collectors.items())
+
+        name = f"{PREFIX}_phase_seconds"
+        lines.append(f"# HELP {name} Duración de cada fase del parsing y la validación")
+        lines.append(f"# TYPE {name} histogram")
+        for labels, histogram in histograms:
+            for bound, count in zip(histogram.buckets, histogram.cumulative()):
+                lines.append(f"{name}_bucket{_format_labels(labels, ('le', repr(bound)))} {count}")
+            lines.append(f"{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {histogram.count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum!r}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+        declared = set()
+        for (counter, labels), value in counters:
+            full = f"{PREFIX}_{counter}_total"
+            if full not in declared:
+                declared.add(full)
+                lines.append(f"# TYPE {full} counter")
+            lines.append(f"{full}{_format_labels(labels)} {_number(value)}")
+
+        gauges: Dict[str, List[str]] = {}
+        for source, collector in collectors:
+            try:
+                values = collector()
+            except Exception:
+                continue
+            for metric, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    full = f"{PREFIX}_{metric}"
+                    gauges.setdefault(full, []).append(
+                        f"{full}{_format_labels((('source', source),))} {_number(value)}")
+        for full, samples in sorted(gauges.items()):
+            lines.append(f"# TYPE {full} gauge")
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# Registro global del proceso
+METRICS = Metrics()
+
+
+def enable_metrics() -> Metrics:
+    #Activa la instrumentación y retorna el registro global
+    METRICS.enable()
+    return METRICS
+
+
+def disable_metrics():
+    METRICS.disable()
+
+
+def get_metrics() -> Metrics:
+    return METRICS
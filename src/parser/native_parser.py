@@ -0,0 +1,335 @@
+# Parser nativo para la gramática no ambigua
+#
+# Descenso recursivo escrito a mano para SQL_GRAMMAR_UNAMBIGUOUS, con
+# precedencia por niveles (OR < AND < NOT) para las condiciones. Produce
+# directamente el CompactTree que saldría del árbol de Lark:
+#
+# - las palabras clave, los paréntesis y los operadores de comparación no
+#   generan tokens (Lark descarta las cadenas anónimas); comp queda vacío
+# - or_expr y and_expr solo aparecen con dos o más operandos y sus operandos
+#   se aplanan; NOT y los paréntesis no dejan nodo propio (not_expr se
+#   inlinea), igual que las reglas ?or_expr, ?and_expr y ?not_expr
+#
+# tokenize() es un lexer de una sola pasada equivalente al lexer básico de la
+# gramática (el de SQLParser.tokenize y las huellas): mismos tipos, valores y
+# posiciones, sin pasar por la maquinaria genérica de Lark.
+#
+# Los tokens se reconocen con las expresiones regulares de los terminales de
+# la gramática compilada y, al parsear, las palabras clave siguen las reglas
+# del lexer contextual: donde solo se espera un identificador, SELECT o FROM son CNAME;
+# donde se espera una palabra clave, se acepta aunque vaya pegada al
+# siguiente token (FROMt). Ante cualquier entrada que no reconozca, el parser
+# no decide: retorna None y SQLParser repite el parsing con Lark, que da el
+# resultado y el mensaje de error definitivos.
+
+from array import array
+from lark import Lark, Token
+from typing import List, Optional, Tuple
+import re
+
+from .compact_tree import SYMBOLS, TOKEN, TREE, CompactTree
+
+# Operadores de comparación, los de dos caracteres primero (como el lexer de Lark)
+_COMPARISONS = ('<>', '!=', '<=', '>=', '<', '>', '=')
+
+# Operadores binarios de las condiciones, de menor a mayor precedencia
+_BINARY = (('OR', 'or_expr'), ('AND', 'and_expr'))
+
+# Palabras clave que pueden seguir a un operando (la más larga primero)
+_AFTER_OPERAND = ('ORDER', 'AND', 'OR')
+
+_WHITESPACE = ' \t\f\r\n'
+
+
+class _Reject(Exception):
+    #Entrada que el parser nativo no reconoce (la decide Lark)
+    pass
+
+
+_REJECT = _Reject()
+
+
+class NativeSQLParser:
+    #Parser de descenso recursivo para la gramática no ambigua
+
+    def __init__(self, lark_parser: Lark):
+        """
+        Args:
+            lark_parser (Lark): Parser de la gramática no ambigua; de él se
+                toman las expresiones regulares de los terminales
+
+        Raises:
+            ValueError: Si la gramática no es la no ambigua
+        """
+        rules = {str(rule.origin.name) for rule in lark_parser.rules}
+        terminals = {t.name: t for t in lark_parser.terminals}
+        missing = ({'query', 'or_expr', 'and_expr', 'predicate', 'comp', 'value', 'order_clause'} - rules) | \
+                  ({'CNAME', 'NUMBER', 'STRING', 'SINGLE_STRING', 'WS'} - set(terminals))
+        if missing:
+            raise ValueError(f"El parser nativo solo admite la gramática no ambigua (falta: {', '.join(sorted(missing))})")
+
+        flags = lark_parser.options.g_regex_flags
+
+        def compile_terminal(name: str):
+            return re.compile(terminals[name].pattern.to_regexp(), flags).match
+
+        self._ws = compile_terminal('WS')
+        self._cname = compile_terminal('CNAME')
+
+        # Terminal de value según el primer carácter (sus comienzos no se solapan)
+        starts = {'CNAME': '_abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ',
+                  'NUMBER': '.0123456789', 'STRING': '"', 'SINGLE_STRING': "'"}
+        self._values = {}
+        for name, chars in starts.items():
+            match = compile_terminal(name)
+            for char in chars:
+                self._values[char] = (SYMBOLS.intern(name), match)
+
+        # Lexer de tokenize(): una sola expresión regular con todos los
+        # terminales. Las cadenas fijas que casan con CNAME son palabras clave
+        # (el lexer básico las reconoce como CNAME y luego las reasigna); el
+        # resto de cadenas son signos, los más largos primero
+        self._keywords = {}
+        alternatives = [(name, terminals[name].pattern.to_regexp()) for name in
+                        ('WS', 'CNAME', 'NUMBER', 'STRING', 'SINGLE_STRING')]
+        strings = sorted((t for t in terminals.values() if t.pattern.type == 'str'),
+                         key=lambda t: (-len(t.pattern.value), t.name))
+        for terminal in strings:
+            value = terminal.pattern.value
+            match = self._cname(value)
+            if match is not None and match.end() == len(value):
+                self._keywords[value] = terminal.name
+            else:
+                alternatives.append((terminal.name, re.escape(value)))
+        self._scan = re.compile('|'.join(f'(?P<{name}>{pattern})' for name, pattern in alternatives), flags).match
+
+        intern = SYMBOLS.intern
+        self._cname_id = intern('CNAME')
+        self._query_id = intern('query')
+        self._columns_id = intern('columns')
+        self._column_id = intern('column')
+        self._table_id = intern('table')
+        self._where_id = intern('where_clause')
+        self._order_id = intern('order_clause')
+        self._predicate_id = intern('predicate')
+        self._value_id = intern('value')
+        self._comp_id = intern('comp')
+        self._binary = tuple((keyword, intern(rule)) for keyword, rule in _BINARY)
+
+    def parse(self, text: str) -> Optional[CompactTree]:
+        """
+        Parsea la consulta.
+
+        Args:
+            text (str): Consulta SQL
+
+        Returns:
+            CompactTree: Árbol igual al que construye Lark, o None si la
+                consulta no se reconoce (hay que parsearla con Lark)
+        """
+        if not isinstance(text, str):
+            return None
+        try:
+            root = self._query(text)
+        except (_Reject, RecursionError):
+            return None
+        return _to_compact(root, text)
+
+    def tokenize(self, text: str) -> Optional[List[Token]]:
+        """
+        Tokeniza la consulta como el lexer básico de la gramática.
+
+        Args:
+            text (str): Consulta SQL
+
+        Returns:
+            List[Token]: Tokens (sin espacios) con tipo, valor, posición, línea
+                y columna, o None si hay un carácter que no inicia ningún
+                terminal (Lark da el error)
+        """
+        if not isinstance(text, str):
+            return None
+        scan = self._scan
+        keywords = self._keywords
+        # Constructor sin la comprobación de argumentos obsoletos de Token.__new__
+        new_token = getattr(Token, '_future_new', Token)
+        tokens = []
+        append = tokens.append
+        size = len(text)
+        pos = 0
+        line = 1
+        line_start = 0
+        while pos < size:
+            found = scan(text, pos)
+            if found is None:
+                return None
+            name = found.lastgroup
+            end = found.end()
+            if name == 'WS':
+                newlines = text.count('\n', pos, end)
+                if newlines:
+                    line += newlines
+                    line_start = text.rindex('\n', pos, end) + 1
+                pos = end
+                continue
+
+            value = found.group()
+            if name == 'CNAME':
+                name = keywords.get(value, name)
+
+            newlines = value.count('\n') if name == 'SINGLE_STRING' else 0
+            if newlines:
+                end_line = line + newlines
+                end_line_start = text.rindex('\n', pos, end) + 1
+            else:
+                end_line = line
+                end_line_start = line_start
+            append(new_token(name, value, pos, line, pos - line_start + 1, end_line, end - end_line_start + 1, end))
+            line = end_line
+            line_start = end_line_start
+            pos = end
+        return tokens
+
+    def _skip(self, text: str, pos: int) -> int:
+        #Salta el espacio en blanco (terminal WS, ignorado)
+        if pos < len(text) and text[pos] in _WHITESPACE:
+            return self._ws(text, pos).end()
+        return pos
+
+    def _identifier(self, text: str, pos: int) -> Tuple[tuple, int]:
+        #CNAME donde solo se espera un identificador (las palabras clave también lo son)
+        match = self._cname(text, pos)
+        if match is None:
+            raise _REJECT
+        end = match.end()
+        return (self._cname_id, pos, end), self._skip(text, end)
+
+    def _query(self, text: str) -> tuple:
+        skip = self._skip
+        pos = skip(text, 0)
+        if not text.startswith('SELECT', pos):
+            raise _REJECT
+        pos = skip(text, pos + 6)
+
+        columns: List[tuple] = []
+        if text.startswith('*', pos):
+            pos = skip(text, pos + 1)
+        else:
+            while True:
+                token, pos = self._identifier(text, pos)
+                columns.append((self._column_id, [token]))
+                if not text.startswith(',', pos):
+                    break
+                pos = skip(text, pos + 1)
+
+        if not text.startswith('FROM', pos):
+            raise _REJECT
+        token, pos = self._identifier(text, skip(text, pos + 4))
+        children = [(self._columns_id, columns), (self._table_id, [token])]
+
+        if text.startswith('WHERE', pos):
+            condition, pos = self._condition(text, skip(text, pos + 5), 0)
+            children.append((self._where_id, [condition]))
+
+        if text.startswith('ORDER', pos):
+            pos = skip(text, pos + 5)
+            if not text.startswith('BY', pos):
+                raise _REJECT
+            token, pos = self._identifier(text, skip(text, pos + 2))
+            if text.startswith('ASC', pos):
+                pos = skip(text, pos + 3)
+            elif text.startswith('DESC', pos):
+                pos = skip(text, pos + 4)
+            children.append((self._order_id, [(self._column_id, [token])]))
+
+        if pos != len(text):
+            raise _REJECT
+        return self._query_id, children
+
+    def _condition(self, text: str, pos: int, level: int) -> Tuple[tuple, int]:
+        #Operandos del nivel de precedencia level unidos por su operador
+        if level == len(self._binary):
+            return self._operand(text, pos)
+        keyword, rule_id = self._binary[level]
+        node, pos = self._condition(text, pos, level + 1)
+        if _keyword_at(text, pos) != keyword:
+            return node, pos
+        operands = [node]
+        while _keyword_at(text, pos) == keyword:
+            node, pos = self._condition(text, self._skip(text, pos + len(keyword)), level + 1)
+            operands.append(node)
+        return (rule_id, operands), pos
+
+    def _operand(self, text: str, pos: int) -> Tuple[tuple, int]:
+        #NOT operando, (condición) o predicado; ni NOT ni los paréntesis dejan nodo
+        if text.startswith('(', pos):
+            node, pos = self._condition(text, self._skip(text, pos + 1), 0)
+            if not text.startswith(')', pos):
+                raise _REJECT
+            return node, self._skip(text, pos + 1)
+
+        # Aquí NOT es palabra clave solo si el identificador completo es NOT
+        while text.startswith('NOT', pos) and self._cname(text, pos).end() - pos == 3:
+            pos = self._skip(text, pos + 3)
+            if text.startswith('(', pos):
+                return self._operand(text, pos)
+
+        left, pos = self._value(text, pos)
+        for operator in _COMPARISONS:
+            if text.startswith(operator, pos):
+                pos = self._skip(text, pos + len(operator))
+                break
+        else:
+            raise _REJECT
+        right, pos = self._value(text, pos)
+        return (self._predicate_id, [left, (self._comp_id, []), right]), pos
+
+    def _value(self, text: str, pos: int) -> Tuple[tuple, int]:
+        #Literal o identificador
+        terminal = self._values.get(text[pos:pos + 1])
+        if terminal is None:
+            raise _REJECT
+        terminal_id, match = terminal
+        found = match(text, pos)
+        if found is None:
+            raise _REJECT
+        end = found.end()
+        return (self._value_id, [(terminal_id, pos, end)]), self._skip(text, end)
+
+
+def _keyword_at(text: str, pos: int) -> Optional[str]:
+    #Palabra clave que sigue a un operando (ORDER antes que OR, como el lexer de Lark)
+    for keyword in _AFTER_OPERAND:
+        if text.startswith(keyword, pos):
+            return keyword
+    return None
+
+
+def _to_compact(root: tuple, text: str) -> CompactTree:
+    #Numera los nodos en anchura, como CompactTree.from_lark
+    kinds = []
+    names = []
+    first = []
+    second = []
+    queue = [root]
+    for node in queue:
+        names.append(node[0])
+        if len(node) == 2:
+            children = node[1]
+            kinds.append(TREE)
+            first.append(len(queue))
+            second.append(len(children))
+            queue.extend(children)
+        else:
+            kinds.append(TOKEN)
+            first.append(node[1])
+            second.append(node[2])
+    return CompactTree(text, array('B', kinds), array('H', names), array('I', first), array('I', second))
+
+
+def build_native_parser(lark_parser: Lark) -> Optional[NativeSQLParser]:
+    #Crea el parser nativo, o None si la gramática no es la no ambigua
+    try:
+        return NativeSQLParser(lark_parser)
+    except (ValueError, AttributeError, KeyError):
+        return None
@@ -0,0 +1,123 @@
+# Caché LRU de resultados de parsing
+#
+# Las consultas se indexan por su texto normalizado (espacios colapsados fuera
+# de los literales). La caché guarda su propia copia de cada árbol y entrega
+# copias, de modo que un llamador no puede alterar el resultado de otro.
+
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+import re
+import threading
+
+# Literales entre comillas (se conservan tal cual) o secuencias de espacios
+_WHITESPACE_RE = re.compile(r"""('[^']*'|"(?:\\.|[^"\\])*")|\s+""")
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normaliza los espacios de una consulta sin tocar los literales.
+
+    Args:
+        query (str): Consulta SQL
+
+    Returns:
+        str: Consulta con los espacios colapsados a uno solo
+    """
+    return _WHITESPACE_RE.sub(lambda m: m.group(1) or ' ', query).strip()
+
+
+class ParseCache:
+    #Caché LRU acotada por número de entradas y por memoria estimada
+
+    def __init__(self, max_entries: int = 1024, max_bytes: Optional[int] = None,
+                 size_of: Optional[Callable[[Any], int]] = None):
+        """
+        Inicializa la caché.
+
+        Args:
+            max_entries (int): Número máximo de entradas
+            max_bytes (int): Memoria máxima estimada (None = sin límite)
+            size_of (Callable): Función que estima el tamaño en bytes de un valor
+        """
+        if max_entries <= 0:
+            raise ValueError("max_entries debe ser mayor que cero")
+
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._size_of = size_of or (lambda value: 0)
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Busca una entrada y la marca como usada recientemente.
+
+        Args:
+            key (Hashable): Clave de la entrada
+
+        Returns:
+            Any: Valor guardado, o None si no está
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any):
+        """
+        Guarda una entrada, expulsando las menos usadas si se superan los límites.
+
+        Args:
+            key (Hashable): Clave de la entrada
+            value (Any): Valor a guardar
+        """
+        size = self._size_of(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return  # Nunca cabría
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._evictions += 1
+
+    def clear(self):
+        #Vacía la caché (las estadísticas se conservan)
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> dict:
+        #Retorna estadísticas de uso de la caché
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
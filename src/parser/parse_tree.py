@@ -1,85 +1,253 @@
 #Representación del arbol de derivaciones
 
-from lark import Tree, Token
-from typing import List, Optional, Any
+from lark import Tree
+from typing import Callable, Iterator, List, Optional, Tuple
 import json
+import sys
+import time
+
+from .compact_tree import SYMBOLS, TOKEN, TREE, CompactTree
+from .forest import AmbiguousSpan, DerivationForest, ForestAnalysis
+from .metrics import METRICS
+
+# Reconstruye el bosque de un árbol que llegó sin él (de otro proceso)
+ForestLoader = Callable[[], Optional[DerivationForest]]
 
 class TreeNode:
-    #Nodo del árbol de derivación
-    
-    def __init__(self, name: str, children: Optional[list['TreeNode']] = None, value: Optional[Any] = None):
-        self.name = name
-        self.children = children if children else []
-        self.value = value
+    #Nodo del árbol de derivación: vista ligera sobre un CompactTree
+
+    __slots__ = ('tree', 'index')
+
+    def __init__(self, tree: CompactTree, index: int = 0):
+        """
+        Args:
+            tree (CompactTree): Árbol compacto al que pertenece el nodo
+            index (int): Posición del nodo en los arrays del árbol
+        """
+        self.tree = tree
+        self.index = index
+
+    @property
+    def name(self) -> str:
+        #Regla (nodo interno) o tipo de terminal (token)
+        return self.tree.name(self.index)
+
+    @property
+    def value(self) -> Optional[str]:
+        #Texto del token, o None para nodos internos
+        return self.tree.value(self.index)
+
+    @property
+    def children(self) -> List['TreeNode']:
+        tree = self.tree
+        return [TreeNode(tree, child) for child in tree.children(self.index)]
 
     def is_terminal(self) -> bool:
         #Verifica si el nodo es terminal (hoja)
-        return len(self.children) == 0 and self.value is not None
+        return self.tree.is_token(self.index)
     
     def is_nonterminal(self) -> bool:
         #Verifica si el nodo es no terminal
-        return len(self.children) > 0
+        return len(self.tree.children(self.index)) > 0
+
+    def __eq__(self, other):
+        return isinstance(other, TreeNode) and self.tree is other.tree and self.index == other.index
+
+    def __hash__(self):
+        return hash((id(self.tree), self.index))
     
     def __repr__(self):
         if self.is_terminal():
             return f"TreeNode({self.name}={self.value})"
-        return f"TreeNode({self.name}, children={len(self.children)})"
+        return f"TreeNode({self.name}, children={len(self.tree.children(self.index))})"
 
 class ParseTree:
     #Árbol de derivación con funcionalidades
 
-    def __init__(self, lark_tree: Tree, original_query: str, is_ambiguous: bool = False):
+    __slots__ = ('original_query', '_compact', '_roots', '_metrics', '_ambiguity', '_forest', '_forest_loader',
+                 '_last_derivation')
+
+    def __init__(self, lark_tree: Tree, original_query: str, is_ambiguous: bool = False,
+                 ambiguity: Optional[ForestAnalysis] = None, forest: Optional[DerivationForest] = None):
         """
         Inicializa el árbol de derivación.
+
+        El árbol de Lark se convierte a un CompactTree y no se conserva. La
+        ambigüedad y las métricas del árbol (profundidad, nodos, columnas,
+        tabla y ORDER BY) se calculan en un único recorrido la primera vez
+        que se consultan y quedan memorizadas.
         
         Args:
             lark_tree (Tree): Árbol de Lark
             original_query (str): Consulta SQL original
-            is_ambiguous (bool): Si el árbol contiene ambigüedad
+            is_ambiguous (bool): Si el árbol contiene ambigüedad (se recalcula)
+            ambiguity (ForestAnalysis): Análisis del bosque de Earley; si se
+                da, el árbol es una de sus derivaciones y el número de
+                derivaciones y los tramos ambiguos salen del análisis
+            forest (DerivationForest): Bosque del que lark_tree es la primera
+                derivación; permite construir las demás bajo demanda
         """
-        self.lark_tree = lark_tree
+        if METRICS.enabled:
+            started = time.perf_counter()
+            compact = CompactTree.from_lark(lark_tree, original_query)
+            METRICS.since('tree', started)
+        else:
+            compact = CompactTree.from_lark(lark_tree, original_query)
+        self._init(compact, original_query, ambiguity, forest)
+
+    def _init(self, compact: CompactTree, original_query: str, ambiguity: Optional[ForestAnalysis] = None,
+              forest: Optional[DerivationForest] = None, forest_loader: Optional[ForestLoader] = None):
         self.original_query = original_query
-        
-        # Detectar ambigüedad buscando nodos _ambig
-        self.is_ambiguous = self._detect_ambiguity(lark_tree)
-        self.trees = self._extract_ambiguous_trees(lark_tree)
-    
+        self._compact = compact
+        self._roots: Optional[List[int]] = None
+        self._metrics: dict = {}
+        self._ambiguity = ambiguity
+        self._forest = forest
+        self._forest_loader = forest_loader if forest is None else None
+        self._last_derivation: Optional[Tuple[int, CompactTree]] = None
 
-    def _detect_ambiguity(self, tree) -> bool:
-        """Detecta si hay nodos _ambig en el árbol"""
-        if isinstance(tree, Tree):
-            if tree.data == '_ambig':
-                return True
-            for child in tree.children:
-                if self._detect_ambiguity(child):
-                    return True
-        return False
-
-    def _extract_ambiguous_trees(self, tree) -> List[Tree]:
-        """Extrae todos los árboles alternativos si hay ambigüedad"""
-        # Buscar el primer nodo _ambig
-        ambig_node = self._find_ambig_node(tree)
-        
-        if ambig_node and ambig_node.data == '_ambig':
-            # Los hijos de _ambig son las diferentes derivaciones
-            return list(ambig_node.children)
-        else:
-            return [tree]
-
-    def _find_ambig_node(self, tree):
-        """Encuentra el primer nodo _ambig"""
-        if isinstance(tree, Tree):
-            if tree.data == '_ambig':
-                return tree
-            for child in tree.children:
-                result = self._find_ambig_node(child)
-                if result:
-                    return result
-        return None
+    @property
+    def compact_tree(self) -> CompactTree:
+        #Árbol compacto (inmutable, se puede compartir)
+        return self._compact
+
+    @property
+    def lark_tree(self) -> Tree:
+        #Árbol de Lark completo, reconstruido en cada acceso
+        return self._compact.to_lark(0)
+
+    @property
+    def ambiguity(self) -> Optional[ForestAnalysis]:
+        #Análisis del bosque de Earley, si el árbol viene de uno
+        if self._ambiguity is None and self._forest is not None:
+            self._ambiguity = self._forest.analysis
+        return self._ambiguity
+
+    @property
+    def is_ambiguous(self) -> bool:
+        #Si la consulta tiene más de una derivación
+        if self._forest is not None or self._ambiguity is not None:
+            return self.get_derivation_count() > 1
+        return len(self._derivation_roots()) > 1 or self._metrics_for_root().ambig_node is not None
+
+    @property
+    def trees(self) -> List[Tree]:
+        #Árboles de Lark de todas las derivaciones (ver iter_derivations())
+        return [compact.to_lark(root) for compact, root in self._iter_compact()]
+
+    @property
+    def root(self) -> TreeNode:
+        #Nodo raíz del árbol completo
+        return TreeNode(self._compact, 0)
+
+    def get_root(self, tree_index: int = 0) -> Optional[TreeNode]:
+        #Nodo raíz de una derivación, o None si el índice no existe
+        derivation = self._derivation(tree_index)
+        return TreeNode(*derivation) if derivation else None
+
+    def _derivation_roots(self) -> List[int]:
+        #Índices de las raíces de cada derivación en el árbol compacto
+        if self._roots is None:
+            root_metrics = self._metrics_for_root()
+            ambig_node = root_metrics.ambig_node
+            if ambig_node is not None:
+                # Los hijos de _ambig son las diferentes derivaciones
+                self._roots = list(self._compact.children(ambig_node))
+            else:
+                self._roots = [0]
+                self._metrics[0] = root_metrics
+        return self._roots
+
+    def _get_forest(self) -> Optional[DerivationForest]:
+        #Bosque de derivaciones; el de un árbol de otro proceso se reconstruye la primera vez
+        if self._forest is None and self._forest_loader is not None:
+            loader, self._forest_loader = self._forest_loader, None
+            self._forest = loader()
+        return self._forest
+
+    def _derivation(self, tree_index: int) -> Optional[Tuple[CompactTree, int]]:
+        #Árbol compacto y nodo raíz de una derivación, o None si el índice no existe
+        if tree_index > 0 and self._get_forest() is not None:
+            if tree_index >= self._forest.derivation_count:
+                return None
+            # Se conserva solo la última derivación construida
+            last = self._last_derivation
+            if last is None or last[0] != tree_index:
+                last = self._last_derivation = (tree_index, self._build_derivation(tree_index))
+            return last[1], 0
+
+        roots = self._derivation_roots()
+        if tree_index >= len(roots):
+            return None
+        return self._compact, roots[tree_index]
+
+    def _build_derivation(self, tree_index: int) -> CompactTree:
+        #Construye desde el bosque el árbol compacto de una derivación
+        return CompactTree.from_lark(self._forest.derivation(tree_index), self._compact.text)
+
+    def _iter_compact(self, limit: Optional[int] = None, offset: int = 0) -> Iterator[Tuple[CompactTree, int]]:
+        #Recorre perezosamente (árbol compacto, raíz) de las derivaciones pedidas
+        stop = self.get_derivation_count()
+        if limit is not None:
+            stop = min(stop, offset + limit)
+        forest = self._get_forest() if stop > 1 else self._forest
+        if forest is None:
+            stop = min(stop, len(self._derivation_roots()))
+        for tree_index in range(max(offset, 0), stop):
+            if forest is not None and tree_index > 0:
+                yield self._build_derivation(tree_index), 0
+            else:
+                yield self._compact, self._derivation_roots()[tree_index]
+
+    def iter_derivations(self, limit: Optional[int] = None, offset: int = 0) -> Iterator['ParseTree']:
+        """
+        Genera las derivaciones de la consulta de forma perezosa.
+
+        Con un bosque de Earley cada derivación se construye al pedirla, así
+        que el coste depende de las derivaciones recorridas y no del total.
+        El orden es determinista: el de get_pretty_string(i) y to_dict(i).
+
+        Args:
+            limit (int): Máximo de derivaciones a generar (None = todas)
+            offset (int): Índice de la primera derivación
+
+        Yields:
+            ParseTree: Árbol con una única derivación
+        """
+        for compact, root in self._iter_compact(limit, offset):
+            if root != 0:
+                compact = CompactTree.from_lark(compact.to_lark(root), compact.text)
+            yield ParseTree.from_compact(compact, self.original_query)
+
+    def _metrics_for_root(self) -> '_TreeMetrics':
+        #Métricas del árbol completo (incluye el primer nodo _ambig)
+        root_metrics = self._metrics.get('root')
+        if root_metrics is None:
+            root_metrics = self._metrics['root'] = _collect_metrics(self._compact, 0)
+        return root_metrics
+
+    def _metrics_for(self, tree_index: int) -> Optional['_TreeMetrics']:
+        #Métricas memorizadas de una derivación, o None si el índice no existe
+        metrics = self._metrics.get(tree_index)
+        if metrics is None:
+            derivation = self._derivation(tree_index)
+            if derivation is None:
+                return None
+            metrics = self._metrics[tree_index] = _collect_metrics(*derivation)
+        return metrics
 
     def get_derivation_count(self) -> int:
         #Retorna el número de derivaciones posibles
-        return len(self.trees)
+        if self._forest is not None:
+            return self._forest.derivation_count
+        if self._ambiguity is not None:
+            return self._ambiguity.derivation_count
+        return len(self._derivation_roots())
+
+    def get_ambiguous_spans(self) -> List[AmbiguousSpan]:
+        #Retorna los tramos de la consulta con más de una derivación
+        ambiguity = self.ambiguity
+        return list(ambiguity.spans) if ambiguity is not None else []
     
     def get_pretty_string(self, tree_index: int = 0) -> str:
         """
@@ -91,14 +259,15 @@ class ParseTree:
         Returns:
             str: Representación en texto del árbol
         """
-        if tree_index >= len(self.trees):
-            return f"Error: índice {tree_index} fuera de rango (hay {len(self.trees)} árboles)"
+        derivation = self._derivation(tree_index)
+        if derivation is None:
+            return f"Error: índice {tree_index} fuera de rango (hay {self.get_derivation_count()} árboles)"
         
-        return self.trees[tree_index].pretty()
+        return pretty_compact(*derivation)
     
-    def get_all_pretty_strings(self) -> List[str]:
-        #Retorna representaciones de todos los árboles (en caso de ambigüedad)
-        return [tree.pretty() for tree in self.trees]
+    def get_all_pretty_strings(self, limit: Optional[int] = None) -> List[str]:
+        #Retorna representaciones de los árboles (en caso de ambigüedad), hasta limit
+        return [pretty_compact(compact, root) for compact, root in self._iter_compact(limit)]
     
     def to_dict(self, tree_index: int = 0) -> dict:
         """
@@ -110,114 +279,105 @@ class ParseTree:
         Returns:
             dict: Representación en diccionario
         """
-        if tree_index >= len(self.trees):
+        derivation = self._derivation(tree_index)
+        if derivation is None:
             return {"error": f"Índice {tree_index} fuera de rango"}
         
         return {
             "query": self.original_query,
             "is_ambiguous": self.is_ambiguous,
             "derivation_count": self.get_derivation_count(),
-            "tree": self._tree_to_dict(self.trees[tree_index])
+            "tree": _tree_to_dict(*derivation)
         }
     
-    def _tree_to_dict(self, node) -> dict:
-        #Convierte un nodo de Lark a diccionario recursivamente
-        if isinstance(node, Token):
-            return {
-                "type": "token",
-                "name": node.type,
-                "value": str(node)
-            }
-        elif isinstance(node, Tree):
-            return {
-                "type": "tree",
-                "name": node.data,
-                "children": [self._tree_to_dict(child) for child in node.children]
-            }
-        else:
-            return {"type": "unknown", "value": str(node)}
-        
     def to_json(self, tree_index: int = 0, indent: int = 2) -> str:
-        #Convierte el árbol a JSON
-        return json.dumps(self.to_dict(tree_index), indent=indent, ensure_ascii=False)
+        #Convierte el árbol a JSON (mismo formato que json.dumps, sin límite de profundidad)
+        return dumps_json(self.to_dict(tree_index), indent=indent)
     
     def get_depth(self, tree_index: int = 0) -> int:
         #Calcula la profundidad del árbol
-        if tree_index >= len(self.trees):
-            return 0
-        return self._calculate_depth(self.trees[tree_index])
-    
-    def _calculate_depth(self, node, current_depth: int = 0) -> int:
-        #Calcula profundidad recursivamente
-        if isinstance(node, Token):
-            return current_depth
-        elif isinstance(node, Tree):
-            if not node.children:
-                return current_depth
-            return max(self._calculate_depth(child, current_depth + 1) 
-                      for child in node.children)
-        return current_depth
+        metrics = self._metrics_for(tree_index)
+        return metrics.depth if metrics else 0
     
     def get_node_count(self, tree_index: int = 0) -> int:
         #Cuenta el número total de nodos en el árbol
-        if tree_index >= len(self.trees):
-            return 0
-        return self._count_nodes(self.trees[tree_index])
-    
-    def _count_nodes(self, node) -> int:
-        #Cuenta nodos recursivamente
-        if isinstance(node, Token):
-            return 1
-        elif isinstance(node, Tree):
-            return 1 + sum(self._count_nodes(child) for child in node.children)
-        return 0
+        metrics = self._metrics_for(tree_index)
+        return metrics.node_count if metrics else 0
     
     def extract_columns(self, tree_index: int = 0) -> List[str]:
         #Extrae los nombres de columnas del SELECT únicamente
-        columns = []
-        tree = self.trees[tree_index] if tree_index < len(self.trees) else None
-        if tree:
-            # Buscar solo dentro del nodo 'columns'
-            self._extract_columns_from_select(tree, columns)
-        return columns
-        
-    def _extract_columns_from_select(self, node, columns: List[str]):
-    #Extrae columnas SOLO del SELECT, no del ORDER BY"""
-        if isinstance(node, Tree):
-            # Solo procesar si estamos en el nodo 'columns' del SELECT
-            if node.data == 'columns':
-                for child in node.children:
-                    if isinstance(child, Tree) and child.data == 'column':
-                        for subchild in child.children:
-                            if isinstance(subchild, Token):
-                                columns.append(str(subchild))
-                return  # No seguir buscando fuera de 'columns'
-            
-            # Continuar búsqueda solo hasta encontrar 'columns'
-            if node.data != 'order_clause':  # Evitar ORDER BY
-                for child in node.children:
-                    self._extract_columns_from_select(child, columns)
+        metrics = self._metrics_for(tree_index)
+        return list(metrics.columns) if metrics else []
 
     def extract_table(self, tree_index: int = 0) -> Optional[str]:
         #Extrae el nombre de la tabla
-        tree = self.trees[tree_index] if tree_index < len(self.trees) else None
-        if tree:
-            return self._extract_table_recursive(tree)
-        return None
-    
-    def _extract_table_recursive(self, node) -> Optional[str]:
-        #Extrae tabla recursivamente
-        if isinstance(node, Tree):
-            if node.data == 'table':
-                for child in node.children:
-                    if isinstance(child, Token):
-                        return str(child)
-            for child in node.children:
-                result = self._extract_table_recursive(child)
-                if result:
-                    return result
-        return None
+        metrics = self._metrics_for(tree_index)
+        return metrics.table if metrics else None
+
+    def extract_order_by(self, tree_index: int = 0) -> Optional[str]:
+        #Extrae la columna del ORDER BY, si existe
+        metrics = self._metrics_for(tree_index)
+        return metrics.order_by if metrics else None
     
+    def copy(self, original_query: Optional[str] = None) -> 'ParseTree':
+        """
+        Retorna una copia del árbol.
+
+        El árbol compacto es inmutable, así que la copia lo comparte y solo
+        duplica el estado memorizado.
+
+        Args:
+            original_query (str): Consulta de la copia (por defecto la misma)
+
+        Returns:
+            ParseTree: Copia que puede usarse sin afectar a este árbol
+        """
+        query = self.original_query if original_query is None else original_query
+        return ParseTree.from_compact(self._compact, query, self._ambiguity, self._forest, self._forest_loader)
+
+    def to_compact(self) -> CompactTree:
+        """
+        Retorna la representación compacta y serializable del árbol.
+
+        Returns:
+            CompactTree: Árbol compacto (se serializa como arrays de bytes,
+                barato de enviar entre procesos)
+        """
+        return self._compact
+
+    @classmethod
+    def from_compact(cls, compact: CompactTree, original_query: str,
+                     ambiguity: Optional[ForestAnalysis] = None,
+                     forest: Optional[DerivationForest] = None,
+                     forest_loader: Optional[ForestLoader] = None) -> 'ParseTree':
+        """
+        Crea un ParseTree sobre un árbol compacto, sin copiarlo.
+
+        Args:
+            compact (CompactTree): Árbol generado por to_compact()
+            original_query (str): Consulta SQL original
+            ambiguity (ForestAnalysis): Análisis del bosque, si lo hay
+            forest (DerivationForest): Bosque del que compact es la primera derivación
+            forest_loader: Función que reconstruye el bosque si no se tiene
+                (árboles parseados en otro proceso); se llama la primera vez
+                que se pide una derivación distinta de la primera
+
+        Returns:
+            ParseTree: Árbol reconstruido
+        """
+        tree = cls.__new__(cls)
+        tree._init(compact, original_query, ambiguity, forest, forest_loader)
+        return tree
+
+    def estimate_size(self) -> int:
+        #Estima los bytes que ocupan el árbol compacto, la consulta y el bosque
+        total = sys.getsizeof(self) + sys.getsizeof(self.original_query) + self._compact.nbytes()
+        if self._compact.text is not self.original_query:
+            total += sys.getsizeof(self._compact.text)
+        if self._forest is not None:
+            total += self._forest.estimate_size()
+        return total
+
     def __str__(self):
         return self.get_pretty_string(0)
     
@@ -227,3 +387,195 @@ class ParseTree:
 
 
 
+class _TreeMetrics:
+    #Resultado del recorrido único de un árbol
+
+    __slots__ = ('depth', 'node_count', 'columns', 'table', 'order_by', 'ambig_node')
+
+    def __init__(self):
+        self.depth = 0
+        self.node_count = 0
+        self.columns: List[str] = []
+        self.table: Optional[str] = None
+        self.order_by: Optional[str] = None
+        self.ambig_node: Optional[int] = None
+
+
+# Reglas que interesan al recorrido, indexadas por su id de símbolo
+_AMBIG, _COLUMNS, _TABLE, _ORDER_CLAUSE, _COLUMN = range(5)
+_RULE_KINDS = {
+    SYMBOLS.intern('_ambig'): _AMBIG,
+    SYMBOLS.intern('columns'): _COLUMNS,
+    SYMBOLS.intern('table'): _TABLE,
+    SYMBOLS.intern('order_clause'): _ORDER_CLAUSE,
+    SYMBOLS.intern('column'): _COLUMN,
+}
+
+
+def _first_token(compact: CompactTree, index: int) -> Optional[str]:
+    #Primer token hijo directo de un nodo
+    for child in compact.children(index):
+        if compact.is_token(child):
+            return compact.value(child)
+    return None
+
+
+def _collect_metrics(compact: CompactTree, root: int) -> _TreeMetrics:
+    """
+    Recorre el árbol una sola vez (en preorden) y reúne todas sus métricas.
+
+    - depth: aristas del camino más largo desde la raíz
+    - node_count: nodos internos más tokens
+    - columns: columnas del SELECT (sin entrar en ORDER BY)
+    - table: primera tabla encontrada
+    - order_by: columna del ORDER BY
+    - ambig_node: índice del primer nodo _ambig encontrado
+    """
+    metrics = _TreeMetrics()
+    if compact.is_token(root):
+        metrics.node_count = 1
+        return metrics
+
+    kinds = compact._kinds
+    names = compact._names
+    first = compact._first
+    second = compact._second
+    rule_kinds = _RULE_KINDS
+
+    node_count = 0
+    max_depth = 0
+    # (nodo, profundidad, dentro de ORDER BY); solo se apilan nodos internos
+    stack = [(root, 0, False)]
+    pop = stack.pop
+    push = stack.append
+    while stack:
+        node, depth, in_order = pop()
+        node_count += 1
+        start = first[node]
+        end = start + second[node]
+        kind = rule_kinds.get(names[node])
+
+        if kind is None:
+            pass
+        elif kind == _AMBIG:
+            if metrics.ambig_node is None:
+                metrics.ambig_node = node
+        elif kind == _COLUMNS:
+            if not in_order:
+                for child in range(start, end):
+                    if kinds[child] == TREE and rule_kinds.get(names[child]) == _COLUMN:
+                        metrics.columns.extend(compact.value(sub) for sub in compact.children(child)
+                                               if kinds[sub] == TOKEN)
+        elif kind == _TABLE:
+            if metrics.table is None:
+                metrics.table = _first_token(compact, node)
+        elif kind == _ORDER_CLAUSE:
+            in_order = True
+        elif kind == _COLUMN and in_order and metrics.order_by is None:
+            metrics.order_by = _first_token(compact, node)
+
+        if start == end:
+            if depth > max_depth:
+                max_depth = depth
+            continue
+
+        child_depth = depth + 1
+        # Hijos en orden inverso para visitarlos de izquierda a derecha
+        for child in range(end - 1, start - 1, -1):
+            if kinds[child] == TREE:
+                push((child, child_depth, in_order))
+            else:
+                node_count += 1
+                if child_depth > max_depth:
+                    max_depth = child_depth
+
+    metrics.node_count = node_count
+    metrics.depth = max_depth
+    return metrics
+
+
+def _tree_to_dict(compact: CompactTree, root: int) -> dict:
+    #Convierte un nodo del árbol compacto a diccionario, sin recursión
+    def convert(index):
+        if compact.is_token(index):
+            return {"type": "token", "name": compact.name(index), "value": compact.value(index)}
+        return {"type": "tree", "name": compact.name(index), "children": []}
+
+    result = convert(root)
+    stack = [(root, result)] if not compact.is_token(root) else []
+    while stack:
+        index, converted = stack.pop()
+        children = converted["children"]
+        for child in compact.children(index):
+            child_dict = convert(child)
+            children.append(child_dict)
+            if not compact.is_token(child):
+                stack.append((child, child_dict))
+    return result
+
+
+def pretty_compact(compact: CompactTree, root: int = 0, indent_str: str = '  ') -> str:
+    #Igual que Tree.pretty() de Lark, sobre un árbol compacto y sin recursión
+    if compact.is_token(root):
+        return compact.value(root)
+    parts = []
+    stack = [(root, 0)]
+    while stack:
+        node, level = stack.pop()
+        if compact.is_token(node):
+            parts.append(f'{indent_str * level}{compact.value(node)}\n')
+            continue
+        parts.append(f'{indent_str * level}{compact.name(node)}')
+        children = compact.children(node)
+        if len(children) == 1 and compact.is_token(children[0]):
+            parts.append(f'\t{compact.value(children[0])}\n')
+        else:
+            parts.append('\n')
+            stack.extend((child, level + 1) for child in reversed(children))
+    return ''.join(parts)
+
+
+def dumps_json(value, indent: Optional[int] = 2) -> str:
+    #Igual que json.dumps(value, indent=indent, ensure_ascii=False), sin recursión
+    encode_str = json.encoder.encode_basestring
+    parts = []
+    # Cadenas ya codificadas o (valor, nivel) pendientes de codificar
+    stack: list = [(value, 0)]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            parts.append(item)
+            continue
+
+        value, level = item
+        if isinstance(value, dict):
+            entries = [(encode_str(str(key)) + ': ', child) for key, child in value.items()]
+            opening, closing = '{', '}'
+        elif isinstance(value, (list, tuple)):
+            entries = [('', child) for child in value]
+            opening, closing = '[', ']'
+        elif isinstance(value, str):
+            parts.append(encode_str(value))
+            continue
+        else:
+            parts.append(json.dumps(value, ensure_ascii=False))
+            continue
+
+        if not entries:
+            parts.append(opening + closing)
+            continue
+
+        if indent is None:
+            first, separator, end = '', ', ', closing
+        else:
+            first = '\n' + ' ' * (indent * (level + 1))
+            separator = ',' + first
+            end = '\n' + ' ' * (indent * level) + closing
+
+        work: list = [opening]
+        for i, (key, child) in enumerate(entries):
+            work.append((first if i == 0 else separator) + key)
+            work.append((child, level + 1))
+        work.append(end)
+        stack.extend(reversed(work))
+    return ''.join(parts)
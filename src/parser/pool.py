@@ -0,0 +1,259 @@
+# Pool de parsers y validadores para servidores multihilo
+#
+# Garantías de concurrencia:
+#
+# - Las instancias de Lark vienen del registro global: se compilan una vez por
+#   configuración y no cambian después. Cada parsing crea su propio estado
+#   (pila LALR o conjuntos de Earley), así que se pueden usar desde varios
+#   hilos a la vez.
+# - SQLParser.parse, validate_syntax, tokenize y fingerprint se pueden llamar
+#   concurrentemente sobre la misma instancia: las cachés (ParseCache) y la
+#   tabla de símbolos tienen lock, y los objetos que se crean la primera vez
+#   (lexer de huellas, reconocedor, callbacks del bosque) son equivalentes si
+#   dos hilos llegan a crearlos a la vez.
+# - SQLValidator.validate_query también: cada ejecución del motor de reglas
+#   guarda su estado en su propio RuleContext.
+# - No son seguros en paralelo con el uso: add_rule/remove_rule, close() y
+#   los modos con procesos (workers > 1), que comparten un único pool de
+#   procesos por instancia.
+#
+# El pool añade aislamiento por encima de eso: cada instancia la usa un solo
+# hilo a la vez (préstamo y devolución, o una por hilo), el número de
+# instancias está acotado, se pueden calentar al arrancar y se miden su uso
+# y las esperas.
+
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import logging
+import threading
+import time
+
+from .sql_parser import SQLParser
+from .validator import SQLValidator
+
+logger = logging.getLogger(__name__)
+
+# Tipos de objeto que puede prestar el pool
+POOL_KINDS = ('parser', 'validator')
+
+# Consulta con la que se calientan las instancias
+_WARMUP_QUERY = "SELECT a, b FROM t WHERE a = 1 AND b = 'x' ORDER BY a"
+
+
+class ParserPool:
+    #Pool acotado de SQLParser/SQLValidator calientes
+
+    def __init__(self, size: int = 4, kind: str = 'parser', options: Optional[dict] = None,
+                 factory: Optional[Callable[[], Any]] = None, prewarm: bool = False):
+        """
+        Inicializa el pool. Las instancias se crean al pedirlas por primera
+        vez, o todas de golpe con prewarm.
+
+        Args:
+            size (int): Máximo de instancias prestadas a la vez
+            kind (str): 'parser' (SQLParser) o 'validator' (SQLValidator)
+            options (dict): Argumentos del constructor de cada instancia
+            factory (Callable): Constructor propio (sustituye a kind y options)
+            prewarm (bool): Crear y calentar todas las instancias ya
+        """
+        if size < 1:
+            raise ValueError("size debe ser mayor que cero")
+        if kind not in POOL_KINDS:
+            raise ValueError(f"Tipo de pool inválido: {kind!r} (opciones: {', '.join(POOL_KINDS)})")
+
+        self.size = size
+        self.kind = kind
+        if factory is None:
+            cls = SQLValidator if kind == 'validator' else SQLParser
+            factory = lambda: cls(**(options or {}))
+        self._factory = factory
+
+        self._condition = threading.Condition()
+        self._idle: List[Any] = []
+        self._created = 0
+        self._in_use = 0
+        self._local = threading.local()
+        self._local_instances = 0
+
+        # Métricas
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+        self._max_in_use = 0
+        self._busy_time = 0.0
+        self._busy_since = time.perf_counter()
+        self._started = self._busy_since
+
+        if prewarm:
+            self.prewarm()
+
+    def _new_instance(self) -> Any:
+        #Crea una instancia y la calienta con una consulta de prueba
+        instance = self._factory()
+        if isinstance(instance, SQLValidator):
+            instance.validate_query(_WARMUP_QUERY)
+        elif isinstance(instance, SQLParser):
+            # Deja construidos el árbol, el lexer de huellas y el reconocedor
+            instance.parse(_WARMUP_QUERY, instance.tokenize(_WARMUP_QUERY))
+            instance.validate_syntax(_WARMUP_QUERY)
+        return instance
+
+    def prewarm(self, count: Optional[int] = None) -> int:
+        """
+        Crea y calienta instancias por adelantado.
+
+        Args:
+            count (int): Instancias a tener listas (por defecto, size)
+
+        Returns:
+            int: Instancias creadas ahora
+        """
+        target = min(self.size, count if count is not None else self.size)
+        created = 0
+        while True:
+            with self._condition:
+                if self._created >= target:
+                    break
+                self._created += 1
+            try:
+                instance = self._new_instance()
+            except Exception:
+                with self._condition:
+                    self._created -= 1
+                    self._condition.notify()
+                raise
+            with self._condition:
+                self._idle.append(instance)
+                self._condition.notify()
+            created += 1
+        logger.info("Pool calentado: %d instancias nuevas (%d en total)", created, self._created)
+        return created
+
+    def acquire(self, timeout: Optional[float] = None) -> Any:
+        """
+        Toma prestada una instancia; si todas están en uso, espera.
+
+        Args:
+            timeout (float): Segundos máximos de espera (None = sin límite)
+
+        Returns:
+            SQLParser o SQLValidator para uso exclusivo hasta release()
+
+        Raises:
+            TimeoutError: Si no queda ninguna libre antes del timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        waited = False
+        started = time.perf_counter()
+        with self._condition:
+            while not self._idle and self._created >= self.size:
+                waited = True
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._timeouts += 1
+                    raise TimeoutError(f"No hay instancias libres en el pool (tamaño {self.size})")
+                self._condition.wait(remaining)
+
+            if waited:
+                self._waits += 1
+                self._wait_time += time.perf_counter() - started
+            self._mark_busy(+1)
+            self._checkouts += 1
+            if self._idle:
+                # La última devuelta es la más caliente
+                return self._idle.pop()
+            self._created += 1
+
+        # Se construye fuera del lock para no bloquear las devoluciones
+        try:
+            return self._new_instance()
+        except Exception:
+            with self._condition:
+                self._created -= 1
+                self._mark_busy(-1)
+                self._condition.notify()
+            raise
+
+    def release(self, instance: Any):
+        """
+        Devuelve una instancia prestada.
+
+        Args:
+            instance: Instancia obtenida con acquire()
+        """
+        with self._condition:
+            self._idle.append(instance)
+            self._mark_busy(-1)
+            self._condition.notify()
+
+    @contextmanager
+    def checkout(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        """
+        Presta una instancia durante un bloque with y la devuelve al salir.
+
+        Args:
+            timeout (float): Segundos máximos de espera
+
+        Yields:
+            SQLParser o SQLValidator
+        """
+        instance = self.acquire(timeout)
+        try:
+            yield instance
+        finally:
+            self.release(instance)
+
+    def local(self) -> Any:
+        """
+        Instancia propia del hilo actual, creada la primera vez.
+
+        Pensado para servidores con un número fijo de hilos. Estas instancias
+        no cuentan para size ni pasan por acquire/release.
+
+        Returns:
+            SQLParser o SQLValidator del hilo
+        """
+        instance = getattr(self._local, 'instance', None)
+        if instance is None:
+            instance = self._local.instance = self._new_instance()
+            with self._condition:
+                self._local_instances += 1
+        return instance
+
+    def _mark_busy(self, delta: int):
+        #Actualiza las instancias en uso y el tiempo acumulado de uso (con el lock tomado)
+        now = time.perf_counter()
+        self._busy_time += self._in_use * (now - self._busy_since)
+        self._busy_since = now
+        self._in_use += delta
+        self._max_in_use = max(self._max_in_use, self._in_use)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Métricas de uso del pool.
+
+        - utilization: fracción de instancias en uso ahora
+        - average_utilization: media de instancias en uso / size desde la creación
+        - waits / wait_time: préstamos que tuvieron que esperar y tiempo total
+        """
+        with self._condition:
+            self._mark_busy(0)
+            elapsed = self._busy_since - self._started
+            return {
+                "size": self.size,
+                "created": self._created,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "max_in_use": self._max_in_use,
+                "utilization": self._in_use / self.size,
+                "average_utilization": self._busy_time / (elapsed * self.size) if elapsed > 0 else 0.0,
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "wait_time": self._wait_time,
+                "timeouts": self._timeouts,
+                "thread_local_instances": self._local_instances,
+            }
+
+    def __repr__(self):
+        return f"ParserPool({self.kind}, tamaño={self.size}, creadas={self._created}, en_uso={self._in_use})"
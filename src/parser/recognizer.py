@@ -0,0 +1,173 @@
+# Reconocedor LALR: decide si una consulta es sintácticamente válida sin
+# construir árbol
+#
+# Recorre la tabla LALR que ya compiló Lark con una pila de estados enteros.
+# Los tokens se reconocen con expresiones regulares por estado, igual que el
+# lexer contextual de Lark (mismo orden de terminales y misma reasignación de
+# palabras clave que coinciden con CNAME), pero sin crear objetos Token ni
+# Tree: solo se manejan tipos de terminal y posiciones.
+
+from lark import Lark
+from lark.parsers.lalr_analysis import Shift
+from typing import Dict, FrozenSet, List, Optional
+import re
+
+END = '$END'
+
+# Acciones precalculadas: (True, estado) para desplazar y
+# (False, símbolos a retirar, no terminal) para reducir
+_Action = tuple
+
+
+class _StateLexer:
+    #Expresión regular con los terminales aceptados en un estado del parser
+
+    __slots__ = ('match', 'keywords', 'ignore')
+
+    def __init__(self, terminals: list, ignore: FrozenSet[str], flags: int):
+        # Mismo orden que el BasicLexer de Lark: la primera alternativa gana
+        terminals = sorted(terminals, key=lambda t: (-t.priority, -t.pattern.max_width,
+                                                      -len(t.pattern.value), t.name))
+        self.ignore = ignore
+        self.keywords: Dict[str, re.Pattern] = {}
+
+        # Cadenas fijas que también casan con un terminal regex de la misma
+        # prioridad (SELECT y CNAME): se reconocen como el regex y luego se
+        # reasignan, como hace el UnlessCallback de Lark
+        strings = [t for t in terminals if not _is_regexp(t)]
+        embedded = set()
+        for retok in terminals:
+            if not _is_regexp(retok):
+                continue
+            unless = []
+            for strtok in strings:
+                if strtok.priority != retok.priority:
+                    continue
+                value = strtok.pattern.value
+                match = re.match(retok.pattern.to_regexp(), value, flags)
+                if match and match.group(0) == value:
+                    unless.append(strtok)
+                    if strtok.pattern.flags <= retok.pattern.flags:
+                        embedded.add(strtok.name)
+            if unless:
+                self.keywords[retok.name] = _alternation(unless, flags)
+
+        scanned = [t for t in terminals if t.name not in embedded]
+        self.match = _alternation(scanned, flags).match if scanned else None
+
+
+def _is_regexp(terminal) -> bool:
+    return terminal.pattern.type == 're'
+
+
+def _alternation(terminals: list, flags: int) -> re.Pattern:
+    return re.compile('|'.join(f'(?P<{t.name}>{t.pattern.to_regexp()})' for t in terminals), flags)
+
+
+class LALRRecognizer:
+    #Reconocedor sin árbol construido a partir de un parser LALR de Lark
+
+    def __init__(self, lark_parser: Lark, start: str = 'query'):
+        """
+        Args:
+            lark_parser (Lark): Parser LALR con lexer contextual
+            start (str): Regla inicial
+
+        Raises:
+            ValueError: Si el parser no es LALR
+        """
+        if lark_parser.options.parser != 'lalr':
+            raise ValueError("El reconocedor solo admite parsers LALR")
+
+        parse_table = lark_parser.parser.parser._parse_table
+        self._start_state = parse_table.start_states[start]
+        self._end_state = parse_table.end_states[start]
+
+        self._actions: Dict[int, Dict[str, _Action]] = {}
+        for state, actions in parse_table.states.items():
+            table = {}
+            for symbol, (action, arg) in actions.items():
+                if action is Shift:
+                    table[str(symbol)] = (True, arg)
+                else:
+                    table[str(symbol)] = (False, len(arg.expansion), str(arg.origin.name))
+            self._actions[state] = table
+
+        # Un lexer por conjunto de terminales aceptados (se comparten entre estados)
+        terminals_by_name = {t.name: t for t in lark_parser.terminals}
+        # Los parsers de Lark.load() (precompilados o de la caché) no tienen
+        # ignore_tokens; lexer_conf.ignore está en los dos casos
+        ignore = frozenset(lark_parser.lexer_conf.ignore)
+        flags = lark_parser.options.g_regex_flags
+        by_accepts: Dict[FrozenSet[str], _StateLexer] = {}
+        self._lexers: Dict[int, _StateLexer] = {}
+        for state, table in self._actions.items():
+            accepts = frozenset(table) | ignore
+            lexer = by_accepts.get(accepts)
+            if lexer is None:
+                terminals = [terminals_by_name[name] for name in accepts if name in terminals_by_name]
+                lexer = by_accepts[accepts] = _StateLexer(terminals, ignore, flags)
+            self._lexers[state] = lexer
+
+    def recognize(self, text: str) -> int:
+        """
+        Reconoce la consulta.
+
+        Args:
+            text (str): Consulta SQL
+
+        Returns:
+            int: -1 si la consulta es válida; si no, la posición del error
+        """
+        actions = self._actions
+        lexers = self._lexers
+        end_state = self._end_state
+        stack: List[int] = [self._start_state]
+        pos = 0
+        size = len(text)
+        last_start = 0  # Lark sitúa los errores de fin de entrada en el último token
+
+        while True:
+            # Siguiente terminal, con el lexer del estado actual
+            token_start = pos
+            if pos < size:
+                lexer = lexers[stack[-1]]
+                match = lexer.match(text, pos) if lexer.match is not None else None
+                if match is None:
+                    return pos
+                terminal = match.lastgroup
+                pos = match.end()
+                if terminal in lexer.ignore:
+                    continue
+                keywords = lexer.keywords.get(terminal)
+                if keywords is not None:
+                    keyword = keywords.fullmatch(text, token_start, pos)
+                    if keyword is not None:
+                        terminal = keyword.lastgroup
+                last_start = token_start
+            else:
+                terminal = END
+                token_start = last_start
+
+            # Reducir hasta poder desplazar el terminal (o aceptar al final)
+            while True:
+                action = actions[stack[-1]].get(terminal)
+                if action is None:
+                    return token_start
+                if action[0]:
+                    stack.append(action[1])
+                    break
+                count = action[1]
+                if count:
+                    del stack[-count:]
+                stack.append(actions[stack[-1]][action[2]][1])
+                if terminal is END and stack[-1] == end_state:
+                    return -1
+
+
+def build_recognizer(lark_parser: Lark, start: str = 'query') -> Optional[LALRRecognizer]:
+    #Crea el reconocedor, o None si el parser no lo admite (Earley)
+    try:
+        return LALRRecognizer(lark_parser, start)
+    except (ValueError, KeyError):
+        return None
@@ -0,0 +1,340 @@
+"""
+Motor de reglas del validador
+
+Cada regla declara qué nodos del árbol (por nombre de regla de la gramática)
+y qué tokens (por tipo de terminal) le interesan. El motor recorre el árbol
+y la secuencia de tokens una sola vez y despacha cada elemento a las reglas
+registradas para él, de modo que añadir una regla no añade un recorrido más.
+"""
+
+from lark import Token
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .compact_tree import SYMBOLS, TOKEN, TREE
+from .parse_tree import ParseTree, TreeNode
+
+ERROR = 'error'
+WARNING = 'warning'
+
+
+class RuleContext:
+    #Estado de una validación: consulta, árbol y mensajes de cada regla
+
+    __slots__ = ('query', 'tree', 'state', '_messages')
+
+    def __init__(self, query: str, tree: Optional[ParseTree], rule_count: int):
+        self.query = query
+        self.tree = tree
+        # Estado libre para las reglas (por convención, indexado por su nombre)
+        self.state: Dict[object, object] = {}
+        self._messages: List[List[str]] = [[] for _ in range(rule_count)]
+
+
+class Rule:
+    #Regla de validación; las subclases redefinen los métodos que necesiten
+
+    # Identificador de la regla
+    name = 'rule'
+    # ERROR o WARNING
+    severity = ERROR
+    # Nombres de reglas de la gramática cuyos nodos se quieren visitar
+    node_types: Tuple[str, ...] = ()
+    # Tipos de terminal cuyos tokens se quieren visitar
+    token_types: Tuple[str, ...] = ()
+
+    def begin(self, ctx: RuleContext, report):
+        #Antes del recorrido
+        pass
+
+    def visit_node(self, ctx: RuleContext, node: TreeNode, report):
+        #Nodo del árbol de un tipo registrado en node_types
+        pass
+
+    def visit_token(self, ctx: RuleContext, token_type: str, value: str, pos: int, report):
+        #Token de un tipo registrado en token_types
+        pass
+
+    def end(self, ctx: RuleContext, report):
+        #Después del recorrido
+        pass
+
+
+_COLUMN = SYMBOLS.intern('column')
+_CNAME = SYMBOLS.intern('CNAME')
+
+
+def _select_columns(ctx: RuleContext, node: TreeNode) -> List[str]:
+    #Nombres de las columnas de un nodo 'columns' (leídos una vez por validación)
+    key = ('columns', node.index)
+    cached = ctx.state.get(key)
+    if cached is not None:
+        return cached
+    compact = node.tree
+    names = compact._names
+    columns = []
+    for column in compact.children(node.index):
+        if names[column] == _COLUMN:
+            columns.extend(compact.value(child) for child in compact.children(column)
+                           if compact.is_token(child))
+    ctx.state[key] = columns
+    return columns
+
+
+class ColumnsRequiredRule(Rule):
+    #El SELECT debe tener al menos una columna (o '*')
+
+    name = 'columns-required'
+    node_types = ('columns',)
+
+    def begin(self, ctx, report):
+        ctx.state[self.name] = False
+
+    def visit_node(self, ctx, node, report):
+        if _select_columns(ctx, node):
+            ctx.state[self.name] = True
+
+    def end(self, ctx, report):
+        if not ctx.state[self.name] and '*' not in ctx.query:
+            report("SELECT debe especificar al menos una columna")
+
+
+class TableRequiredRule(Rule):
+    #Debe haber una tabla en FROM
+
+    name = 'table-required'
+    node_types = ('table',)
+
+    def begin(self, ctx, report):
+        ctx.state[self.name] = False
+
+    def visit_node(self, ctx, node, report):
+        if any(child.is_terminal() for child in node.children):
+            ctx.state[self.name] = True
+
+    def end(self, ctx, report):
+        if not ctx.state[self.name]:
+            report("Debe especificar una tabla en FROM")
+
+
+class DuplicateColumnsRule(Rule):
+    #Columnas repetidas en el SELECT, detectadas en tiempo lineal
+
+    name = 'duplicate-columns'
+    node_types = ('columns',)
+
+    def begin(self, ctx, report):
+        ctx.state[self.name] = []
+
+    def visit_node(self, ctx, node, report):
+        ctx.state[self.name].extend(_select_columns(ctx, node))
+
+    def end(self, ctx, report):
+        seen = set()
+        duplicates: Dict[str, None] = {}  # dict: conserva el orden de aparición
+        for column in ctx.state[self.name]:
+            if column in seen:
+                duplicates[column] = None
+            seen.add(column)
+        if duplicates:
+            report(f"Columnas duplicadas en SELECT: {', '.join(duplicates)}")
+
+
+class KeywordIdentifierRule(Rule):
+    #Avisa de identificadores que se escriben como una palabra clave
+
+    name = 'keyword-identifier'
+    severity = WARNING
+    # Los identificadores se leen de las hojas CNAME del árbol, que el parser
+    # tipó según el contexto: el lexer básico de tokenize() marca un FROM usado
+    # como nombre de tabla como la palabra clave. Los literales nunca son
+    # CNAME, aunque contengan palabras clave
+    node_types = ('column', 'table', 'value')
+    keywords = frozenset(('SELECT', 'FROM', 'WHERE', 'AND', 'OR', 'NOT', 'ORDER', 'BY', 'ASC', 'DESC'))
+
+    def begin(self, ctx, report):
+        ctx.state[self.name] = False
+
+    def visit_node(self, ctx, node, report):
+        if ctx.state[self.name]:
+            return
+        compact = node.tree
+        for child in compact.children(node.index):
+            if compact.is_token(child) and compact.name_id(child) == _CNAME:
+                value = compact.value(child)
+                keyword = value.upper()
+                if keyword in self.keywords:
+                    report(f"Recomendación: el identificador '{value}' coincide con la palabra clave {keyword}")
+                    ctx.state[self.name] = True  # Solo un warning general
+                    return
+
+
+class QueryLengthRule(Rule):
+    #Avisa de consultas demasiado largas
+
+    name = 'query-length'
+    severity = WARNING
+    max_length = 500
+
+    def end(self, ctx, report):
+        if len(ctx.query) > self.max_length:
+            report("Query muy larga, considere dividirla")
+
+
+def default_rules() -> List[Rule]:
+    #Reglas del validador, en el orden en que aparecen sus mensajes
+    return [
+        ColumnsRequiredRule(),
+        TableRequiredRule(),
+        DuplicateColumnsRule(),
+        KeywordIdentifierRule(),
+        QueryLengthRule(),
+    ]
+
+
+class RuleEngine:
+    #Ejecuta un conjunto de reglas con un único recorrido del árbol
+
+    def __init__(self, rules: Optional[Iterable[Rule]] = None):
+        """
+        Args:
+            rules (Iterable[Rule]): Reglas a ejecutar (por defecto, default_rules())
+        """
+        self._rebuild(default_rules() if rules is None else rules)
+
+    def _rebuild(self, rules: Iterable[Rule]):
+        #Registra de cero las reglas y sus tablas de despacho
+        self.rules: List[Rule] = []
+        # Id de símbolo -> índices de las reglas interesadas
+        self._node_dispatch: Dict[int, List[int]] = {}
+        self._token_dispatch: Dict[int, List[int]] = {}
+        for rule in rules:
+            self.add_rule(rule)
+
+    def add_rule(self, rule: Rule):
+        """
+        Registra una regla.
+
+        Raises:
+            ValueError: Si ya hay una regla con el mismo nombre
+        """
+        if any(existing.name == rule.name for existing in self.rules):
+            raise ValueError(f"Ya existe una regla llamada '{rule.name}'")
+        index = len(self.rules)
+        self.rules.append(rule)
+        for node_type in rule.node_types:
+            self._node_dispatch.setdefault(SYMBOLS.intern(node_type), []).append(index)
+        for token_type in rule.token_types:
+            self._token_dispatch.setdefault(SYMBOLS.intern(token_type), []).append(index)
+
+    def remove_rule(self, name: str) -> bool:
+        #Elimina una regla por nombre; retorna si existía
+        remaining = [rule for rule in self.rules if rule.name != name]
+        if len(remaining) == len(self.rules):
+            return False
+        self._rebuild(remaining)
+        return True
+
+    def run(self, query: str, tree: Optional[ParseTree] = None,
+            severities: Optional[Tuple[str, ...]] = None,
+            tokens: Optional[List[Token]] = None) -> Tuple[List[str], List[str]]:
+        """
+        Ejecuta las reglas sobre una consulta.
+
+        Los nodos se visitan en preorden y los tokens en orden de aparición.
+        Los mensajes se devuelven agrupados por regla, en el orden de registro.
+
+        Args:
+            query (str): Consulta SQL
+            tree (ParseTree): Árbol de la consulta (sin él no se visitan nodos)
+            severities (Tuple[str]): Ejecutar solo las reglas de estas severidades
+            tokens (List[Token]): Tokens del lexer (SQLParser.tokenize()). Sin
+                ellos, las reglas de tokens ven las hojas del árbol, que no
+                incluyen las palabras clave
+
+        Returns:
+            Tuple[List[str], List[str]]: (errores, avisos)
+        """
+        rules = self.rules
+        active = [severities is None or rule.severity in severities for rule in rules]
+        ctx = RuleContext(query, tree, len(rules))
+        reporters = [ctx._messages[i].append for i in range(len(rules))]
+
+        for i, rule in enumerate(rules):
+            if active[i]:
+                rule.begin(ctx, reporters[i])
+
+        if tokens is not None:
+            if self._token_dispatch:
+                self._scan(ctx, tokens, active, reporters)
+            if tree is not None and self._node_dispatch:
+                self._walk(ctx, tree, active, reporters, False)
+        elif tree is not None and (self._node_dispatch or self._token_dispatch):
+            self._walk(ctx, tree, active, reporters, bool(self._token_dispatch))
+
+        for i, rule in enumerate(rules):
+            if active[i]:
+                rule.end(ctx, reporters[i])
+
+        errors: List[str] = []
+        warnings: List[str] = []
+        for rule, messages in zip(rules, ctx._messages):
+            (warnings if rule.severity == WARNING else errors).extend(messages)
+        return errors, warnings
+
+    def _scan(self, ctx: RuleContext, tokens: List[Token], active: List[bool], reporters: list):
+        #Recorrido único de la secuencia de tokens
+        token_dispatch = self._token_dispatch
+        ids = SYMBOLS._ids
+        rules = self.rules
+        for token in tokens:
+            token_type = str(token.type)
+            targets = token_dispatch.get(ids.get(token_type))
+            if targets:
+                value = str(token)
+                for i in targets:
+                    if active[i]:
+                        rules[i].visit_token(ctx, token_type, value, token.start_pos, reporters[i])
+
+    def _walk(self, ctx: RuleContext, tree: ParseTree, active: List[bool], reporters: list,
+              visit_tokens: bool):
+        #Recorrido único en preorden sobre los arrays del árbol compacto
+        derivation = tree._derivation(0)
+        if derivation is None:
+            return
+        compact, root = derivation
+        kinds = compact._kinds
+        names = compact._names
+        first = compact._first
+        second = compact._second
+        node_dispatch = self._node_dispatch
+        token_dispatch = self._token_dispatch
+        rules = self.rules
+
+        stack = [root]
+        pop = stack.pop
+        push = stack.append
+        while stack:
+            index = pop()
+            if kinds[index] == TOKEN:
+                # Solo se apilan tokens si alguna regla los espera
+                targets = token_dispatch.get(names[index])
+                if targets:
+                    token_type = SYMBOLS.name(names[index])
+                    value = compact.value(index)
+                    for i in targets:
+                        if active[i]:
+                            rules[i].visit_token(ctx, token_type, value, first[index], reporters[i])
+                continue
+
+            targets = node_dispatch.get(names[index])
+            if targets:
+                node = TreeNode(compact, index)
+                for i in targets:
+                    if active[i]:
+                        rules[i].visit_node(ctx, node, reporters[i])
+
+            start = first[index]
+            # Hijos en orden inverso para visitarlos de izquierda a derecha
+            for child in range(start + second[index] - 1, start - 1, -1):
+                if visit_tokens or kinds[child] == TREE:
+                    push(child)
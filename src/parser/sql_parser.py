@@ -1,58 +1,176 @@
 #Parser principal para consultas SQL
 #Maneja el parsing, detección de ambigüedad y generación de árboles
 
-from lark import Lark, Tree
+from lark import Lark, Token, Tree
 from lark.exceptions import LarkError, UnexpectedInput, UnexpectedCharacters
-from typing import Optional, List, Tuple
+from lark.parsers.earley_forest import SymbolNode
+from typing import TYPE_CHECKING, Iterator, Optional, List, Tuple
+import functools
 import logging
+import time
+import weakref
 
 from ..grammar.sql_grammar import get_grammar
+from ..grammar.parser_registry import get_registry
+from .fingerprint import QueryFingerprint, QueryFingerprinter, QueryTemplate
+from .interning import InternedBatch, SubtreeInterner
+from .parse_cache import ParseCache, normalize_query
+from .compact_tree import CompactTree
+from .forest import DerivationForest, ForestAnalysis, tree_callbacks
+from .metrics import METRICS
 from .parse_tree import ParseTree
+from .native_parser import NativeSQLParser, build_native_parser
+from .recognizer import LALRRecognizer, build_recognizer
+from .stream import DEFAULT_CHUNK_SIZE, Source, iter_statements
+
+if TYPE_CHECKING:
+    from .batch import ParallelBatchRunner
 
 logger = logging.getLogger(__name__)
 
+# Estadísticas del registro de gramáticas en la exportación de métricas
+METRICS.register_collector('grammar_registry', lambda: get_registry().get_stats())
+
+# Modos de parsing soportados
+PARSER_MODES = ('auto', 'lalr', 'earley')
+
+# Implementaciones del parsing: Lark o el parser nativo (ver native_parser.py)
+BACKENDS = ('lark', 'native')
+
+
 class SQLParser:
     #Analizador de consultas SQL con soporte para detección de ambigüedades
+    #Una instancia se puede compartir entre hilos para parsear (garantías en pool.py)
 
-    def __init__(self, ambiguous: bool = False, detect_ambiguity: bool = False):
+    def __init__(self, ambiguous: bool = False, detect_ambiguity: bool = False, mode: str = "auto",
+                 cache_size: int = 0, cache_max_bytes: Optional[int] = None,
+                 template_cache_size: int = 0, backend: str = "lark"):
         """
         Inicializa el parser SQL.
         
         Args:
             ambiguous (bool): Si True, usa la gramática ambigua
             detect_ambiguity (bool): Si True, detecta múltiples derivaciones
+            mode (str): Algoritmo de parsing: "auto", "lalr" o "earley".
+                "auto" usa LALR(1) con lexer contextual cuando la gramática
+                lo permite y Earley solo para la gramática ambigua o cuando
+                se pide detección explícita de ambigüedad. La gramática
+                ambigua no admite "lalr".
+            cache_size (int): Entradas de la caché de resultados (0 = sin caché)
+            cache_max_bytes (int): Memoria máxima estimada de la caché
+            template_cache_size (int): Entradas de la caché de plantillas, que
+                reutiliza el árbol de consultas que solo difieren en literales
+                (0 = sin caché)
+            backend (str): "lark" o "native". El parser nativo solo admite la
+                gramática no ambigua; produce el mismo árbol que Lark y, si
+                no reconoce una consulta, la parsea Lark (errores incluidos)
         """
+        if mode not in PARSER_MODES:
+            raise ValueError(f"Modo de parser inválido: {mode!r} (opciones: {', '.join(PARSER_MODES)})")
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend inválido: {backend!r} (opciones: {', '.join(BACKENDS)})")
+        if backend == 'native' and (ambiguous or detect_ambiguity):
+            raise ValueError("El backend nativo solo admite la gramática no ambigua sin detección de ambigüedad")
+        if ambiguous and mode == 'lalr':
+            # Lark resuelve los conflictos shift/reduce de AND y OR desplazando,
+            # sin error: el parser se construiría y parsearía mal en silencio
+            raise ValueError("La gramática ambigua tiene conflictos LALR(1); use mode='auto' o 'earley'")
+
         self.ambiguous = ambiguous
         self.detect_ambiguity = detect_ambiguity
+        self.mode = mode
+        self.backend = backend
+        # Configuración para reconstruir el parser en los procesos trabajadores
+        self._options = {
+            'ambiguous': ambiguous,
+            'detect_ambiguity': detect_ambiguity,
+            'mode': mode,
+            'cache_size': cache_size,
+            'cache_max_bytes': cache_max_bytes,
+            'template_cache_size': template_cache_size,
+            'backend': backend,
+        }
+        self._batch_runner: Optional['ParallelBatchRunner'] = None
         self._grammar_string = get_grammar(ambiguous=ambiguous)
+        self.algorithm = self._resolve_algorithm()
         self._parser = self._create_parser()
 
+        # Caché opcional de resultados indexada por la consulta normalizada
+        self.cache: Optional[ParseCache] = None
+        if cache_size:
+            self.cache = ParseCache(cache_size, cache_max_bytes, size_of=ParseTree.estimate_size)
+
+        self._fingerprinter: Optional[QueryFingerprinter] = None
+        self._recognizer: Optional[LALRRecognizer] = None
+        self._recognizer_checked = False
+        self._native: Optional[NativeSQLParser] = None
+        if backend == 'native' and self._parser is not None:
+            self._native = build_native_parser(self._parser)
+        self._forest_callbacks: Optional[dict] = None
+        self.template_cache: Optional[ParseCache] = None
+        if template_cache_size:
+            self.template_cache = ParseCache(template_cache_size)
+
+    def _resolve_algorithm(self) -> str:
+        #Decide el algoritmo real ('lalr' o 'earley') según el modo pedido
+        if self.mode != 'auto':
+            return self.mode
+        # La gramática ambigua y la detección de ambigüedad necesitan Earley
+        if self.ambiguous or self.detect_ambiguity:
+            return 'earley'
+        return 'lalr'
+
     def _create_parser(self) -> Optional[Lark]:
         #Crea el parser de Lark con la configuración apropiada
         try:
-            parser_config = {
-                'start': 'query',
-                'parser': 'earley',  # Earley puede manejar ambigüedad
-            }
-            
-            # Si queremos detectar ambigüedad explícitamente
-            if self.detect_ambiguity:
-                parser_config['ambiguity'] = 'explicit'
-            
-            parser = Lark(self._grammar_string, **parser_config)
-            logger.info(f"Parser creado (ambiguo={self.ambiguous}, detectar_ambigüedad={self.detect_ambiguity})")
-            return parser
-            
+            return self._build_lark(self.algorithm)
         except Exception as e:
-            logger.error(f"Error al crear parser: {e}")
+            if self.mode == 'auto' and self.algorithm == 'lalr':
+                # Lark rechazó la tabla LALR(1) (p. ej. un conflicto
+                # reduce/reduce): volver a Earley
+                logger.warning("La gramática no admite LALR (%s), usando Earley", e)
+                self.algorithm = 'earley'
+                try:
+                    return self._build_lark(self.algorithm)
+                except Exception as e:
+                    logger.error("Error al crear parser: %s", e)
+                    return None
+            logger.error("Error al crear parser: %s", e)
             return None
+
+    def _build_lark(self, algorithm: str) -> Lark:
+        #Obtiene del registro global la instancia de Lark para el algoritmo indicado
+        parser_config = {
+            'start': 'query',
+            'parser': algorithm,
+        }
+
+        if algorithm == 'lalr':
+            # LALR(1) con lexer contextual: produce el mismo árbol que Earley
+            # para la gramática no ambigua, a una fracción del coste
+            parser_config['lexer'] = 'contextual'
+        elif self.detect_ambiguity:
+            # Bosque compartido: la ambigüedad se analiza sin expandir las
+            # derivaciones (solo Earley)
+            parser_config['ambiguity'] = 'forest'
+
+        if algorithm == 'lalr' and self.detect_ambiguity:
+            logger.warning("LALR no puede detectar ambigüedad; se ignorará detect_ambiguity")
+
+        parser = get_registry().get_parser(self._grammar_string, **parser_config)
+        logger.info("Parser listo (ambiguo=%s, detectar_ambigüedad=%s, algoritmo=%s)",
+                    self.ambiguous, self.detect_ambiguity, algorithm)
+        return parser
         
-    def parse(self, query: str) -> Optional[ParseTree]:
+    def parse(self, query: str, tokens: Optional[List[Token]] = None) -> Optional[ParseTree]:
         """
         Parsea una consulta SQL.
         
         Args:
             query (str): Consulta SQL a parsear
+            tokens (List[Token]): Tokens de la consulta ya obtenidos con
+                tokenize(); con LALR el parser los consume directamente y la
+                consulta no se vuelve a tokenizar
             
         Returns:
             ParseTree: Árbol de derivación, o None si hay error
@@ -64,56 +182,313 @@ class SQLParser:
         if not query or not query.strip():
             logger.error("Consulta vacía")
             return None
-        
+
+        cache_key = None
+        if self.cache is not None:
+            cache_key = normalize_query(query)
+            cached = self.cache.get(cache_key)
+            if METRICS.enabled:
+                METRICS.inc('cache_lookups', cache='result', outcome='miss' if cached is None else 'hit')
+            if cached is not None:
+                # Se entrega una copia: solo se comparte el árbol compacto, que es inmutable
+                return cached.copy(query)
+
+        if self.template_cache is not None:
+            tree = self._parse_with_template(query, tokens)
+        else:
+            tree = self._parse_uncached(query, tokens)
+        if tree is not None and cache_key is not None:
+            self.cache.put(cache_key, tree.copy())
+        return tree
+
+    def _parse_with_template(self, query: str, tokens: Optional[List[Token]] = None) -> Optional[ParseTree]:
+        #Parsea reutilizando el árbol de otra consulta con la misma plantilla
+        if tokens is not None:
+            fp = self._get_fingerprinter().fingerprint_tokens(tokens)
+        else:
+            fp = self.fingerprint(query)
+        if fp is None:
+            return self._parse_uncached(query)
+
+        template = self.template_cache.get(fp.template)
+        started = time.perf_counter() if METRICS.enabled else None
+        bound = template.bind(query, fp.tokens) if template is not None else None
+        if METRICS.enabled:
+            METRICS.inc('cache_lookups', cache='template', outcome='miss' if bound is None else 'hit')
+        if bound is not None:
+            if started is not None:
+                METRICS.since('template', started)
+            return ParseTree.from_compact(bound, query)
+
+        # Los tokens de la huella sirven también para el parsing
+        tree = self._parse_uncached(query, fp.tokens)
+        if tree is not None and not tree.is_ambiguous:
+            template = QueryTemplate.from_tree(tree.to_compact(), fp.tokens, tree.is_ambiguous)
+            if template is not None:
+                self.template_cache.put(fp.template, template)
+        return tree
+
+    def fingerprint(self, query: str) -> Optional[QueryFingerprint]:
+        """
+        Calcula la huella de la consulta (plantilla sin literales y parámetros).
+
+        Args:
+            query (str): Consulta SQL
+
+        Returns:
+            QueryFingerprint: Huella, o None si la consulta no se puede tokenizar
+        """
+        tokens = self.tokenize(query)
+        if tokens is None:
+            return None
+        return self._get_fingerprinter().fingerprint_tokens(tokens)
+
+    def tokenize(self, query: str) -> Optional[List[Token]]:
+        """
+        Tokeniza la consulta con el lexer de la gramática.
+
+        Los tokens se pueden pasar a parse() para no tokenizar dos veces, y
+        también incluyen las palabras clave que el árbol descarta.
+
+        Args:
+            query (str): Consulta SQL
+
+        Returns:
+            List[Token]: Tokens en orden, o None si hay caracteres no válidos
+        """
+        started = time.perf_counter() if METRICS.enabled else None
+        tokens = self._native.tokenize(query) if self._native is not None else None
+        if tokens is None:
+            try:
+                tokens = self._get_fingerprinter().tokenize(query)
+            except LarkError:
+                tokens = None
+        if started is not None:
+            METRICS.since('lex', started)
+            if tokens is None:
+                METRICS.inc('parse_errors', kind='lex')
+        return tokens
+
+    def _get_fingerprinter(self) -> QueryFingerprinter:
+        #Crea el calculador de huellas (y su lexer) la primera vez
+        if self._fingerprinter is None:
+            self._fingerprinter = QueryFingerprinter(self._grammar_string)
+        return self._fingerprinter
+
+    def _parse_tokens(self, query: str, tokens: List[Token]):
+        """
+        Parsea con LALR a partir de una secuencia de tokens ya obtenida.
+
+        El lexer de la gramática no distingue contextos: una palabra clave
+        usada como identificador (SELECT FROM FROM t) sale como palabra
+        clave. Si los tokens no se aceptan se repite el parsing sobre el
+        texto con el lexer contextual, que decide y da el mensaje de error.
+        """
+        interactive = self._parser.parse_interactive()
+        try:
+            for token in tokens:
+                interactive.feed_token(token)
+            return interactive.feed_eof(tokens[-1] if tokens else None)
+        except UnexpectedInput:
+            return self._parser.parse(query)
+
+    def _parse_uncached(self, query: str, tokens: Optional[List[Token]] = None) -> Optional[ParseTree]:
+        #Parsea la consulta sin pasar por la caché
+        started = time.perf_counter() if METRICS.enabled else None
+        if self._native is not None:
+            compact = self._native.parse(query)
+            if compact is not None:
+                if started is not None:
+                    METRICS.since('parse', started, algorithm='native')
+                    METRICS.inc('parses', result='ok')
+                logger.info("Consulta parseada exitosamente")
+                return ParseTree.from_compact(compact, query)
+            # Consulta no reconocida: Lark decide y da el mensaje de error
         try:
-            tree = self._parser.parse(query)
+            if tokens is not None and self.algorithm == 'lalr':
+                tree = self._parse_tokens(query, tokens)
+            else:
+                tree = self._parser.parse(query)
+            if started is not None:
+                METRICS.since('parse', started, algorithm=self.algorithm)
             
             # Verificar si hay ambigüedad detectada
-            is_ambiguous = hasattr(tree, 'data') and tree.data == '_ambig'
-            
-            if is_ambiguous:
-                logger.info(f"Ambigüedad detectada: {len(tree.children)} derivaciones")
-                # Crear ParseTree para cada derivación
-                return ParseTree(tree, query, is_ambiguous=True)
+            if isinstance(tree, SymbolNode):
+                result = self._tree_from_forest(tree, query)
             else:
                 logger.info("Consulta parseada exitosamente")
-                return ParseTree(tree, query, is_ambiguous=False)
+                result = ParseTree(tree, query, is_ambiguous=False)
+            if started is not None:
+                METRICS.inc('parses', result='ok')
+            return result
                 
         except UnexpectedCharacters as e:
-            logger.error(f"Carácter inesperado en posición {e.pos_in_stream}: '{e.char}'")
+            logger.error("Carácter inesperado en posición %s: '%s'", e.pos_in_stream, e.char)
+            self._count_error('unexpected_characters')
             return None
             
         except UnexpectedInput as e:
-            logger.error(f"Entrada inesperada: {e}")
+            logger.error("Entrada inesperada: %s", e)
+            self._count_error('unexpected_input')
             return None
             
         except LarkError as e:
-            logger.error(f"Error de parsing: {e}")
+            logger.error("Error de parsing: %s", e)
+            self._count_error('lark')
             return None
             
         except Exception as e:
-            logger.error(f"Error inesperado: {type(e).__name__}: {e}")
+            logger.error("Error inesperado: %s: %s", type(e).__name__, e)
+            self._count_error('internal')
             return None
+
+    @staticmethod
+    def _count_error(kind: str):
+        #Cuenta un parsing fallido por tipo de error (si la instrumentación está activa)
+        if METRICS.enabled:
+            METRICS.inc('parses', result='error')
+            METRICS.inc('parse_errors', kind=kind)
         
-    def parse_multiple(self, queries: List[str]) -> List[Tuple[str, Optional[ParseTree]]]:
+    def _tree_from_forest(self, root: SymbolNode, query: str) -> ParseTree:
+        #Cuenta las derivaciones del bosque y construye solo la primera
+        if self._forest_callbacks is None:
+            self._forest_callbacks = tree_callbacks(self._parser)
+        if METRICS.enabled:
+            started = time.perf_counter()
+            forest = DerivationForest(root, query, self._forest_callbacks)
+            derivations = forest.derivation_count
+            METRICS.since('forest', started)
+            if derivations > 1:
+                METRICS.inc('ambiguous_queries')
+                METRICS.inc('derivations', derivations)
+        else:
+            forest = DerivationForest(root, query, self._forest_callbacks)
+        if forest.derivation_count > 1:
+            logger.info("Ambigüedad detectada: %s derivaciones", forest.derivation_count)
+        else:
+            logger.info("Consulta parseada exitosamente")
+        return ParseTree(forest.derivation(0), query, forest=forest)
+
+    def _tree_from_worker(self, query: str,
+                          item: Optional[Tuple[CompactTree, Optional[ForestAnalysis]]]) -> Optional[ParseTree]:
+        """
+        Árbol de una consulta parseada en un proceso trabajador.
+
+        El bosque no viaja entre procesos (es un grafo de objetos de Lark):
+        el trabajador envía la primera derivación y el análisis, y el resto
+        de derivaciones se obtienen reparseando la consulta en este proceso
+        la primera vez que se piden.
+
+        Args:
+            query (str): Consulta SQL
+            item: (árbol compacto, análisis del bosque) del trabajador, o None
+
+        Returns:
+            ParseTree: Árbol de la consulta, o None si no se pudo parsear
+        """
+        if item is None:
+            return None
+        compact, ambiguity = item
+        loader = None
+        if ambiguity is not None and ambiguity.derivation_count > 1:
+            loader = functools.partial(self._load_forest, query)
+        return ParseTree.from_compact(compact, query, ambiguity, forest_loader=loader)
+
+    def _load_forest(self, query: str) -> Optional[DerivationForest]:
+        #Reparsea una consulta ambigua para recuperar su bosque de derivaciones
+        tree = self._parse_uncached(query)
+        return tree._forest if tree is not None else None
+
+    def parse_multiple(self, queries: List[str], workers: Optional[int] = None,
+                       chunk_size: Optional[int] = None) -> List[Tuple[str, Optional[ParseTree]]]:
         """
         Parsea múltiples consultas.
         
         Args:
             queries (List[str]): Lista de consultas SQL
+            workers (int): Procesos a usar; None o 1 parsea en este proceso
+            chunk_size (int): Consultas por bloque enviado a cada proceso
             
         Returns:
-            List[Tuple[str, Optional[ParseTree]]]: Lista de (query, árbol)
+            List[Tuple[str, Optional[ParseTree]]]: Lista de (query, árbol), en el
+                orden de entrada
         """
+        if workers is not None and workers > 1:
+            parsed = self._get_batch_runner(workers).parse(queries, chunk_size)
+            return [(query, self._tree_from_worker(query, item)) for query, item in zip(queries, parsed)]
+
         results = []
         for query in queries:
             tree = self.parse(query)
             results.append((query, tree))
         return results
     
+    def parse_interned(self, queries: List[str], workers: Optional[int] = None, chunk_size: Optional[int] = None,
+                       interner: Optional[SubtreeInterner] = None) -> InternedBatch:
+        """
+        Parsea múltiples consultas y guarda sus árboles con los subárboles
+        iguales compartidos.
+
+        Args:
+            queries (List[str]): Lista de consultas SQL
+            workers (int): Procesos a usar; None o 1 parsea en este proceso
+            chunk_size (int): Consultas por bloque enviado a cada proceso
+            interner (SubtreeInterner): DAG a usar; compartirlo entre lotes
+                comparte también sus subárboles
+
+        Returns:
+            InternedBatch: Un id de raíz por consulta, en el orden de entrada
+        """
+        if workers is not None and workers > 1:
+            return InternedBatch.from_trees(self.parse_multiple(queries, workers, chunk_size), interner)
+        # En este proceso cada árbol se interna y se descarta en cuanto se
+        # parsea; la caché de resultados se salta, porque guardaría una copia
+        # de cada árbol (la de plantillas solo guarda una por plantilla)
+        parse = self._parse_with_template if self.template_cache is not None else self._parse_uncached
+        return InternedBatch.from_trees(((query, parse(query)) for query in queries), interner)
+
+    def iter_parse(self, source: Source, offset: int = 0,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Tuple[int, str, Optional[ParseTree]]]:
+        """
+        Parsea de forma perezosa las sentencias de un fichero o flujo.
+
+        Las sentencias se separan por ';' (respetando los literales entre
+        comillas) y se leen incrementalmente, con memoria constante.
+
+        Args:
+            source: Ruta del fichero u objeto fichero
+            offset (int): Posición desde la que reanudar; usar la de la primera
+                sentencia que no llegó a procesarse
+            chunk_size (int): Tamaño de bloque para flujos que no se pueden mapear
+
+        Yields:
+            Tuple[int, str, Optional[ParseTree]]: (posición, consulta, árbol)
+        """
+        for position, query in iter_statements(source, offset, chunk_size):
+            yield position, query, self.parse(query)
+
+    def _get_batch_runner(self, workers: int) -> 'ParallelBatchRunner':
+        #Retorna el pool de procesos, creándolo (o redimensionándolo) si hace falta
+        if self._batch_runner is None or self._batch_runner.workers != workers:
+            # multiprocessing solo se importa si se usa el modo paralelo
+            from .batch import ParallelBatchRunner
+            self.close()
+            self._batch_runner = ParallelBatchRunner(workers, 'parser', self._options)
+        return self._batch_runner
+
+    def close(self):
+        #Detiene el pool de procesos del modo paralelo, si existe
+        if self._batch_runner is not None:
+            self._batch_runner.close()
+            self._batch_runner = None
+
     def validate_syntax(self, query: str) -> Tuple[bool, str]:
         """
-        Valida únicamente la sintaxis sin generar el árbol completo.
+        Valida únicamente la sintaxis sin generar el árbol.
+
+        Con LALR se usa un reconocedor que recorre la tabla del parser sin
+        crear tokens ni árboles. Si la consulta no es válida se repite el
+        parsing con Lark para dar el mismo mensaje y posición de error.
         
         Args:
             query (str): Consulta SQL
@@ -121,6 +496,27 @@ class SQLParser:
         Returns:
             Tuple[bool, str]: (es_válida, mensaje)
         """
+        if METRICS.enabled:
+            started = time.perf_counter()
+            result = self._validate_syntax(query)
+            METRICS.since('validate_syntax', started)
+            METRICS.inc('syntax_checks', result='valid' if result[0] else 'invalid')
+            return result
+        return self._validate_syntax(query)
+
+    def _validate_syntax(self, query: str) -> Tuple[bool, str]:
+        if not self._recognizer_checked:
+            # Se intenta una sola vez: sin reconocedor se valida parseando
+            if self.algorithm == 'lalr' and self._parser is not None:
+                self._recognizer = build_recognizer(self._parser)
+            self._recognizer_checked = True
+        if self._recognizer is not None and isinstance(query, str):
+            if self._recognizer.recognize(query) < 0:
+                return True, "Sintaxis válida"
+        return self._validate_with_parser(query)
+
+    def _validate_with_parser(self, query: str) -> Tuple[bool, str]:
+        #Valida la sintaxis con un parsing completo (Earley y mensajes de error)
         try:
             self._parser.parse(query)
             return True, "Sintaxis válida"
@@ -137,4 +533,48 @@ class SQLParser:
     
     def is_ambiguous_grammar(self) -> bool:
         #Retorna si se está usando la gramática ambigua
-        return self.ambiguous
\ No newline at end of file
+        return self.ambiguous
+
+    def clear_cache(self):
+        #Vacía las cachés de resultados y de plantillas, si están activas
+        if self.cache is not None:
+            self.cache.clear()
+        if self.template_cache is not None:
+            self.template_cache.clear()
+
+    def get_template_cache_stats(self) -> Optional[dict]:
+        #Retorna las estadísticas de la caché de plantillas, o None si no está activa
+        return self.template_cache.get_stats() if self.template_cache is not None else None
+
+    def get_cache_stats(self) -> Optional[dict]:
+        #Retorna las estadísticas de la caché de resultados, o None si no está activa
+        return self.cache.get_stats() if self.cache is not None else None
+
+    def register_metrics(self, name: str = 'parser'):
+        """
+        Incluye las estadísticas de las cachés de este parser en la
+        exportación de métricas (metrics.METRICS.render_prometheus).
+
+        El registro no mantiene vivo al parser: si se libera, la fuente deja
+        de aportar valores.
+
+        Args:
+            name (str): Valor de la etiqueta source de sus métricas
+        """
+        parser_ref = weakref.ref(self)
+
+        def collect() -> dict:
+            parser = parser_ref()
+            values = {}
+            if parser is not None:
+                for prefix, stats in (('result_cache', parser.get_cache_stats()),
+                                      ('template_cache', parser.get_template_cache_stats())):
+                    if stats is not None:
+                        values.update((f"{prefix}_{key}", value) for key, value in stats.items())
+            return values
+
+        METRICS.register_collector(name, collect)
+
+    def get_algorithm(self) -> str:
+        #Retorna el algoritmo de parsing en uso ('lalr' o 'earley')
+        return self.algorithm
@@ -0,0 +1,179 @@
+# Lectura incremental de ficheros de log con muchas consultas SQL
+#
+# Divide la entrada en sentencias separadas por ';' respetando los literales
+# entre comillas (SINGLE_STRING y STRING de la gramática). Los ficheros se
+# recorren a través de un mapa de memoria y los flujos sin descriptor se leen
+# por bloques, así que la memoria usada no depende del tamaño de la entrada.
+
+from typing import IO, Iterator, Optional, Tuple, Union
+import mmap
+import os
+import re
+
+Source = Union[str, os.PathLike, IO]
+
+# Tamaño de bloque para los flujos que no se pueden mapear en memoria
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+_SPECIAL_BYTES = re.compile(rb"""[;'"]""")
+_SPECIAL_CHARS = re.compile(r"""[;'"]""")
+
+
+class _StatementSplitter:
+    #Separa sentencias en un buffer que puede llegar por partes
+
+    def __init__(self, text_mode: bool, start: int = 0):
+        self._special = _SPECIAL_CHARS if text_mode else _SPECIAL_BYTES
+        if text_mode:
+            self._semicolon, self._double, self._backslash = ';', '"', '\\'
+        else:
+            self._semicolon, self._double, self._backslash = b';', b'"', ord('\\')
+        self.quote = None
+        self.pos = start          # Hasta dónde se ha analizado el buffer
+        self.stmt_start = start   # Inicio de la sentencia en curso
+
+    def split(self, buf) -> Iterator[Tuple[int, int]]:
+        """
+        Busca fines de sentencia en buf a partir de la última posición analizada.
+
+        Args:
+            buf: Buffer (bytes, str o mmap)
+
+        Yields:
+            Tuple[int, int]: (inicio, fin) de cada sentencia completa
+        """
+        size = len(buf)
+        while self.pos < size:
+            if self.quote is None:
+                match = self._special.search(buf, self.pos)
+                if match is None:
+                    self.pos = size
+                    return
+                index = match.start()
+                char = buf[index:index + 1]
+                self.pos = index + 1
+                if char == self._semicolon:
+                    start, self.stmt_start = self.stmt_start, index + 1
+                    yield start, index
+                else:
+                    self.quote = char
+            else:
+                index = buf.find(self.quote, self.pos)
+                if index < 0:
+                    self.pos = size
+                    return
+                self.pos = index + 1
+                if self.quote == self._double and self._is_escaped(buf, index):
+                    continue  # \" dentro de STRING
+                self.quote = None
+
+    def discard(self) -> int:
+        #Olvida lo anterior a la sentencia en curso; retorna cuánto se descartó
+        dropped = self.stmt_start
+        self.pos -= dropped
+        self.stmt_start = 0
+        return dropped
+
+    def _is_escaped(self, buf, index: int) -> bool:
+        #Una comilla está escapada si la precede un número impar de '\'
+        count = 0
+        index -= 1
+        while index >= 0 and buf[index] == self._backslash:
+            count += 1
+            index -= 1
+        return count % 2 == 1
+
+
+def _decode(raw) -> str:
+    return raw if isinstance(raw, str) else raw.decode('utf-8', errors='replace')
+
+
+def _iter_mapped(mapped, offset: int) -> Iterator[Tuple[int, str]]:
+    #Recorre un fichero mapeado en memoria (solo se copia cada sentencia)
+    splitter = _StatementSplitter(text_mode=False, start=offset)
+    for start, end in splitter.split(mapped):
+        yield start, _decode(mapped[start:end])
+    if splitter.stmt_start < len(mapped):
+        yield splitter.stmt_start, _decode(mapped[splitter.stmt_start:])
+
+
+def _iter_chunks(stream: IO, offset: int, chunk_size: int) -> Iterator[Tuple[int, str]]:
+    #Recorre un flujo por bloques, guardando solo la sentencia incompleta
+    if offset:
+        if stream.seekable():
+            stream.seek(offset)
+        else:
+            remaining = offset
+            while remaining > 0:
+                skipped = stream.read(min(remaining, chunk_size))
+                if not skipped:
+                    return
+                remaining -= len(skipped)
+
+    splitter: Optional[_StatementSplitter] = None
+    buffer = None
+    base = offset  # Posición absoluta de buffer[0]
+
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        if splitter is None:
+            splitter = _StatementSplitter(text_mode=isinstance(chunk, str))
+            buffer = chunk
+        else:
+            buffer += chunk
+
+        for start, end in splitter.split(buffer):
+            yield base + start, _decode(buffer[start:end])
+
+        # Descartar lo ya emitido para que la memoria no crezca
+        dropped = splitter.discard()
+        buffer = buffer[dropped:]
+        base += dropped
+
+    if buffer:
+        yield base, _decode(buffer)
+
+
+def iter_statements(source: Source, offset: int = 0,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Tuple[int, str]]:
+    """
+    Itera de forma perezosa sobre las sentencias de un fichero o flujo.
+
+    Args:
+        source: Ruta del fichero o objeto fichero (binario o de texto)
+        offset (int): Posición desde la que continuar (la de una sentencia
+            emitida en una ejecución anterior)
+        chunk_size (int): Tamaño de bloque para flujos que no se pueden mapear
+
+    Yields:
+        Tuple[int, str]: (posición de inicio, sentencia sin espacios extremos);
+            la posición es en bytes para ficheros con descriptor y en
+            unidades de read() para el resto de flujos
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            yield from _iter_file(f, offset, chunk_size)
+    else:
+        yield from _iter_file(source, offset, chunk_size)
+
+
+def _iter_file(f: IO, offset: int, chunk_size: int) -> Iterator[Tuple[int, str]]:
+    #Usa un mapa de memoria si el objeto tiene descriptor; si no, lee por bloques
+    mapped = None
+    try:
+        if os.fstat(f.fileno()).st_size > 0:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, OSError, ValueError):
+        mapped = None  # io.BytesIO, io.StringIO, tuberías...
+
+    statements = _iter_mapped(mapped, offset) if mapped is not None else _iter_chunks(f, offset, chunk_size)
+    try:
+        for start, statement in statements:
+            stripped = statement.strip()
+            if stripped:
+                yield start, stripped
+    finally:
+        if mapped is not None:
+            mapped.close()
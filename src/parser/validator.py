@@ -3,19 +3,35 @@ Validador de consultas SQL
 Realiza validaciones sintácticas y semánticas
 """
 
-from typing import List, Tuple, Optional
+from typing import TYPE_CHECKING, List, Tuple, Optional
 import logging
+import time
 from .sql_parser import SQLParser
+from .forest import AmbiguousSpan
+from .metrics import METRICS
 from .parse_tree import ParseTree
+from .rules import ERROR, WARNING, Rule, RuleEngine
+
+if TYPE_CHECKING:
+    from .batch import ParallelBatchRunner
 
 logger = logging.getLogger(__name__)
 
 
 class SQLValidator:
     #Validador de consultas SQL con análisis sintáctico y semántico
+    #validate_query admite llamadas concurrentes; add_rule/remove_rule no (ver pool.py)
     
-    def __init__(self):
-        self.parser = SQLParser(ambiguous=False)
+    def __init__(self, rules: Optional[List[Rule]] = None, backend: str = "lark"):
+        """
+        Args:
+            rules (List[Rule]): Reglas de validación (por defecto, las de rules.default_rules())
+            backend (str): Backend del parser: "lark" o "native" (ver SQLParser)
+        """
+        self.parser = SQLParser(ambiguous=False, backend=backend)
+        self.engine = RuleEngine(rules)
+        self._ambiguous_parser: Optional[SQLParser] = None
+        self._batch_runner: Optional['ParallelBatchRunner'] = None
     
     def validate_query(self, query: str) -> Tuple[bool, List[str], Optional[ParseTree]]:
         """
@@ -36,81 +52,103 @@ class SQLValidator:
             errors.append("Consulta vacía")
             return False, errors, None
         
-        # Validar sintaxis
-        tree = self.parser.parse(query)
+        # Validar sintaxis: la consulta se tokeniza una vez y los mismos
+        # tokens alimentan al parser y a las reglas de estilo
+        tokens = self.parser.tokenize(query)
+        tree = self.parser.parse(query, tokens)
         if not tree:
             errors.append("Error de sintaxis en la consulta")
+            if METRICS.enabled:
+                METRICS.inc('validations', result='syntax_error')
             return False, errors, None
         
-        # Validaciones semánticas
-        semantic_errors = self._validate_semantics(tree, query)
-        errors.extend(semantic_errors)
-        
-        # Validaciones de estilo
-        style_warnings = self._validate_style(query)
-        warnings.extend(style_warnings)
+        # Validaciones semánticas y de estilo: un solo recorrido del árbol (con
+        # instrumentación se mide el mismo recorrido, como fase rules)
+        started = time.perf_counter() if METRICS.enabled else None
+        rule_errors, rule_warnings = self.engine.run(query, tree, tokens=tokens)
+        if started is not None:
+            METRICS.since('rules', started)
+        errors.extend(rule_errors)
+        warnings.extend(rule_warnings)
         
         is_valid = len(errors) == 0
         all_messages = errors + warnings
+        if METRICS.enabled:
+            METRICS.inc('validations', result='valid' if is_valid else 'invalid')
+            if errors:
+                METRICS.inc('validation_messages', len(errors), severity=ERROR)
+            if warnings:
+                METRICS.inc('validation_messages', len(warnings), severity=WARNING)
         
         return is_valid, all_messages, tree
     
     def _validate_semantics(self, tree: ParseTree, query: str) -> List[str]:
-        #Validaciones semánticas
-        errors = []
-        
-        # Validar que SELECT tenga al menos una columna
-        columns = tree.extract_columns()
-        if not columns and '*' not in query:
-            errors.append("SELECT debe especificar al menos una columna")
-        
-        # Validar que haya una tabla
-        table = tree.extract_table()
-        if not table:
-            errors.append("Debe especificar una tabla en FROM")
-        
-        # Validar duplicados en SELECT
-        if len(columns) != len(set(columns)):
-            duplicates = [col for col in columns if columns.count(col) > 1]
-            errors.append(f"Columnas duplicadas en SELECT: {', '.join(set(duplicates))}")
-        
+        #Validaciones semánticas (solo las reglas de severidad error)
+        errors, _ = self.engine.run(query, tree, severities=(ERROR,))
         return errors
     
     def _validate_style(self, query: str) -> List[str]:
         """Validaciones de estilo (warnings)"""
-        warnings = []
-        
-        # Verificar uso de palabras clave en mayúsculas (recomendado)
-        keywords = ['SELECT', 'FROM', 'WHERE', 'AND', 'OR', 'NOT', 'ORDER', 'BY']
-        query_upper = query.upper()
-        
-        for keyword in keywords:
-            if keyword.lower() in query.lower() and keyword not in query_upper:
-                warnings.append(f"Recomendación: usar '{keyword}' en mayúsculas")
-                break  # Solo un warning general
-        
-        # Verificar longitud excesiva
-        if len(query) > 500:
-            warnings.append("Query muy larga, considere dividirla")
-        
+        _, warnings = self.engine.run(query, severities=(WARNING,), tokens=self.parser.tokenize(query))
         return warnings
     
-    def validate_batch(self, queries: List[str]) -> List[Tuple[str, bool, List[str]]]:
+    def add_rule(self, rule: Rule):
+        """
+        Registra una regla de validación propia.
+        
+        Args:
+            rule (Rule): Regla; se ejecuta en el mismo recorrido que el resto
+            
+        Raises:
+            ValueError: Si ya hay una regla con el mismo nombre
+        """
+        self.engine.add_rule(rule)
+        # Los trabajadores del modo paralelo tienen las reglas anteriores
+        self.close()
+    
+    def remove_rule(self, name: str) -> bool:
+        #Elimina una regla por nombre; retorna si existía
+        removed = self.engine.remove_rule(name)
+        if removed:
+            self.close()
+        return removed
+    
+    def validate_batch(self, queries: List[str], workers: Optional[int] = None,
+                       chunk_size: Optional[int] = None) -> List[Tuple[str, bool, List[str]]]:
         """
         Valida múltiples consultas.
         
         Args:
             queries (List[str]): Lista de consultas
+            workers (int): Procesos a usar; None o 1 valida en este proceso
+            chunk_size (int): Consultas por bloque enviado a cada proceso
             
         Returns:
-            List[Tuple[str, bool, List[str]]]: Lista de (query, es_válida, errores)
+            List[Tuple[str, bool, List[str]]]: Lista de (query, es_válida, errores),
+                en el orden de entrada
         """
+        if workers is not None and workers > 1:
+            if self._batch_runner is None or self._batch_runner.workers != workers:
+                from .batch import ParallelBatchRunner
+                self.close()
+                # Las reglas viajan serializadas a los trabajadores
+                options = {'rules': self.engine.rules, 'backend': self.parser.backend}
+                self._batch_runner = ParallelBatchRunner(workers, 'validator', options)
+            outcomes = self._batch_runner.validate(queries, chunk_size)
+            return [(query, is_valid, messages) for query, (is_valid, messages) in zip(queries, outcomes)]
+
         results = []
         for query in queries:
             is_valid, messages, _ = self.validate_query(query)
             results.append((query, is_valid, messages))
         return results
     
+    def close(self):
+        #Detiene el pool de procesos del modo paralelo, si existe
+        if self._batch_runner is not None:
+            self._batch_runner.close()
+            self._batch_runner = None
+
     def check_ambiguity(self, query: str) -> Tuple[bool, int]:
         """
         Verifica si una consulta es ambigua.
@@ -121,10 +159,30 @@ class SQLValidator:
         Returns:
             Tuple[bool, int]: (es_ambigua, número_de_derivaciones)
         """
-        ambiguous_parser = SQLParser(ambiguous=True, detect_ambiguity=True)
-        tree = ambiguous_parser.parse(query)
+        tree = self._get_ambiguous_parser().parse(query)
         
         if not tree:
             return False, 0
         
-        return tree.is_ambiguous, tree.get_derivation_count()
\ No newline at end of file
+        return tree.is_ambiguous, tree.get_derivation_count()
+
+    def get_ambiguous_spans(self, query: str) -> List[AmbiguousSpan]:
+        """
+        Localiza los tramos ambiguos de una consulta.
+
+        Args:
+            query (str): Consulta SQL
+
+        Returns:
+            List[AmbiguousSpan]: Tramos con más de una derivación (vacía si la
+                consulta no es ambigua o no es válida)
+        """
+        tree = self._get_ambiguous_parser().parse(query)
+        return tree.get_ambiguous_spans() if tree else []
+
+    def _get_ambiguous_parser(self) -> SQLParser:
+        # El parser ambiguo se crea una sola vez; la gramática compilada
+        # se comparte a través del registro global
+        if self._ambiguous_parser is None:
+            self._ambiguous_parser = SQLParser(ambiguous=True, detect_ambiguity=True)
+        return self._ambiguous_parser
\ No newline at end of file
@@ -0,0 +1,42 @@
+"""
+Servicio local de parsing: servidor con micro-lotes y cliente
+
+El cliente no necesita el parser: el servidor (y con él Lark y asyncio) solo
+se importa al usar ParseServer.
+"""
+
+from typing import TYPE_CHECKING
+import importlib
+
+from .protocol import OPERATIONS, ServiceError
+
+# Nombre exportado -> submódulo que lo define
+_LAZY_EXPORTS = {
+    'ParseServer': '.server',
+    'ParseClient': '.client',
+}
+
+__all__ = [
+    'OPERATIONS',
+    'ServiceError',
+    'ParseServer',
+    'ParseClient',
+]
+
+
+def __getattr__(name: str):
+    module = _LAZY_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:
+    from .server import ParseServer
+    from .client import ParseClient
@@ -0,0 +1,219 @@
+# Cliente del servicio local de parsing
+#
+# Mantiene un pool de conexiones reutilizables (cada una la usa un solo hilo a
+# la vez) y permite enviar muchas consultas por una misma conexión sin
+# esperar cada respuesta (pipelining). Las respuestas se emparejan por id.
+
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import socket
+import threading
+
+from .protocol import ServiceError, encode_request
+
+
+class _Connection:
+    #Conexión con el servidor y su lector de líneas
+
+    __slots__ = ('sock', 'reader', 'next_id')
+
+    def __init__(self, address, timeout: Optional[float]):
+        if isinstance(address, str):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(address)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+        self.reader = sock.makefile('rb')
+        self.next_id = 0
+
+    def read_response(self) -> Dict[str, Any]:
+        line = self.reader.readline()
+        if not line:
+            raise ServiceError("El servidor cerró la conexión")
+        return json.loads(line)
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+
+class ParseClient:
+    #Cliente con pool de conexiones y pipelining
+
+    def __init__(self, socket_path: Optional[str] = None, host: str = '127.0.0.1', port: int = 8765,
+                 pool_size: int = 4, timeout: Optional[float] = 30.0, window: int = 256):
+        """
+        Args:
+            socket_path (str): Socket Unix del servidor; si es None, TCP en host:port
+            host (str): Dirección TCP del servidor
+            port (int): Puerto TCP del servidor
+            pool_size (int): Conexiones abiertas como máximo
+            timeout (float): Segundos máximos de espera de cada operación de socket
+            window (int): Peticiones enviadas sin respuesta como máximo por conexión
+        """
+        if pool_size < 1:
+            raise ValueError("pool_size debe ser mayor que cero")
+        self.address = socket_path if socket_path is not None else (host, port)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.window = max(1, window)
+        self._condition = threading.Condition()
+        self._idle: List[_Connection] = []
+        self._open = 0
+        self._closed = False
+
+    def _acquire(self) -> _Connection:
+        #Toma una conexión libre, abre una nueva o espera a que se libere una
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise ServiceError("El cliente está cerrado")
+                if self._idle:
+                    return self._idle.pop()
+                if self._open < self.pool_size:
+                    self._open += 1
+                    break
+                self._condition.wait()
+        try:
+            return _Connection(self.address, self.timeout)
+        except OSError as e:
+            self._discard(None)
+            raise ServiceError(f"No se pudo conectar con {self.address}: {e}")
+
+    def _release(self, connection: _Connection):
+        with self._condition:
+            if self._closed:
+                self._open -= 1
+                connection.close()
+            else:
+                self._idle.append(connection)
+            self._condition.notify()
+
+    def _discard(self, connection: Optional[_Connection]):
+        #Cierra una conexión que quedó en un estado desconocido
+        if connection is not None:
+            try:
+                connection.close()
+            except OSError:
+                pass
+        with self._condition:
+            self._open -= 1
+            self._condition.notify()
+
+    def request_many(self, op: str, queries: List[str]) -> List[Any]:
+        """
+        Envía varias peticiones por una conexión sin esperar cada respuesta.
+
+        Como mucho hay window peticiones sin responder; cada respuesta
+        recibida deja enviar la siguiente.
+
+        Args:
+            op (str): Operación (ver protocol.OPERATIONS)
+            queries (List[str]): Consultas
+
+        Returns:
+            List[Any]: Resultado de cada consulta, en el orden de entrada
+
+        Raises:
+            ServiceError: Si el servidor responde con un error o falla la conexión
+        """
+        results: List[Any] = [None] * len(queries)
+        if not queries:
+            return results
+
+        connection = self._acquire()
+        try:
+            base = connection.next_id
+            connection.next_id += len(queries)
+            sent = 0
+            received = 0
+            error = None
+            while received < len(queries):
+                # Rellenar la ventana en una sola escritura
+                limit = min(len(queries), received + self.window)
+                if sent < limit:
+                    connection.sock.sendall(b''.join(encode_request(base + i, op, queries[i])
+                                                     for i in range(sent, limit)))
+                    sent = limit
+                response = connection.read_response()
+                received += 1
+                index = response.get("id")
+                if not isinstance(index, int) or not base <= index < base + len(queries):
+                    raise ServiceError(f"Respuesta inesperada: {response}")
+                if response.get("ok"):
+                    results[index - base] = response.get("result")
+                elif error is None:
+                    # Se siguen leyendo las respuestas pendientes para dejar la conexión limpia
+                    error = ServiceError(response.get("error", "Error desconocido"), index)
+        except (OSError, ValueError, ServiceError) as e:
+            self._discard(connection)
+            if isinstance(e, ServiceError):
+                raise
+            raise ServiceError(f"Error de comunicación con el servidor: {e}")
+        self._release(connection)
+        if error is not None:
+            raise error
+        return results
+
+    def request(self, op: str, query: str) -> Any:
+        #Envía una petición y espera su resultado
+        return self.request_many(op, [query])[0]
+
+    def parse(self, query: str) -> Optional[dict]:
+        #Árbol de la consulta (formato de ParseTree.to_dict), o None si no es válida
+        return self.request('parse', query)
+
+    def validate_query(self, query: str) -> Tuple[bool, List[str]]:
+        #(es_válida, mensajes) como SQLValidator.validate_query (sin el árbol)
+        result = self.request('validate', query)
+        return result["valid"], result["messages"]
+
+    def validate_syntax(self, query: str) -> Tuple[bool, str]:
+        #(es_válida, mensaje) como SQLParser.validate_syntax
+        result = self.request('syntax', query)
+        return result["valid"], result["message"]
+
+    def check_ambiguity(self, query: str) -> Tuple[bool, int]:
+        #(es_ambigua, número_de_derivaciones) como SQLValidator.check_ambiguity
+        result = self.request('ambiguity', query)
+        return result["ambiguous"], result["derivations"]
+
+    def get_ambiguous_spans(self, query: str) -> List[dict]:
+        #Tramos ambiguos (AmbiguousSpan.to_dict)
+        return self.request('ambiguity', query)["spans"]
+
+    def fingerprint(self, query: str) -> Optional[dict]:
+        #Huella de la consulta: {"fingerprint", "template", "params"}, o None
+        return self.request('fingerprint', query)
+
+    def parse_multiple(self, queries: List[str]) -> List[Tuple[str, Optional[dict]]]:
+        #Parsea varias consultas con pipelining; (query, árbol) en el orden de entrada
+        return list(zip(queries, self.request_many('parse', queries)))
+
+    def validate_batch(self, queries: List[str]) -> List[Tuple[str, bool, List[str]]]:
+        #Valida varias consultas con pipelining; (query, es_válida, mensajes)
+        return [(query, result["valid"], result["messages"])
+                for query, result in zip(queries, self.request_many('validate', queries))]
+
+    def close(self):
+        #Cierra las conexiones libres; las prestadas se cierran al devolverse
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._condition.notify_all()
+        for connection in idle:
+            connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,76 @@
+# Protocolo del servicio local de parsing
+#
+# JSON delimitado por saltos de línea (NDJSON) sobre un socket Unix o TCP en
+# localhost. Cada petición lleva un id elegido por el cliente y la respuesta
+# lo repite, así que un cliente puede enviar varias peticiones seguidas por la
+# misma conexión (pipelining) y emparejar las respuestas aunque lleguen en
+# otro orden:
+#
+#   -> {"id": 1, "op": "parse", "query": "SELECT a FROM t"}
+#   <- {"id": 1, "ok": true, "result": {...}}
+#   <- {"id": 2, "ok": false, "error": "Operación desconocida: 'x'"}
+
+from typing import Optional, Tuple
+import json
+
+# Operaciones: nombre -> descripción del resultado
+OPERATIONS = {
+    'parse': 'árbol (ParseTree.to_dict) o null si la consulta no es válida',
+    'validate': '{"valid", "messages"} de SQLValidator.validate_query',
+    'syntax': '{"valid", "message"} de SQLParser.validate_syntax',
+    'ambiguity': '{"ambiguous", "derivations", "spans"} con la gramática ambigua',
+    'fingerprint': '{"fingerprint", "template", "params"} o null',
+}
+
+# Longitud máxima de una línea del protocolo (peticiones y respuestas)
+MAX_LINE = 16 * 1024 * 1024
+
+
+class ServiceError(Exception):
+    #Error devuelto por el servicio o fallo del protocolo
+
+    def __init__(self, message: str, request_id=None):
+        super().__init__(message)
+        self.request_id = request_id
+
+
+def encode_request(request_id: int, op: str, query: str) -> bytes:
+    #Serializa una petición como una línea NDJSON
+    return (json.dumps({"id": request_id, "op": op, "query": query}, ensure_ascii=False) + "\n").encode('utf-8')
+
+
+def decode_request(line: bytes) -> Tuple[Optional[object], str, str]:
+    """
+    Deserializa y valida una petición.
+
+    Returns:
+        Tuple: (id, operación, consulta)
+
+    Raises:
+        ServiceError: Si la línea no es una petición válida (con el id de
+            la petición si se pudo leer)
+    """
+    try:
+        request = json.loads(line)
+    except ValueError as e:
+        raise ServiceError(f"JSON inválido: {e}")
+    if not isinstance(request, dict):
+        raise ServiceError("La petición debe ser un objeto JSON")
+    op = request.get("op")
+    query = request.get("query")
+    if op not in OPERATIONS:
+        raise ServiceError(f"Operación desconocida: {op!r}", request.get("id"))
+    if not isinstance(query, str):
+        raise ServiceError("El campo 'query' debe ser una cadena", request.get("id"))
+    return request.get("id"), op, query
+
+
+def encode_result(request_id, result_json: str) -> bytes:
+    #Respuesta correcta; el resultado llega ya serializado desde el trabajador
+    return b''.join((b'{"id": ', json.dumps(request_id).encode('utf-8'), b', "ok": true, "result": ',
+                     result_json.encode('utf-8'), b'}\n'))
+
+
+def encode_error(request_id, message: str) -> bytes:
+    #Respuesta de error
+    return (json.dumps({"id": request_id, "ok": False, "error": message}, ensure_ascii=False) + "\n").encode('utf-8')
@@ -0,0 +1,257 @@
+# Servidor local de parsing con micro-lotes
+#
+# Las peticiones de todas las conexiones entran en una cola común. Un
+# despachador toma lo que haya en la cola (hasta max_batch peticiones,
+# esperando como mucho max_delay a que lleguen más) y envía el lote a un
+# trabajador caliente. Con carga baja cada petición sale casi sola; con carga
+# alta los lotes crecen y el coste de comunicación con los procesos se reparte.
+#
+# La cola está acotada: si se llena, el servidor deja de leer de las
+# conexiones y los clientes notan la presión a través del propio socket.
+#
+# Uso:
+#     python -m src.service.server --socket /tmp/sql-parser.sock
+#     python -m src.service.server --port 8765 --workers 4
+
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional, Tuple
+import argparse
+import asyncio
+import logging
+import os
+
+from .protocol import MAX_LINE, ServiceError, decode_request, encode_error, encode_result
+from . import worker
+
+logger = logging.getLogger(__name__)
+
+
+class ParseServer:
+    #Servidor NDJSON sobre socket Unix o TCP local con trabajadores calientes
+
+    def __init__(self, socket_path: Optional[str] = None, host: str = '127.0.0.1', port: int = 0,
+                 workers: Optional[int] = None, executor: str = 'process', max_batch: int = 64,
+                 max_delay: float = 0.002, max_queue: int = 4096, parser_options: Optional[dict] = None):
+        """
+        Inicializa el servidor (no empieza a escuchar hasta start()).
+
+        Args:
+            socket_path (str): Socket Unix donde escuchar; si es None, TCP en host:port
+            host (str): Dirección TCP (solo localhost tiene sentido: no hay autenticación)
+            port (int): Puerto TCP (0 = uno libre; ver address tras start())
+            workers (int): Trabajadores (por defecto, uno por CPU)
+            executor (str): 'process' o 'thread'
+            max_batch (int): Peticiones máximas por lote
+            max_delay (float): Segundos máximos que se espera a completar un lote
+            max_queue (int): Peticiones pendientes máximas antes de dejar de leer
+            parser_options (dict): Argumentos de SQLParser en los trabajadores
+        """
+        if executor not in ('process', 'thread'):
+            raise ValueError(f"Ejecutor inválido: {executor!r} (opciones: process, thread)")
+        self.socket_path = socket_path
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.executor_kind = executor
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_queue = max_queue
+        self.parser_options = parser_options or {}
+
+        self._executor: Optional[Executor] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._connections: set = set()
+        self._running: set = set()
+
+        # Métricas
+        self.requests = 0
+        self.batches = 0
+
+    @property
+    def address(self):
+        #Ruta del socket Unix o (host, puerto) en el que escucha
+        if self.socket_path is not None:
+            return self.socket_path
+        if self._server is not None and self._server.sockets:
+            return self._server.sockets[0].getsockname()[:2]
+        return self.host, self.port
+
+    async def start(self):
+        #Arranca los trabajadores (calientes) y empieza a escuchar
+        if self.executor_kind == 'process':
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=worker.init_worker,
+                                                 initargs=(self.parser_options,))
+        else:
+            worker.init_worker(self.parser_options)
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='sql-service')
+
+        loop = asyncio.get_running_loop()
+        # Forzar el arranque de todos los trabajadores antes de aceptar conexiones
+        await asyncio.gather(*(loop.run_in_executor(self._executor, worker.run_batch, [])
+                               for _ in range(self.workers)))
+
+        self._queue = asyncio.Queue(self.max_queue)
+        # Un lote en curso por trabajador y otro preparado detrás
+        self._slots = asyncio.Semaphore(self.workers * 2)
+        self._dispatcher = asyncio.create_task(self._dispatch_loop())
+
+        if self.socket_path is not None:
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            self._server = await asyncio.start_unix_server(self._handle_connection, self.socket_path, limit=MAX_LINE)
+        else:
+            self._server = await asyncio.start_server(self._handle_connection, self.host, self.port, limit=MAX_LINE)
+        logger.info("Servicio de parsing escuchando en %s (%d trabajadores, %s)", self.address, self.workers, self.executor_kind)
+
+    async def serve_forever(self):
+        #Arranca (si hace falta) y atiende peticiones hasta que se cancele
+        if self._server is None:
+            await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self):
+        #Deja de escuchar, cierra las conexiones y detiene los trabajadores
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        for writer in list(self._connections):
+            writer.close()
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.get_running_loop().run_in_executor(None, lambda: executor.shutdown(cancel_futures=True))
+        if self.socket_path is not None and os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        #Lee peticiones de una conexión; las respuestas se escriben según terminan
+        self._connections.add(writer)
+        pending: set = set()
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError):
+                    writer.write(encode_error(None, "Petición demasiado larga"))
+                    break
+                except ConnectionError:
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+
+                try:
+                    request_id, op, query = decode_request(line)
+                except ServiceError as e:
+                    writer.write(encode_error(e.request_id, str(e)))
+                    continue
+
+                future = loop.create_future()
+                # Si la cola está llena se espera aquí: deja de leerse del socket
+                await self._queue.put((op, query, future))
+                self.requests += 1
+                task = asyncio.create_task(self._respond(writer, request_id, future))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        finally:
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            self._connections.discard(writer)
+            writer.close()
+
+    async def _respond(self, writer: asyncio.StreamWriter, request_id, future: asyncio.Future):
+        try:
+            ok, payload = await future
+        except Exception as e:
+            ok, payload = False, f"Error: {type(e).__name__}: {e}"
+        if writer.is_closing():
+            return
+        writer.write(encode_result(request_id, payload) if ok else encode_error(request_id, payload))
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def _dispatch_loop(self):
+        #Forma lotes con las peticiones de la cola y los envía a los trabajadores
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            self._drain_into(batch)
+            if len(batch) < self.max_batch and self.max_delay > 0:
+                # Esperar un poco a que lleguen más peticiones concurrentes
+                await asyncio.sleep(self.max_delay)
+                self._drain_into(batch)
+            await self._slots.acquire()
+            task = asyncio.create_task(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    def _drain_into(self, batch: list):
+        queue = self._queue
+        while len(batch) < self.max_batch and not queue.empty():
+            batch.append(queue.get_nowait())
+
+    async def _run(self, batch: List[Tuple[str, str, asyncio.Future]]):
+        #Procesa un lote en un trabajador y resuelve las peticiones
+        try:
+            self.batches += 1
+            requests = [(op, query) for op, query, _ in batch]
+            try:
+                results = await asyncio.get_running_loop().run_in_executor(self._executor, worker.run_batch, requests)
+            except Exception as e:
+                logger.error("Error en un trabajador: %s: %s", type(e).__name__, e)
+                results = [(False, f"Error: {type(e).__name__}: {e}")] * len(batch)
+            for (_, _, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._slots.release()
+
+    def get_stats(self) -> dict:
+        #Peticiones atendidas, lotes enviados y tamaño medio de lote
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "average_batch": self.requests / self.batches if self.batches else 0.0,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "connections": len(self._connections),
+        }
+
+
+def main(argv: Optional[List[str]] = None):
+    arg_parser = argparse.ArgumentParser(description="Servicio local de parsing SQL (NDJSON)")
+    arg_parser.add_argument("--socket", help="Ruta del socket Unix")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8765)
+    arg_parser.add_argument("--workers", type=int, default=None)
+    arg_parser.add_argument("--executor", choices=("process", "thread"), default="process")
+    arg_parser.add_argument("--max-batch", type=int, default=64)
+    arg_parser.add_argument("--max-delay", type=float, default=0.002)
+    args = arg_parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    server = ParseServer(args.socket, args.host, args.port, args.workers, args.executor,
+                         args.max_batch, args.max_delay)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# Trabajadores del servicio de parsing
+#
+# Cada trabajador (proceso o hilo) mantiene un SQLParser y un SQLValidator
+# calientes y procesa lotes de peticiones. Los resultados se devuelven ya
+# serializados a JSON para que el bucle de eventos del servidor no tenga que
+# recorrer los árboles.
+
+from typing import Dict, List, Tuple
+import logging
+
+from ..parser.parse_tree import dumps_json
+from ..parser.sql_parser import SQLParser
+from ..parser.validator import SQLValidator
+
+logger = logging.getLogger(__name__)
+
+# Estado propio de cada trabajador
+_state: dict = {}
+
+
+def init_worker(options: dict):
+    #Construye el parser y el validador del trabajador y los calienta
+    _state['parser'] = SQLParser(**options)
+    _state['validator'] = SQLValidator()
+    warmup = "SELECT a FROM t WHERE a = 1 AND b = 2"
+    _state['parser'].parse(warmup)
+    _state['parser'].validate_syntax(warmup)
+    _state['validator'].validate_query(warmup)
+
+
+def _get_state() -> dict:
+    # Con hilos el estado es el del proceso servidor: se crea al primer uso
+    if not _state:
+        init_worker({})
+    return _state
+
+
+def run_batch(requests: List[Tuple[str, str]]) -> List[Tuple[bool, str]]:
+    """
+    Procesa un lote de peticiones.
+
+    Las consultas se agrupan por operación para usar parse_multiple y
+    validate_batch con el lote entero.
+
+    Args:
+        requests (List[Tuple[str, str]]): (operación, consulta) de cada petición
+
+    Returns:
+        List[Tuple[bool, str]]: (ok, resultado en JSON o mensaje de error),
+            en el orden de entrada
+    """
+    state = _get_state()
+    parser: SQLParser = state['parser']
+    validator: SQLValidator = state['validator']
+
+    by_op: Dict[str, List[int]] = {}
+    for i, (op, _) in enumerate(requests):
+        by_op.setdefault(op, []).append(i)
+
+    results: List[Tuple[bool, str]] = [(False, "Sin procesar")] * len(requests)
+    for op, indexes in by_op.items():
+        queries = [requests[i][1] for i in indexes]
+        try:
+            if op == 'parse':
+                values = [tree.to_dict() if tree is not None else None
+                          for _, tree in parser.parse_multiple(queries)]
+            elif op == 'validate':
+                values = [{"valid": is_valid, "messages": messages}
+                          for _, is_valid, messages in validator.validate_batch(queries)]
+            elif op == 'syntax':
+                values = [dict(zip(("valid", "message"), parser.validate_syntax(query))) for query in queries]
+            elif op == 'ambiguity':
+                values = [_ambiguity(validator, query) for query in queries]
+            else:
+                values = [_fingerprint(parser, query) for query in queries]
+        except Exception as e:
+            logger.error("Error procesando un lote de '%s': %s: %s", op, type(e).__name__, e)
+            for i in indexes:
+                results[i] = (False, f"Error: {type(e).__name__}: {e}")
+            continue
+
+        for i, value in zip(indexes, values):
+            results[i] = (True, dumps_json(value, indent=None))
+    return results
+
+
+def _ambiguity(validator: SQLValidator, query: str) -> dict:
+    tree = validator._get_ambiguous_parser().parse(query)
+    if tree is None:
+        return {"ambiguous": False, "derivations": 0, "spans": []}
+    return {
+        "ambiguous": tree.is_ambiguous,
+        "derivations": tree.get_derivation_count(),
+        "spans": [span.to_dict() for span in tree.get_ambiguous_spans()],
+    }
+
+
+def _fingerprint(parser: SQLParser, query: str):
+    fp = parser.fingerprint(query)
+    if fp is None:
+        return None
+    return {"fingerprint": fp.fingerprint, "template": fp.template, "params": fp.params}
@@ -44,4 +44,847 @@ ambiguous_query = "SELECT * FROM users WHERE a = 1 AND b = 2 OR c = 3"
 is_ambiguous, count = validator.check_ambiguity(ambiguous_query)
 print(f"\nQuery: {ambiguous_query}")
 print(f"¿Es ambigua?: {is_ambiguous}")
-print(f"Derivaciones: {count}")
\ No newline at end of file
+print(f"Derivaciones: {count}")
+# Test 4: LALR vs Earley
+print("\n" + "="*70)
+print("TEST LALR vs EARLEY")
+print("="*70)
+
+from src.grammar.grammar_examples import COMPLEX_QUERIES
+
+lalr_parser = SQLParser(mode="auto")
+earley_parser = SQLParser(mode="earley")
+print(f"\nAlgoritmo en modo auto: {lalr_parser.get_algorithm()}")
+
+for query in VALID_QUERIES + COMPLEX_QUERIES:
+    lalr_tree = lalr_parser.parse(query)
+    earley_tree = earley_parser.parse(query)
+    same = lalr_tree.lark_tree == earley_tree.lark_tree
+    status = "✅" if same else "❌"
+    print(f"{status} {query}")
+    assert same, "LALR y Earley deben producir el mismo árbol"
+
+# La gramática ambigua tiene conflictos LALR(1) que Lark resolvería en silencio
+try:
+    SQLParser(ambiguous=True, mode="lalr")
+    raise AssertionError("La gramática ambigua no admite LALR")
+except ValueError:
+    pass
+
+# Test 5: Registro de parsers compilados
+print("\n" + "="*70)
+print("TEST DEL REGISTRO DE PARSERS")
+print("="*70)
+
+from src.grammar import get_registry
+
+registry = get_registry()
+entries_before = len(registry)
+for _ in range(5):
+    SQLParser()
+validator.check_ambiguity(ambiguous_query)
+validator.check_ambiguity(ambiguous_query)
+stats = registry.get_stats()
+print(f"\nEntradas: {stats['entries']}  Aciertos: {stats['hits']}  Fallos: {stats['misses']}")
+print(f"Tiempo de compilación: {stats['compile_time'] * 1000:.1f} ms")
+assert len(registry) == entries_before, "Los parsers deben reutilizarse desde el registro"
+
+import os
+import shutil
+import tempfile
+from src.grammar import GrammarCache, grammar_cache
+
+# La caché en disco solo poda gramáticas obsoletas de su propio entorno
+cache_root = tempfile.mkdtemp(prefix="grammar_cache_")
+current_lark = grammar_cache.LARK_VERSION
+grammar_cache.LARK_VERSION = "0.0.0"  # Proceso con otra versión de Lark
+try:
+    other_environment = GrammarCache(cache_root).cache_dir
+    os.makedirs(other_environment)
+finally:
+    grammar_cache.LARK_VERSION = current_lark
+disk_cache = GrammarCache(cache_root)
+stale_namespace = os.path.join(disk_cache.base_dir, "0" * 16)
+os.makedirs(stale_namespace)
+os.makedirs(disk_cache.cache_dir)
+reopened_cache = GrammarCache(cache_root)
+assert os.path.isdir(other_environment) and os.path.isdir(reopened_cache.cache_dir)
+assert not os.path.exists(stale_namespace)
+reopened_cache.clear()
+assert os.path.isdir(other_environment)
+shutil.rmtree(cache_root, ignore_errors=True)
+
+# Test 6: Caché de resultados
+print("\n" + "="*70)
+print("TEST DE LA CACHÉ DE RESULTADOS")
+print("="*70)
+
+cached_parser = SQLParser(cache_size=2)
+first = cached_parser.parse("SELECT name FROM users WHERE age > 18")
+second = cached_parser.parse("SELECT  name\nFROM users   WHERE age > 18")
+# Modificar el árbol devuelto no afecta a la caché
+mutated = second.lark_tree
+mutated.children.clear()
+second.extract_columns().clear()
+assert not mutated.children and second.lark_tree.children
+third = cached_parser.parse("SELECT name FROM users WHERE age > 18")
+cached_parser.parse("SELECT id FROM orders")
+cached_parser.parse("SELECT id FROM products")
+stats = cached_parser.get_cache_stats()
+print(f"\nAciertos: {stats['hits']}  Fallos: {stats['misses']}  Expulsiones: {stats['evictions']}")
+assert third.extract_columns() == first.extract_columns() == second.extract_columns() == ['name']
+assert third.lark_tree == first.lark_tree and third.lark_tree.children
+assert stats['hits'] == 2 and stats['evictions'] == 1
+cached_parser.clear_cache()
+assert cached_parser.get_cache_stats()['entries'] == 0
+
+# Test 7: Huellas y caché de plantillas
+print("\n" + "="*70)
+print("TEST DE HUELLAS Y PLANTILLAS")
+print("="*70)
+
+template_parser = SQLParser(template_cache_size=10)
+fp_a = template_parser.fingerprint("SELECT * FROM users WHERE age > 18 AND status = 'active'")
+fp_b = template_parser.fingerprint("SELECT * FROM users WHERE age > 21 AND status = 'banned'")
+print(f"\nPlantilla: {fp_a.template}")
+print(f"Huella: {fp_a.fingerprint}  Parámetros: {fp_a.params} / {fp_b.params}")
+assert fp_a.fingerprint == fp_b.fingerprint and fp_b.params == ['21', "'banned'"]
+
+template_parser.parse("SELECT * FROM users WHERE age > 18 AND status = 'active'")
+bound = template_parser.parse("SELECT * FROM users WHERE age > 21 AND status = 'banned'")
+reference = SQLParser().parse("SELECT * FROM users WHERE age > 21 AND status = 'banned'")
+assert bound.lark_tree == reference.lark_tree
+assert template_parser.get_template_cache_stats()['hits'] == 1
+
+# Misma plantilla con literales de otro tipo: no se reutiliza el árbol
+template_parser.parse("SELECT * FROM t WHERE a > 1")
+for mixed in ("SELECT * FROM t WHERE a > 'x'", "SELECT * FROM t WHERE a > 2", "SELECT * FROM t WHERE a > \"y\""):
+    assert template_parser.parse(mixed).lark_tree == SQLParser().parse(mixed).lark_tree, mixed
+
+# Test 8: Lotes en paralelo
+print("\n" + "="*70)
+print("TEST DE LOTES EN PARALELO")
+print("="*70)
+
+from src.grammar.grammar_examples import get_all_examples
+
+batch_queries = get_all_examples()
+sequential = validator.validate_batch(batch_queries)
+parallel = validator.validate_batch(batch_queries, workers=2, chunk_size=3)
+validator.close()
+print(f"\nConsultas: {len(batch_queries)}  Iguales en orden: {sequential == parallel}")
+assert sequential == parallel
+
+parsed = parser.parse_multiple(batch_queries, workers=2)
+parser.close()
+assert [query for query, _ in parsed] == batch_queries
+assert sum(tree is None for _, tree in parsed) == len(INVALID_QUERIES)
+
+# Las derivaciones de un árbol ambiguo parseado en otro proceso se
+# reconstruyen al pedirlas
+ambiguous_batch_parser = SQLParser(ambiguous=True, detect_ambiguity=True)
+ambiguous_query = "SELECT * FROM users WHERE a = 1 AND b = 2 AND c = 3 OR d = 4"
+local_tree = ambiguous_batch_parser.parse(ambiguous_query)
+(_, remote_tree), = ambiguous_batch_parser.parse_multiple([ambiguous_query], workers=2)
+ambiguous_batch_parser.close()
+assert remote_tree.get_derivation_count() == local_tree.get_derivation_count() > 1
+for i in range(local_tree.get_derivation_count()):
+    assert remote_tree.to_dict(i) == local_tree.to_dict(i), i
+assert len(list(remote_tree.copy().iter_derivations())) == local_tree.get_derivation_count()
+
+# Test 9: Lectura en streaming
+print("\n" + "="*70)
+print("TEST DE STREAMING")
+print("="*70)
+
+import io
+
+log_text = "SELECT a FROM t WHERE s = 'x;y';\nSELECT * FROM;\nSELECT b FROM u ORDER BY b"
+streamed = list(parser.iter_parse(io.BytesIO(log_text.encode("utf-8")), chunk_size=4))
+for offset, query, tree in streamed:
+    status = "✅" if tree else "❌"
+    print(f"{status} [{offset}] {query}")
+assert [query for _, query, _ in streamed][0] == "SELECT a FROM t WHERE s = 'x;y'"
+assert [tree is not None for _, _, tree in streamed] == [True, False, True]
+
+resumed = list(parser.iter_parse(io.StringIO(log_text), offset=streamed[2][0]))
+assert [query for _, query, _ in resumed] == ["SELECT b FROM u ORDER BY b"]
+
+# Test 10: Árboles muy profundos
+print("\n" + "="*70)
+print("TEST DE ANIDAMIENTO PROFUNDO")
+print("="*70)
+
+from benchmarks.bench_deep_nesting import nested_and_or
+
+deep_tree = parser.parse(nested_and_or(5000))
+print(f"\nProfundidad: {deep_tree.get_depth()}  Nodos: {deep_tree.get_node_count()}")
+assert deep_tree.get_depth() == 5004
+assert deep_tree.to_dict()["tree"]["name"] == "query"
+assert deep_tree.get_pretty_string().startswith("query\n")
+assert deep_tree.copy().get_node_count() == deep_tree.get_node_count()
+
+# Test 11: Árbol compacto
+print("\n" + "="*70)
+print("TEST DEL ÁRBOL COMPACTO")
+print("="*70)
+
+import pickle
+
+compact_query = "SELECT name, age FROM users WHERE age > 18 ORDER BY name"
+compact_tree = parser.parse(compact_query)
+root = compact_tree.root
+print(f"\nRaíz: {root}  Hijos: {root.children}")
+assert root.name == "query" and root.children[1].children[0].value == "users"
+assert compact_tree.estimate_size() < 2000
+
+restored = pickle.loads(pickle.dumps(compact_tree.to_compact()))
+assert restored.to_lark() == compact_tree.lark_tree
+shared = compact_tree.copy()
+assert shared.to_compact() is compact_tree.to_compact()
+assert shared.extract_order_by() == "name"
+
+# Test 12: Validación de sintaxis sin árbol
+print("\n" + "="*70)
+print("TEST DEL RECONOCEDOR")
+print("="*70)
+
+syntax_queries = VALID_QUERIES + INVALID_QUERIES + COMPLEX_QUERIES + [
+    "SELECT FROM FROM t", "SELECT a FROM t WHERE NOT (a = 1 OR b <= 2) ORDER BY a DESC",
+    "SELECT a FROM t WHERE a = 1 AND", "SELECT a FROM t WHERE a =< 1", "SELECT a FROM t ORDER BY",
+]
+for query in syntax_queries:
+    expected = parser._validate_with_parser(query)
+    assert parser.validate_syntax(query) == expected, query
+    assert earley_parser.validate_syntax(query)[0] == expected[0], query
+print(f"\n{len(syntax_queries)} consultas: reconocedor y parsing completo coinciden")
+
+# Test 13: Conteo de derivaciones sobre el bosque
+print("\n" + "="*70)
+print("TEST DEL BOSQUE DE DERIVACIONES")
+print("="*70)
+
+from math import comb
+
+def catalan(n):
+    return comb(2 * n, n) // (n + 1)
+
+for predicates in (2, 3, 5, 25):
+    chain = "SELECT * FROM t WHERE " + " AND ".join(f"c{i} = {i}" for i in range(predicates))
+    chain_ambiguous, chain_count = validator.check_ambiguity(chain)
+    print(f"\n{predicates} predicados: {chain_count} derivaciones")
+    assert chain_count == catalan(predicates - 1)
+    assert chain_ambiguous == (predicates > 2)
+
+# Ambigüedad anidada: se cuentan todas las combinaciones, no solo las del primer nivel
+nested = "SELECT * FROM t WHERE a = 1 AND b = 2 OR c = 3 AND NOT d = 4"
+assert validator.check_ambiguity(nested)[1] == 5
+spans = validator.get_ambiguous_spans(nested)
+print(f"Tramos ambiguos: {spans}")
+assert spans[0].text == "a = 1 AND b = 2 OR c = 3 AND NOT d = 4" and spans[0].derivations == 5
+assert validator.get_ambiguous_spans("SELECT a FROM t WHERE a = 1") == []
+
+# Test 14: Derivaciones perezosas
+print("\n" + "="*70)
+print("TEST DE DERIVACIONES PEREZOSAS")
+print("="*70)
+
+ambiguous_parser = SQLParser(ambiguous=True, detect_ambiguity=True)
+long_chain = "SELECT * FROM t WHERE " + " AND ".join(f"c{i} = {i}" for i in range(25))
+long_tree = ambiguous_parser.parse(long_chain)
+last = long_tree.get_derivation_count() - 1
+print(f"\nDerivación {last}: profundidad {long_tree.get_depth(last)}")
+assert long_tree.get_depth(0) == long_tree.get_depth(last) == 28
+assert long_tree.to_dict(last)["tree"]["name"] == "query"
+assert "fuera de rango" in long_tree.get_pretty_string(last + 1)
+
+window = [d.get_pretty_string() for d in long_tree.iter_derivations(limit=3, offset=1000)]
+assert window == [long_tree.get_pretty_string(i) for i in range(1000, 1003)]
+assert len(set(window)) == 3
+
+small = ambiguous_parser.parse("SELECT * FROM t WHERE a = 1 AND b = 2 AND c = 3 AND d = 4")
+assert len({d.get_pretty_string() for d in small.iter_derivations()}) == small.get_derivation_count() == 5
+
+# Test 15: Motor de reglas del validador
+print("\n" + "="*70)
+print("TEST DEL MOTOR DE REGLAS")
+print("="*70)
+
+from src.parser.rules import Rule, WARNING
+
+is_valid, messages, _ = validator.validate_query("SELECT a, b, a, c, b FROM t")
+print(f"\nDuplicados: {messages}")
+assert not is_valid and messages == ["Columnas duplicadas en SELECT: a, b"]
+assert validator.validate_query("SELECT a FROM t WHERE a = 1 " + "AND a = 1 " * 60)[1] == ["Query muy larga, considere dividirla"]
+
+class NoOrderByRule(Rule):
+    name = 'no-order-by'
+    severity = WARNING
+    node_types = ('order_clause',)
+
+    def visit_node(self, ctx, node, report):
+        report("ORDER BY no permitido")
+
+rules_validator = SQLValidator()
+rules_validator.add_rule(NoOrderByRule())
+assert rules_validator.validate_query("SELECT a FROM t ORDER BY a")[:2] == (True, ["ORDER BY no permitido"])
+assert rules_validator.validate_query("SELECT a FROM t")[1] == []
+assert rules_validator.remove_rule('no-order-by')
+assert rules_validator.validate_query("SELECT a FROM t ORDER BY a")[1] == []
+
+# Quitar una regla no vuelve a ejecutar el constructor (subclases con otros argumentos)
+from src.parser.rules import QueryLengthRule, RuleEngine
+
+class NamedEngine(RuleEngine):
+    def __init__(self, label, rules):
+        super().__init__(rules)
+        self.label = label
+
+named_engine = NamedEngine("estilo", [NoOrderByRule(), QueryLengthRule()])
+assert named_engine.remove_rule('no-order-by') and not named_engine.remove_rule('no-order-by')
+assert named_engine.label == "estilo" and [rule.name for rule in named_engine.rules] == ['query-length']
+assert named_engine.run("SELECT a FROM t ORDER BY a", rules_validator.parser.parse("SELECT a FROM t ORDER BY a")) == ([], [])
+
+# Test 16: Reglas de estilo sobre la secuencia de tokens
+print("\n" + "="*70)
+print("TEST DE ESTILO SOBRE TOKENS")
+print("="*70)
+
+style_query = "SELECT orders, brand FROM t WHERE brand = 'and or by' ORDER BY orders"
+style_tokens = validator.parser.tokenize(style_query)
+print(f"\nTokens: {len(style_tokens)}")
+assert validator.parser.parse(style_query, style_tokens).get_pretty_string() == validator.parser.parse(style_query).get_pretty_string()
+# Identificadores y literales que contienen palabras clave no generan avisos
+assert validator.validate_query(style_query)[:2] == (True, [])
+# Un identificador que coincide con una palabra clave (sin distinguir
+# mayúsculas) genera un único aviso, con o sin la secuencia de tokens
+assert validator.validate_query("SELECT desc, asc FROM t ORDER BY desc")[:2] == (True, [
+    "Recomendación: el identificador 'desc' coincide con la palabra clave DESC"])
+keyword_queries = {
+    "SELECT FROM FROM t": 'FROM',
+    "SELECT a FROM t ORDER BY ORDER": 'ORDER',
+    "SELECT a FROM t WHERE ORDER = 1": 'ORDER',
+    "SELECT a FROM Order": 'Order',
+}
+for keyword_validator in (validator, SQLValidator(backend='native')):
+    for keyword_query, identifier in keyword_queries.items():
+        expected = [f"Recomendación: el identificador '{identifier}' coincide con la palabra clave {identifier.upper()}"]
+        keyword_tree = keyword_validator.parser.parse(keyword_query)
+        keyword_tokens = keyword_validator.parser.tokenize(keyword_query)
+        assert keyword_validator.validate_query(keyword_query)[1] == expected, keyword_query
+        assert keyword_validator.engine.run(keyword_query, keyword_tree)[1] == expected, keyword_query
+        assert keyword_validator.engine.run(keyword_query, keyword_tree, tokens=keyword_tokens)[1] == expected, keyword_query
+# Una palabra clave usada como identificador se sigue aceptando
+assert validator.parser.parse("SELECT FROM FROM t", validator.parser.tokenize("SELECT FROM FROM t")).extract_columns() == ["FROM"]
+assert validator.parser.tokenize("SELECT a FROM t WHERE a = @") is None
+
+# Test 17: Fachada asyncio
+print("\n" + "="*70)
+print("TEST DE LA FACHADA ASYNCIO")
+print("="*70)
+
+import asyncio
+import time
+from src.parser import AsyncSQLParser, AsyncSQLValidator
+
+heavy_query = "SELECT a FROM t WHERE " + " AND ".join(f"c{i} = {i}" for i in range(2000))
+
+async def measure_loop_lag(work):
+    #Mayor retraso de un temporizador de 5 ms mientras se espera el trabajo
+    loop = asyncio.get_running_loop()
+    lags = []
+    stop = asyncio.Event()
+
+    async def ticker():
+        while not stop.is_set():
+            started = loop.time()
+            await asyncio.sleep(0.005)
+            lags.append(loop.time() - started - 0.005)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    result = await work()
+    stop.set()
+    await task
+    return result, max(lags)
+
+# Backend del parser del validador construido en el proceso trabajador. Se
+# evalúa con un builtin: una función de este script no se puede enviar a un
+# proceso creado con fork mientras el script se importa (pytest), porque el
+# trabajador se bloquea esperando el lock de importación del módulo
+WORKER_BACKEND = "__import__('src.parser.batch', fromlist=['_'])._worker_state['validator'].parser.backend"
+
+async def async_checks():
+    async with AsyncSQLParser(max_workers=2, max_in_flight=2) as async_parser:
+        async def blocking():
+            # El parser síncrono llamado desde el bucle lo bloquea
+            return [async_parser.parser.parse(heavy_query) for _ in range(3)]
+
+        async def offloaded():
+            return await asyncio.gather(*(async_parser.parse(heavy_query) for _ in range(3)))
+
+        _, blocking_lag = await measure_loop_lag(blocking)
+        # Cota absoluta holgada (30 ticks de 5 ms), con reintentos para no
+        # fallar por ruido de una máquina cargada
+        for _ in range(3):
+            trees, async_lag = await measure_loop_lag(offloaded)
+            if async_lag < 0.15:
+                break
+        print(f"\nRetraso máximo del bucle: síncrono {blocking_lag * 1000:.0f} ms, asíncrono {async_lag * 1000:.0f} ms "
+              f"({blocking_lag / max(async_lag, 1e-6):.1f}x)")
+        assert all(tree is not None for tree in trees)
+        assert async_lag < 0.15
+        assert async_parser.in_flight == 0
+
+        # Cancelación: las llamadas en cola se retiran sin ejecutarse
+        tasks = [asyncio.create_task(async_parser.parse(heavy_query)) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        for task in tasks[1:]:
+            task.cancel()
+        outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+        assert outcomes[0] is not None
+        assert all(isinstance(outcome, asyncio.CancelledError) for outcome in outcomes[1:])
+
+    async with AsyncSQLValidator() as async_validator:
+        is_valid, messages, tree = await async_validator.validate_query("SELECT a, a FROM t")
+        assert not is_valid and tree is not None
+        assert await async_validator.check_ambiguity("SELECT * FROM t WHERE a = 1 AND b = 2 AND c = 3") == (True, 2)
+
+    # Con procesos, los trabajadores usan el backend del validador
+    async with AsyncSQLValidator(SQLValidator(backend='native'), executor='process', max_workers=1) as native_validator:
+        assert await native_validator._submit(eval, WORKER_BACKEND) == 'native'
+        is_valid, messages, tree = await native_validator.validate_query("SELECT a FROM t")
+        assert is_valid and tree.extract_table() == "t"
+
+asyncio.run(async_checks())
+
+# Test 18: Pool de parsers
+print("\n" + "="*70)
+print("TEST DEL POOL DE PARSERS")
+print("="*70)
+
+import threading
+from src.parser import ParserPool
+
+pool = ParserPool(size=2, prewarm=True)
+assert pool.get_stats()["created"] == 2
+
+pool_errors = []
+
+def pool_worker():
+    for query in VALID_QUERIES:
+        with pool.checkout() as pooled_parser:
+            if pooled_parser.parse(query) is None:
+                pool_errors.append(query)
+    if pool.local() is not pool.local():
+        pool_errors.append("local")
+
+pool_threads = [threading.Thread(target=pool_worker) for _ in range(4)]
+for thread in pool_threads:
+    thread.start()
+for thread in pool_threads:
+    thread.join()
+
+pool_stats = pool.get_stats()
+print(f"\nEstadísticas del pool: {pool_stats}")
+assert not pool_errors
+assert pool_stats["created"] == 2 and pool_stats["in_use"] == 0 and pool_stats["max_in_use"] <= 2
+assert pool_stats["checkouts"] == 4 * len(VALID_QUERIES)
+assert pool_stats["thread_local_instances"] == 4
+
+first = pool.acquire()
+second = pool.acquire()
+try:
+    pool.acquire(timeout=0.05)
+    raise AssertionError("El pool debería estar agotado")
+except TimeoutError:
+    pass
+pool.release(first)
+pool.release(second)
+assert pool.get_stats()["timeouts"] == 1
+
+validator_pool = ParserPool(size=1, kind='validator')
+with validator_pool.checkout() as pooled_validator:
+    assert pooled_validator.validate_query("SELECT a FROM t")[0]
+
+# Test 19: Servicio local de parsing
+print("\n" + "="*70)
+print("TEST DEL SERVICIO LOCAL")
+print("="*70)
+
+import os
+import tempfile
+from src.service import ParseClient, ParseServer, ServiceError
+
+service_socket = os.path.join(tempfile.mkdtemp(), "sql-parser.sock")
+service = ParseServer(service_socket, workers=1, executor='thread')
+service_loop = asyncio.new_event_loop()
+service_ready = threading.Event()
+
+def run_service():
+    asyncio.set_event_loop(service_loop)
+    service_loop.run_until_complete(service.start())
+    service_ready.set()
+    service_loop.run_forever()
+
+threading.Thread(target=run_service, daemon=True).start()
+service_ready.wait()
+
+with ParseClient(service_socket, pool_size=2) as service_client:
+    assert service_client.parse("SELECT a FROM t")["tree"]["name"] == "query"
+    assert service_client.parse("SELECT FROM") is None
+    assert service_client.validate_query("SELECT a, a FROM t") == (False, ["Columnas duplicadas en SELECT: a"])
+    assert service_client.check_ambiguity("SELECT * FROM t WHERE a = 1 AND b = 2 AND c = 3") == (True, 2)
+    assert service_client.fingerprint("SELECT a FROM t WHERE a = 5")["params"] == ["5"]
+    pipelined = service_client.parse_multiple([f"SELECT a FROM t WHERE a = {i}" for i in range(200)])
+    assert [tree["query"] for _, tree in pipelined] == [f"SELECT a FROM t WHERE a = {i}" for i in range(200)]
+    try:
+        service_client.request('desconocida', "SELECT a FROM t")
+        raise AssertionError("La operación debería fallar")
+    except ServiceError:
+        pass
+
+service_stats = service.get_stats()
+print(f"\nEstadísticas del servicio: {service_stats}")
+assert service_stats["batches"] < service_stats["requests"]
+asyncio.run_coroutine_threadsafe(service.close(), service_loop).result()
+service_loop.call_soon_threadsafe(service_loop.stop)
+
+# Test 20: Corpus sintético y banco de pruebas
+print("\n" + "="*70)
+print("TEST DEL CORPUS SINTÉTICO")
+print("="*70)
+
+from benchmarks.corpus import CorpusConfig, CorpusGenerator
+from benchmarks.harness import measure
+
+corpus = CorpusGenerator(seed=7).generate(200)
+assert corpus == CorpusGenerator(seed=7).generate(200)
+print(f"\nEjemplo: {corpus[0]}")
+assert all(parser.validate_syntax(query)[0] for query in corpus)
+ambiguous_syntax = SQLParser(ambiguous=True)
+assert all(ambiguous_syntax.validate_syntax(query)[0] for query in corpus[:30])
+
+flat = CorpusGenerator(CorpusConfig(where_rate=1.0, where_depth=0, or_ratio=0.0, not_rate=0.0,
+                                    literal_types=('NUMBER',), order_by_rate=0.0, star_rate=0.0), seed=1).generate(50)
+assert all("(" not in query and " OR " not in query and "ORDER" not in query and "'" not in query for query in flat)
+assert all(parser.validate_syntax(query)[0] for query in flat)
+
+metrics = measure(parser.validate_syntax, corpus[:20], 1)
+assert metrics["calls"] == 20 and metrics["latency_us"]["p50"] <= metrics["latency_us"]["p99"]
+
+# Test 21: Instrumentación
+print("\n" + "="*70)
+print("TEST DE INSTRUMENTACIÓN")
+print("="*70)
+
+from src.parser import disable_metrics, enable_metrics, get_metrics
+
+instrumentation = get_metrics()
+assert not instrumentation.enabled
+instrumentation.reset()
+parser.parse("SELECT a FROM t")
+assert instrumentation.phase_count('parse') == 0
+
+events = []
+instrumentation.add_hook(lambda kind, name, value, labels: events.append((kind, name, labels.get('phase'))))
+enable_metrics()
+try:
+    cached_parser = SQLParser(cache_size=16, template_cache_size=16)
+    cached_parser.register_metrics('test')
+    cached_parser.parse("SELECT a FROM t WHERE a = 1")
+    cached_parser.parse("SELECT a FROM t WHERE a = 2")
+    cached_parser.parse("SELECT a FROM t WHERE a = 2")
+    cached_parser.parse("SELECT FROM")
+    validator.validate_query("SELECT a, a FROM t ORDER BY a")
+    SQLValidator().check_ambiguity("SELECT * FROM t WHERE a = 1 AND b = 2 AND c = 3")
+
+    for phase in ('lex', 'parse', 'tree', 'template', 'rules', 'forest'):
+        assert instrumentation.phase_count(phase) > 0, phase
+    assert instrumentation.counter('cache_lookups', cache='result', outcome='hit') == 1
+    assert instrumentation.counter('cache_lookups', cache='template', outcome='hit') == 1
+    assert instrumentation.counter('parse_errors', kind='unexpected_input') == 1
+    assert instrumentation.counter('ambiguous_queries') == 1
+    assert instrumentation.counter('derivations') == 2
+    assert instrumentation.counter('validations', result='invalid') == 1
+    assert ('histogram', 'phase_seconds', 'lex') in events
+
+    exposition = instrumentation.render_prometheus()
+    print("\n" + "\n".join(line for line in exposition.splitlines() if 'phase="parse"' in line and '_count' in line))
+    assert '# TYPE sqlparser_phase_seconds histogram' in exposition
+    assert 'sqlparser_phase_seconds_bucket{phase="rules",le="+Inf"} 1' in exposition
+    assert 'sqlparser_parse_errors_total{kind="unexpected_input"} 1' in exposition
+    assert 'sqlparser_result_cache_hits{source="test"} 1' in exposition
+    assert 'sqlparser_hit_rate{source="grammar_registry"}' in exposition
+finally:
+    disable_metrics()
+    instrumentation._hooks.clear()
+    instrumentation.unregister_collector('test')
+
+# Test 22: Backend nativo
+print("\n" + "="*70)
+print("TEST DEL BACKEND NATIVO")
+print("="*70)
+
+import random
+from src.parser.compact_tree import CompactTree
+
+native_parser = SQLParser(backend='native')
+native_lexer = native_parser._native
+assert native_lexer is not None
+
+def compact_arrays(compact):
+    return compact._kinds, compact._names, compact._first, compact._second
+
+def token_tuples(tokens):
+    return [(t.type, str(t), t.start_pos, t.line, t.column, t.end_line, t.end_column, t.end_pos) for t in tokens]
+
+# Prueba diferencial: mismo árbol que Lark en el corpus y en mutaciones de sus consultas
+mutation_random = random.Random(11)
+mutation_alphabet = list(" \n()*,=<>!'\"._a1eE") + ['SELECT', 'FROM', 'WHERE', 'AND', 'OR', 'NOT', 'ORDER', 'BY', 'DESC']
+differential = CorpusGenerator(CorpusConfig(where_depth=4, not_rate=0.2), seed=21).generate(400)
+differential += ["SELECT a FROMt", "SELECT a FROM t ORDER BYa", "SELECT FROM FROM FROM",
+                 "SELECT a FROM t WHERE NOT NOT a = NOT", "SELECT a FROM t WHERE NOTa = 1 ORb = 2"]
+checked = 0
+for query in list(differential):
+    for _ in range(4):
+        chars = list(query)
+        chars.insert(mutation_random.randrange(len(chars) + 1), mutation_random.choice(mutation_alphabet))
+        differential.append("".join(chars))
+for query in differential:
+    try:
+        expected = CompactTree.from_lark(parser._parser.parse(query), query)
+    except Exception:
+        expected = None
+    native_tree = native_lexer.parse(query)
+    if expected is None:
+        assert native_tree is None, query
+    else:
+        assert native_tree is not None and compact_arrays(native_tree) == compact_arrays(expected), query
+        checked += 1
+    try:
+        expected_tokens = token_tuples(parser._get_fingerprinter().tokenize(query))
+    except Exception:
+        expected_tokens = None
+    native_tokens = native_lexer.tokenize(query)
+    if native_tokens is not None:
+        assert token_tuples(native_tokens) == expected_tokens, query
+print(f"\n{len(differential)} consultas comparadas con Lark ({checked} válidas)")
+
+# Árboles, validador y errores a través de SQLParser
+query = "SELECT a, b FROM t WHERE NOT (a = 1 OR b <> 'x') AND c >= 2 ORDER BY a DESC"
+assert native_parser.parse(query).to_dict() == parser.parse(query).to_dict()
+assert native_parser.parse("SELECT FROM") is None
+deep_query = "SELECT * FROM t WHERE " + "(" * 1500 + "a = 1" + ")" * 1500
+assert native_parser.validate_syntax(deep_query)[0]
+native_validator = SQLValidator(backend='native')
+for query in ("SELECT a, a FROM t", "SELECT a FROM t WHERE a = 1 AND b = 'x' ORDER BY a", "SELECT FROM t"):
+    assert native_validator.validate_query(query)[:2] == validator.validate_query(query)[:2], query
+templated = SQLParser(backend='native', template_cache_size=8)
+templated.parse("SELECT a FROM t WHERE a = 1")
+assert templated.parse("SELECT a FROM t WHERE a = 22").to_dict() == parser.parse("SELECT a FROM t WHERE a = 22").to_dict()
+assert templated.get_template_cache_stats()["hits"] == 1
+try:
+    SQLParser(ambiguous=True, backend='native')
+    raise AssertionError("El backend nativo no admite la gramática ambigua")
+except ValueError:
+    pass
+
+# Test 23: Importación perezosa y parsers precompilados
+print("\n" + "="*70)
+print("TEST DE ARRANQUE")
+print("="*70)
+
+import subprocess
+import sys
+from src.grammar.parser_registry import ParserRegistry
+from src.grammar import SQL_GRAMMAR_AMBIGUOUS, SQL_GRAMMAR_UNAMBIGUOUS
+from src.grammar.precompiled import build, load_precompiled, LALR_OPTIONS
+from src.parser.recognizer import build_recognizer
+
+lazy_check = subprocess.run(
+    [sys.executable, "-c", "import sys, src.parser, src.grammar, src.service; "
+                           "print(sorted(m for m in ('lark', 'asyncio', 'multiprocessing') if m in sys.modules))"],
+    capture_output=True, text=True, check=True)
+assert lazy_check.stdout.strip() == "[]", lazy_check.stdout
+
+built = build()
+# La gramática ambigua tiene conflictos LALR(1): no se precompila
+assert list(built) == ['sql_unambiguous']
+assert load_precompiled(SQL_GRAMMAR_AMBIGUOUS, **LALR_OPTIONS) is None
+precompiled_lark = load_precompiled(SQL_GRAMMAR_UNAMBIGUOUS, **LALR_OPTIONS)
+assert precompiled_lark is not None
+assert load_precompiled(SQL_GRAMMAR_UNAMBIGUOUS, start='query', parser='earley', lexer='auto', ambiguity='auto') is None
+assert load_precompiled("query: \"SELECT\"", **LALR_OPTIONS) is None
+fresh_registry = ParserRegistry()
+fresh_registry.get_parser(SQL_GRAMMAR_UNAMBIGUOUS, **LALR_OPTIONS)
+assert fresh_registry.get_stats()["precompiled_hits"] == 1
+for query in corpus[:50]:
+    assert precompiled_lark.parse(query) == parser._parser.parse(query)
+
+# Los parsers cargados (precompilados o de la caché en disco) también tienen
+# reconocedor: validate_syntax no debe hacer el parsing completo
+assert build_recognizer(precompiled_lark) is not None
+default_parser = SQLParser()
+default_parser._validate_with_parser = None
+assert default_parser.validate_syntax("SELECT a FROM t WHERE b = 1") == (True, "Sintaxis válida")
+assert default_parser._recognizer is not None
+print(f"\nMódulos precompilados: {', '.join(built)}")
+
+# Test 24: Motor de filtrado vectorizado
+print("\n" + "="*70)
+print("TEST DEL MOTOR DE FILTRADO")
+print("="*70)
+
+import shutil
+import numpy as np
+from src.engine import CompiledQuery, RowEvaluator, compile_query, load_columnar, plan_query, rows_from_columns, save_columnar
+
+engine_import = subprocess.run(
+    [sys.executable, "-c", "import sys, src.engine; from src.engine import plan_query; print('numpy' in sys.modules)"],
+    capture_output=True, text=True, check=True)
+assert engine_import.stdout.strip() == "False", engine_import.stdout
+
+plan = plan_query("SELECT a, b FROM t WHERE NOT (a = 1 OR NOT b <> 'x') AND c >= 2.5 ORDER BY a DESC")
+assert plan.condition == ('and', [('not', ('or', [('cmp', '=', ('column', 'a'), ('literal', 1)),
+                                                  ('not', ('cmp', '!=', ('column', 'b'), ('literal', 'x')))])),
+                                  ('cmp', '>=', ('column', 'c'), ('literal', 2.5))])
+assert plan.order_by == 'a' and plan.descending and plan.columns == ['a', 'b']
+assert plan_query("SELECT * FROM t WHERE a=1ANDNOT b=2ORDER BY c").condition[1][1][0] == 'not'
+assert plan_query("SELECT FROM") is None
+
+engine_rng = np.random.default_rng(5)
+engine_table = {f"c{i}": engine_rng.integers(0, 100000, 500) if i % 2 else engine_rng.random(500) * 100000
+                for i in range(6)}
+engine_rows = list(rows_from_columns(engine_table))
+engine_dir = tempfile.mkdtemp()
+mapped_table = load_columnar(save_columnar(engine_dir, engine_table))
+engine_queries = CorpusGenerator(CorpusConfig(literal_types=('NUMBER', 'CNAME'), identifiers=6, not_rate=0.3,
+                                              nest_rate=0.5, where_depth=3, or_ratio=0.5), seed=3).generate(150)
+for query in engine_queries:
+    plan = plan_query(query)
+    expected = RowEvaluator(plan).execute(engine_rows)
+    for dense_fraction in (None, 0.0, 1.0):
+        assert CompiledQuery(plan, dense_fraction).execute(engine_table).tolist() == expected, query
+    assert compile_query(plan).execute(mapped_table).tolist() == expected, query
+
+text_table = {'s': np.array(['v1', 'v2', 'v3', 'v2']), 'n': np.arange(4)}
+selected = compile_query("SELECT s, n FROM t WHERE s > 'v1' OR n = 0 ORDER BY s DESC").select(text_table)
+assert selected['s'].tolist() == ['v3', 'v2', 'v2', 'v1'] and selected['n'].tolist() == [2, 1, 3, 0]
+try:
+    compile_query("SELECT s FROM t WHERE n = 1 OR s > 1").execute(text_table)
+    raise AssertionError("Comparar texto con números debería fallar")
+except ValueError:
+    pass
+del mapped_table
+shutil.rmtree(engine_dir, ignore_errors=True)
+print(f"\nConsultas comprobadas contra el evaluador fila a fila: {len(engine_queries)}")
+
+# Test 25: Subárboles compartidos entre consultas
+print("\n" + "="*70)
+print("TEST DE SUBÁRBOLES COMPARTIDOS")
+print("="*70)
+
+from src.parser import InternedBatch, SubtreeInterner
+from src.engine import execute_many
+
+shared_parser = SQLParser(backend='native')
+batch = shared_parser.parse_interned([
+    "SELECT a FROM t WHERE a = 1",
+    "SELECT a FROM t WHERE a < 1",
+    "SELECT b FROM u WHERE x > 2 AND a = 1",
+    "SELECT a  FROM t WHERE  a =  1",
+    "SELECT FROM",
+])
+assert batch.same_tree(0, 3) and not batch.same_tree(0, 1)
+assert batch.root(4) is None and batch.tree(4) is None
+groups = batch.group()
+assert groups[next(iter(groups))] == [0, 2, 3]
+assert batch.tree(2).to_dict() == shared_parser.parse("SELECT b FROM u WHERE x > 2 AND a = 1").to_dict()
+
+ambiguous_batch = SQLParser(ambiguous=True).parse_interned(["SELECT * FROM t WHERE a = 1 AND b = 2",
+                                                            "SELECT * FROM t WHERE a = 1 OR b = 2"])
+assert not ambiguous_batch.same_tree(0, 1)
+
+other = InternedBatch.from_trees(shared_parser.parse_multiple(["SELECT a FROM t WHERE a = 1"]), SubtreeInterner())
+assert other.interner.structural_hash(other.root(0)) == batch.interner.structural_hash(batch.root(0))
+corpus_batch = shared_parser.parse_interned(corpus[:200])
+for i, query in enumerate(corpus[:200]):
+    rebuilt = corpus_batch.tree(i)
+    assert rebuilt.to_dict() == shared_parser.parse(query).to_dict(), query
+    # El árbol reconstruido tiene texto: se vuelve a internar igual y se planifica
+    assert corpus_batch.interner.intern(rebuilt.compact_tree) == corpus_batch.root(i), query
+    assert repr(plan_query(rebuilt)) == repr(plan_query(query)), query
+
+uncached_parser = SQLParser(backend='native', cache_size=8)
+uncached_parser.parse_interned(corpus[:20])
+assert uncached_parser.get_cache_stats()['entries'] == 0
+
+many_queries = [compile_query(query) for query in engine_queries[:40]]
+for query, rows in zip(many_queries, execute_many(many_queries, engine_table)):
+    assert rows.tolist() == query.execute(engine_table).tolist(), query.plan
+print(f"\nNodos distintos del corpus: {corpus_batch.interner.get_stats()['unique_nodes']}")
+
+# Test 26: Índice invertido de consultas
+print("\n" + "="*70)
+print("TEST DEL ÍNDICE INVERTIDO")
+print("="*70)
+
+from src.index import AllOf, Not, QueryIndex, Term, index_terms, reads
+
+index_import = subprocess.run(
+    [sys.executable, "-c", "import sys; from src.index import Term, reads; print('numpy' in sys.modules)"],
+    capture_output=True, text=True, check=True)
+assert index_import.stdout.strip() == "False", index_import.stdout
+
+assert index_terms(plan_query("SELECT * FROM users WHERE NOT 18 < age ORDER BY price")) == [
+    ('table', 'users'), ('column', '*'), ('op', '<'), ('where', 'age'), ('predicate', 'age >'), ('order', 'price')]
+
+query_index = QueryIndex()
+assert query_index.add("SELECT FROM") is None
+index_corpus = CorpusGenerator(CorpusConfig(identifiers=8, not_rate=0.2), seed=11).generate(300)
+assert query_index.add_many(index_corpus[:200]) == list(range(200))
+document_terms = [set(index_terms(plan_query(query))) for query in index_corpus]
+column_a, column_b = list(query_index.vocabulary('where'))[:2]
+index_searches = [
+    Term('where', column_a),
+    reads(column_a, next(iter(query_index.vocabulary('table')))),
+    Term('where', column_a) & ~Term('op', '=') & Term('column', '*'),
+    Term('order', column_b) | ~Term('where', column_b),
+    ~(Term('where', column_a) | Term('where', column_b)),
+]
+
+
+def expected_documents(expression, terms):
+    #Evaluación directa de una búsqueda sobre los términos de un documento
+    if isinstance(expression, Term):
+        return (expression.field, expression.value) in terms
+    if isinstance(expression, Not):
+        return not expected_documents(expression.child, terms)
+    results = [expected_documents(child, terms) for child in expression.children]
+    return all(results) if isinstance(expression, AllOf) else any(results)
+
+
+def check_index(index, count):
+    for expression in index_searches:
+        expected = [i for i in range(count) if expected_documents(expression, document_terms[i])]
+        assert index.search(expression).tolist() == expected, expression
+
+
+check_index(query_index, 200)
+index_dir = tempfile.mkdtemp()
+query_index.save(index_dir)
+mapped_index = QueryIndex.load(index_dir)
+check_index(mapped_index, 200)
+for query in index_corpus[200:]:
+    mapped_index.add(shared_parser.parse(query))
+check_index(mapped_index, 300)
+assert mapped_index.query(7) == index_corpus[7] and mapped_index.query(250) == index_corpus[250]
+mapped_index.save(index_dir)
+reloaded_index = QueryIndex.load(index_dir, mmap=False)
+check_index(reloaded_index, 300)
+assert reloaded_index.queries([0, 299]) == [index_corpus[0], index_corpus[299]]
+assert sorted(os.listdir(index_dir)) == ['index.json', 'offsets-1.npy', 'postings-1.npy', 'queries-1.npy']
+del mapped_index, reloaded_index
+shutil.rmtree(index_dir, ignore_errors=True)
+print(f"\nBúsquedas comprobadas: {len(index_searches)} sobre {len(index_corpus)} consultas")